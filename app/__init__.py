@@ -1,6 +1,6 @@
 from flask import Flask, session, send_from_directory, flash, redirect, url_for, request
 from flask_wtf import CSRFProtect
-from app.extensions import db_manager, email_service, s3
+from app.extensions import db_manager, email_service, s3, feed_refresher, item_similarity, recommendation_engine, search_service, reaction_buffer
 from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
 
@@ -9,8 +9,12 @@ def create_app(config_class=Config):
     app.config.from_object(config_class)
     
     # Iniciando extensões
+    db_manager.init_app(app)
     email_service.init_app(app)
     s3.init_app(app)
+    item_similarity.init_app(app)
+    recommendation_engine.init_app(app)
+    search_service.init_app(app)
 
     # Habilitar ProxyFix se a aplicação estiver atrás de um proxy reverso na produção
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1)
@@ -40,6 +44,13 @@ def create_app(config_class=Config):
     with app.app_context():
         db_manager.init_all_dbs()
 
+    feed_refresher.init_app(app)
+    reaction_buffer.init_app(app)
+
+    # Comandos de linha (flask feed ...)
+    from app.commands import register_commands
+    register_commands(app)
+
     @app.context_processor
     def inject_global_variables():
         return dict (
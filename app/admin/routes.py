@@ -1,6 +1,6 @@
 from flask import render_template, session, request, jsonify
 from app.extensions import power_required, db_manager, s3
-from app.database import Report, User, Post, Interaction, ModerationHistory, UserDetails
+from app.database import Report, User, Post, Interaction, Reaction, ModerationHistory, UserDetails, pool_metrics
 from flask import current_app
 import json
 from app.data_sanitizer import ModerationForm
@@ -232,7 +232,7 @@ def analytics():
         users = db.query(func.count(User.id)).scalar()
         posts = db.query(func.count(Post.id)).scalar()
         interactions = db.query(func.count(Interaction.id)).filter(Interaction.type.in_(['post_comment', 'reply_comment'])).scalar()
-        reactions = db.query(func.count(Interaction.id)).filter(Interaction.type.in_(['like_post', 'dislike_post'])).scalar()
+        reactions = db.query(func.count(Reaction.id)).filter(Reaction.target_type == 'post').scalar()
         chart = {
             'type': 'bar',
             'data': {
@@ -250,3 +250,9 @@ def analytics():
             }
         }
         return jsonify({'chart': chart, 'text': f'Tudo: {users + posts + interactions + reactions}'})
+
+@bp.route('/db-pool', methods=['GET'])
+@power_required(required_power=1)
+def db_pool():
+    """Uso do pool de conexões do worker que atendeu a requisição."""
+    return jsonify(pool_metrics.snapshot())
@@ -1,15 +1,48 @@
-from flask import request, jsonify, session
-from sqlalchemy.orm import joinedload
-from app.extensions import login_required, db_manager
+from flask import request, jsonify, session, current_app
+from app.extensions import login_required, db_manager, search_service, suggestion_index
 from app.data_sanitizer import ReportForm
-from app.database import Post, Report, UserDetails
+from app.database import Report
 from app.api import bp
-import re
+from datetime import datetime
+import base64
+import json
+import logging
+
+# Tamanho das páginas de comentários e respostas (limit na API é limitado a THREAD_MAX_PAGE_SIZE)
+COMMENTS_PAGE_SIZE = 10
+REPLIES_PAGE_SIZE = 10
+THREAD_MAX_PAGE_SIZE = 50
 
 def get_user_icon(user_id):
     user = db_manager.get_user_details(user_id)
     return user.icon_url if user and user.icon_url else None
 
+def format_post_card(card, date_format=None):
+    """Converte um item de db_manager.hydrate_posts no dict usado pelos templates e pela API."""
+    post = card['post']
+    return {
+        'id': post.id,
+        'title': post.title,
+        'content': post.content,
+        'tag': post.tag,
+        'optional_tags': post.optional_tags,
+        'created_at': post.created_at.strftime(date_format) if date_format else post.created_at,
+        'author': post.author_user.display_name,
+        'authorat': post.author_user.user.username,
+        'authoricon': post.author_user.icon_url,
+        'userid': post.author_user.user_id,
+        'image_urls': post.image_urls,
+        'likes': card['likes'],
+        'dislikes': card['dislikes'],
+        'comments': card['comments'],
+        'user_reaction': card['user_reaction'],
+        'is_saved': card['is_saved']
+    }
+
+def get_post_cards(post_ids, date_format=None):
+    """Carrega e formata os cards de `post_ids` (na mesma ordem) para o usuário logado."""
+    return [format_post_card(card, date_format) for card in db_manager.hydrate_posts(post_ids, session.get('id'))]
+
 def get_post_with_details(post_id):
     post = db_manager.get_post_by_id(post_id)
     if not post:
@@ -29,7 +62,7 @@ def get_post_with_details(post_id):
     user_icon = get_user_icon(user_id)
 
     # Carregar comentários e suas respostas com contagens e reações do usuário
-    comments_with_details = get_post_comments(post_id, offset=0, limit=10)
+    comments_with_details, next_cursor = get_post_comments(post_id, limit=COMMENTS_PAGE_SIZE)
     comment_count = db_manager.get_comment_amount_for_post(post_id)
 
     return {
@@ -41,15 +74,44 @@ def get_post_with_details(post_id):
         'is_saved': db_manager.is_post_saved(user_id, post_id) if user_id else False,
         'user_icon': user_icon,
         'comment_count': comment_count,
-        'next_offset': len(comments_with_details),
+        'next_cursor': next_cursor,
         'total_comments': comment_count
     }
 
 
-def get_post_comments(post_id, offset=0, limit=10):
-    comentarios = db_manager.get_paginated_comments(post_id, offset, limit)
+def encode_thread_cursor(interaction):
+    """Cursor opaco com a chave (likes, timestamp, id) do último item de uma página de comentários/respostas."""
+    payload = json.dumps([interaction.like_count, interaction.timestamp.isoformat(), interaction.id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+def decode_thread_cursor(cursor):
+    """Inverso de encode_thread_cursor. Levanta ValueError se o cursor for inválido."""
+    try:
+        likes, timestamp, interaction_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return int(likes), datetime.fromisoformat(timestamp), int(interaction_id)
+    except Exception as e:
+        raise ValueError("Cursor de comentários inválido.") from e
+
+def get_thread_page_args(default_limit):
+    """Lê `cursor` e `limit` da query string. Levanta ValueError se o cursor for inválido."""
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', default_limit, type=int)
+    return (decode_thread_cursor(cursor) if cursor else None), min(max(limit, 1), THREAD_MAX_PAGE_SIZE)
+
+def get_post_comments(post_id, after=None, limit=COMMENTS_PAGE_SIZE):
+    """Retorna (comentários formatados, cursor da próxima página ou None)."""
+    comentarios = db_manager.get_paginated_comments(post_id, after, limit + 1)
+    next_cursor = None
+    if len(comentarios) > limit:
+        comentarios = comentarios[:limit]
+        next_cursor = encode_thread_cursor(comentarios[-1][0])
     formatted_comments = []
 
+    # Resposta mais curtida de cada comentário da página (e a reação do usuário a ela) em uma consulta
+    top_replies = db_manager.get_top_replies([comment.id for comment, _, _, num_replies in comentarios if num_replies > 0], session.get('id'))
+    # Reações do usuário a todos os comentários da página em uma consulta
+    reactions = db_manager.get_user_comment_reactions(session.get('id'), [comment.id for comment, _, _, _ in comentarios])
+
     for comment, likes, dislikes, num_replies in comentarios:
         comment_content = {
             'comment': {
@@ -64,37 +126,38 @@ def get_post_comments(post_id, offset=0, limit=10):
             'total_replies': num_replies,
         }
 
-        reaction = db_manager.get_user_comment_reaction(session.get('id'), comment.id)
-        if reaction:
-            comment_content['user_reaction'] = reaction.type
+        if comment.id in reactions:
+            comment_content['user_reaction'] = reactions[comment.id]
         
-        if num_replies > 0:
-            most_liked_reply = db_manager.get_paginated_replies(post_id, comment.id, offset=0, limit=1)
-            if most_liked_reply:
-                for reply, likes, dislikes in most_liked_reply:
-                    comment_content['most_liked_reply'] = {
-                        'reply': {
-                            'id': reply.id,
-                            'username': reply.user_who_interacted.display_name,
-                            'userid': reply.user_who_interacted.user_id,
-                            'usericon': reply.user_who_interacted.icon_url,
-                            'value': reply.value
-                        },
-                        'likes': likes,
-                        'dislikes': dislikes
-                    }
-                
-                reply_reaction = db_manager.get_user_comment_reaction(session.get('id'), comment_content['most_liked_reply']["reply"]['id'])
-                if reply_reaction:
-                    comment_content['reply_user_reaction'] = reply_reaction.type
+        if comment.id in top_replies:
+            reply, reply_likes, reply_dislikes, reply_reaction = top_replies[comment.id]
+            comment_content['most_liked_reply'] = {
+                'reply': {
+                    'id': reply.id,
+                    'username': reply.user_who_interacted.display_name,
+                    'userid': reply.user_who_interacted.user_id,
+                    'usericon': reply.user_who_interacted.icon_url,
+                    'value': reply.value
+                },
+                'likes': reply_likes,
+                'dislikes': reply_dislikes
+            }
+            if reply_reaction:
+                comment_content['reply_user_reaction'] = reply_reaction
         
         formatted_comments.append(comment_content)
     
-    return formatted_comments
-
-def get_comment_replies(post_id, comment_id, offset=0, limit=10):
-    replies = db_manager.get_paginated_replies(post_id, comment_id, offset, limit)
+    return formatted_comments, next_cursor
+
+def get_comment_replies(post_id, comment_id, after=None, limit=REPLIES_PAGE_SIZE):
+    """Retorna (respostas formatadas, cursor da próxima página ou None)."""
+    replies = db_manager.get_paginated_replies(post_id, comment_id, after, limit + 1)
+    next_cursor = None
+    if len(replies) > limit:
+        replies = replies[:limit]
+        next_cursor = encode_thread_cursor(replies[-1][0])
     formatted_replies = []
+    reactions = db_manager.get_user_comment_reactions(session.get('id'), [reply.id for reply, _, _ in replies])
 
     for reply, likes, dislikes in replies:
         reply_content = {
@@ -109,13 +172,12 @@ def get_comment_replies(post_id, comment_id, offset=0, limit=10):
             'dislikes': dislikes
         }
 
-        reaction = db_manager.get_user_comment_reaction(session.get('id'), reply.id)
-        if reaction:
-            reply_content['user_reaction'] = reaction.type
+        if reply.id in reactions:
+            reply_content['user_reaction'] = reactions[reply.id]
         
         formatted_replies.append(reply_content)
     
-    return formatted_replies
+    return formatted_replies, next_cursor
 
 @bp.route('/posts/<int:post_id>/react', methods=['POST'])
 @login_required
@@ -148,23 +210,8 @@ def toggle_save_post_api(post_id):
 @login_required
 def get_saved_posts_api():
     user_id = session.get('id')
-    posts = db_manager.get_saved_posts(user_id)
-    formatted = []
-    for post in posts:
-        formatted.append({
-            'id': post.id,
-            'title': post.title,
-            'content': post.content,
-            'tag': post.tag,
-            'optional_tags': post.optional_tags,
-            'created_at': post.created_at.strftime('%d/%m/%Y'),
-            'author': post.author_user.display_name,
-            'authorat': post.author_user.user.username,
-            'authoricon': post.author_user.icon_url,
-            'userid': post.author_user.user_id,
-            'image_urls': post.image_urls,
-        })
-    return jsonify({"success": True, "total": len(formatted), "posts": formatted}), 200
+    posts = get_post_cards(db_manager.get_saved_post_ids(user_id), date_format='%d/%m/%Y')
+    return jsonify({"success": True, "total": len(posts), "posts": posts}), 200
 
 @bp.route('/comments/<int:comment_id>/react', methods=['POST'])
 @login_required
@@ -276,7 +323,7 @@ def get_post_details_api(post_id):
         "dislikes": post_details['post_dislikes'],
         "user_post_reaction": post_details['user_post_reaction'],
         "is_saved": post_details.get('is_saved', False),
-        "next_offset": post_details['next_offset'],
+        "next_cursor": post_details['next_cursor'],
         "total_comments": post_details['total_comments']
     }), 200
 
@@ -284,19 +331,26 @@ def get_post_details_api(post_id):
 @bp.route('/posts/<int:post_id>/comments', methods=['GET'])
 @login_required
 def get_post_comments_api(post_id):
-    offset = request.args.get('offset', 0, type=int)
-    limit = request.args.get('limit', 10, type=int)
+    try:
+        after, limit = get_thread_page_args(COMMENTS_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"success": False, "message": "Parâmetros de paginação inválidos."}), 400
 
-    comments = get_post_comments(post_id, offset, limit)
+    comments, next_cursor = get_post_comments(post_id, after, limit)
 
-    return jsonify({"success": True, "comments": comments}), 200
+    return jsonify({"success": True, "comments": comments, "next_cursor": next_cursor}), 200
 
 @bp.route('/posts/<int:post_id>/comment/<int:comment_id>/replies', methods=['GET'])
 @login_required
 def get_comment_replies_api(post_id, comment_id):
-    replies_data = get_comment_replies(post_id, comment_id, offset=0, limit=0)
+    try:
+        after, limit = get_thread_page_args(REPLIES_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"success": False, "message": "Parâmetros de paginação inválidos."}), 400
 
-    return jsonify({"success": True, "replies": replies_data}), 200
+    replies_data, next_cursor = get_comment_replies(post_id, comment_id, after, limit)
+
+    return jsonify({"success": True, "replies": replies_data, "next_cursor": next_cursor}), 200
 
 @bp.route('/posts/<int:post_id>/counts', methods=['GET'])
 @login_required
@@ -356,10 +410,9 @@ def delete_interaction(interaction_id):
     interaction = db_manager.get_interaction_by_id(interaction_id)
     if interaction and interaction.type in ['comment_post', 'reply_comment']:
         if interaction.user_who_interacted.user_id == session.get('id'):
-            with db_manager.get_db() as db:
-                db.delete(interaction)
-                db.commit()
+            if db_manager.delete_comment(interaction_id):
                 return jsonify({"success": True, "message": "Interação excluída com sucesso!"}), 200
+            return jsonify({"success": False, "message": "Erro ao excluir interação."}), 500
         else:
             return jsonify({"success": False, "message": "Você não tem permissão para executar essa ação."}), 403
     return jsonify({"success": False, "message": "Interação não encontrada."}), 404
@@ -368,88 +421,72 @@ def delete_interaction(interaction_id):
 @bp.route('/search', methods=['GET'])
 def search_posts():
     """
-    Busca posts por título, conteúdo, tag ou optional_tags.
-    Suporta filtro de categoria usando (categoria) na query.
+    Busca posts por título, conteúdo, tag ou optional_tags (busca textual, ordenada por relevância).
+    Suporta filtro de categoria usando (categoria) na query e paginação por cursor (next_cursor).
+    Com mode=fuzzy, faz busca aproximada por título e tag (tolerante a acentos e erros de digitação).
     """
-    query = request.args.get('q', '').strip()
+    raw_query = request.args.get('q', '').strip()
+    
+    if not raw_query or len(raw_query) < 2:
+        return jsonify({"success": False, "message": "Consulta de pesquisa muito curta."}), 400
+    
+    try:
+        limit = int(request.args.get('limit', current_app.config['SEARCH_PAGE_SIZE']))
+        threshold = float(request.args['threshold']) if 'threshold' in request.args else None
+        mode = request.args.get('mode') if request.args.get('mode') in ('text', 'fuzzy') else None
+        result = search_service.search(raw_query, session.get('id'), cursor=request.args.get('cursor'), limit=limit, mode=mode, threshold=threshold)
+    except ValueError:
+        return jsonify({"success": False, "message": "Parâmetros de paginação inválidos."}), 400
+    
+    if not result['cards']:
+        return jsonify({"success": False, "message": "Nenhum post encontrado.", "posts": []}), 200
+    
+    return jsonify({
+        "success": True,
+        "query": result['query'],
+        "category_filter": result['category'],
+        "mode": result['mode'],
+        "total_results": result['total'],
+        "total_capped": result['total_capped'],
+        "next_cursor": result['next_cursor'],
+        "posts": [format_post_card(card, date_format='%d/%m/%Y') for card in result['cards']]
+    }), 200
+
+@bp.route('/search/suggest', methods=['GET'])
+def search_suggest_api():
+    """Sugestões para o autocompletar da busca (categorias, usuários e títulos), sem consultar o banco."""
+    query = request.args.get('q', '').strip().lstrip('@')
+    
+    if not query:
+        return jsonify({"success": True, "query": query, "suggestions": []}), 200
+    
+    try:
+        limit = min(max(int(request.args.get('limit', 8)), 1), 20)
+    except ValueError:
+        return jsonify({"success": False, "message": "Parâmetros inválidos."}), 400
+    
+    return jsonify({"success": True, "query": query, "suggestions": suggestion_index.suggest(query, limit=limit)}), 200
+
+@bp.route('/search/users', methods=['GET'])
+def search_users_api():
+    """Busca aproximada de usuários por @username ou nome de exibição."""
+    query = request.args.get('q', '').strip().lstrip('@')
     
     if not query or len(query) < 2:
         return jsonify({"success": False, "message": "Consulta de pesquisa muito curta."}), 400
     
-    # Extrai filtro de categoria entre parênteses
-    category_filter = None
-    category_match = re.search(r'\(([^)]+)\)', query)
-    if category_match:
-        category_filter = category_match.group(1).strip()
-        query = query.replace(f'({category_match.group(1)})', '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+        threshold = float(request.args.get('threshold', current_app.config['SEARCH_FUZZY_THRESHOLD']))
+    except ValueError:
+        return jsonify({"success": False, "message": "Parâmetros inválidos."}), 400
     
-    with db_manager.get_db() as db:
-        # Query base: busca por título, conteúdo, tag ou optional_tags
-        posts_query = db.query(Post).filter(
-            Post.is_deleted == False
-        ).filter(
-            (Post.title.ilike(f'%{query}%')) |
-            (Post.content.ilike(f'%{query}%')) |
-            (Post.tag.ilike(f'%{query}%')) |
-            (Post.optional_tags.ilike(f'%{query}%'))
-        )
-        
-        # Aplica filtro de categoria se fornecido
-        if category_filter:
-            posts_query = posts_query.filter(
-                (Post.tag.ilike(f'%{category_filter}%')) |
-                (Post.optional_tags.ilike(f'%{category_filter}%'))
-            )
-        
-        posts = posts_query.options(
-            joinedload(Post.author_user).joinedload(UserDetails.user)
-        ).order_by(Post.created_at.desc()).all()
-        
-        if not posts:
-            return jsonify({"success": False, "message": "Nenhum post encontrado.", "posts": []}), 200
-        
-        formatted_posts = []
-        user_id = session.get('id')
-        
-        for post in posts:
-            post_reactions = {
-                'likes': db_manager.count_reactions_for_post(post.id, 'like_post'),
-                'dislikes': db_manager.count_reactions_for_post(post.id, 'dislike_post'),
-                'comments': db_manager.count_comments_for_post(post.id),
-                'user_reaction': ""
-            }
-            
-            if user_id:
-                user_reaction = db_manager.get_user_post_reaction(user_id, post.id)
-                if user_reaction:
-                    post_reactions['user_reaction'] = user_reaction.type
-            
-            formatted_posts.append({
-                'id': post.id,
-                'title': post.title,
-                'content': post.content,
-                'tag': post.tag,
-                'optional_tags': post.optional_tags,
-                'created_at': post.created_at.strftime('%d/%m/%Y'),
-                'author': post.author_user.display_name,
-                'authorat': post.author_user.user.username,
-                'authoricon': post.author_user.icon_url,
-                'userid': post.author_user.user_id,
-                'image_urls': post.image_urls,
-                'likes': post_reactions["likes"],
-                'dislikes': post_reactions["dislikes"],
-                'comments': post_reactions["comments"],
-                'user_reaction': post_reactions["user_reaction"],
-                'is_saved': db_manager.is_post_saved(user_id, post.id) if user_id else False
-            })
-        
-        return jsonify({
-            "success": True,
-            "query": query,
-            "category_filter": category_filter,
-            "total_results": len(formatted_posts),
-            "posts": formatted_posts
-        }), 200
+    try:
+        users = search_service.search_users(query, limit=limit, threshold=threshold)
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Busca aproximada indisponível: {e}")
+        return jsonify({"success": False, "message": "Busca aproximada indisponível no momento."}), 503
+    return jsonify({"success": True, "query": query, "total_results": len(users), "users": users}), 200
 
 # Denúncias
 @bp.route('/report', methods=['POST'])
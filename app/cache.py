@@ -0,0 +1,93 @@
+from collections import OrderedDict
+import json
+import logging
+import threading
+import time
+
+class MemoryCache:
+    """Cache em memória do processo, com expiração (TTL) e remoção LRU."""
+    def __init__(self, max_entries=1024, default_ttl=300, namespace=''):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.namespace = namespace
+        self._entries = OrderedDict() # chave -> (expira_em, valor)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key) # Marca como usado recentemente
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False) # Remove o menos usado recentemente
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class RedisCache:
+    """
+    Cache compartilhado entre workers (ex: vários processos do gunicorn) usando Redis.
+    Os valores são serializados em JSON; falhas do Redis são tratadas como cache miss.
+    """
+    def __init__(self, url, default_ttl=300, namespace=''):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("O cache compartilhado requer o pacote 'redis' (pip install redis).") from e
+        self.client = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.namespace = namespace
+
+    def _key(self, key):
+        return f"{self.namespace}{key}"
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self._key(key))
+            return json.loads(raw) if raw is not None else None
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Erro ao ler do cache Redis: {e}")
+            return None
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.client.set(self._key(key), json.dumps(value), ex=int(ttl or self.default_ttl))
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Erro ao gravar no cache Redis: {e}")
+
+    def delete(self, key):
+        try:
+            self.client.delete(self._key(key))
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Erro ao remover do cache Redis: {e}")
+
+    def clear(self):
+        try:
+            keys = list(self.client.scan_iter(match=f"{self.namespace}*", count=500))
+            for start in range(0, len(keys), 500):
+                self.client.delete(*keys[start:start + 500])
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Erro ao limpar o cache Redis: {e}")
+
+def create_cache(url=None, max_entries=1024, default_ttl=300, namespace=''):
+    """Cria o backend de cache: Redis se `url` for redis://, senão em memória."""
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisCache(url, default_ttl=default_ttl, namespace=namespace)
+    return MemoryCache(max_entries=max_entries, default_ttl=default_ttl, namespace=namespace)
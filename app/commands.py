@@ -0,0 +1,131 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app.extensions import db_manager, feed_refresher
+from app.recommendation import build_item_similarity
+from app.database import maintenance_engine
+from app.migrations import MIGRATIONS, apply_migrations, applied_versions, get_migration, benchmark_migration
+from app.partitions import list_partitions, ensure_partitions, cold_partitions, archive_partition, check_copy_support, is_partitioned
+
+feed_cli = AppGroup('feed', help='Feed de recomendações pré-computado.')
+
+@feed_cli.command('refresh')
+@click.option('--user-id', type=int, default=None, help='Atualiza apenas o feed deste usuário.')
+def refresh_feed(user_id):
+    """Recalcula os feeds pré-computados (todos ou de um usuário)."""
+    if user_id:
+        ranked = feed_refresher.refresh_user(user_id)
+        click.echo(f'Feed do usuário {user_id} atualizado com {len(ranked)} posts.')
+    else:
+        total = feed_refresher.refresh_all()
+        click.echo(f'{total} feeds atualizados.')
+
+recommendations_cli = AppGroup('recommendations', help='Modelos do sistema de recomendação.')
+
+@recommendations_cli.command('build-similarity')
+@click.option('--top-k', type=int, default=None, help='Quantidade de vizinhos guardados por post.')
+def build_similarity(top_k):
+    """Gera a vizinhança item-item (cosseno) usada pelo ItemSimilarityStrategy."""
+    path = current_app.config['ITEM_SIMILARITY_PATH']
+    total = build_item_similarity(db_manager, path, top_k=top_k or current_app.config['ITEM_SIMILARITY_TOP_K'])
+    click.echo(f'Modelo com {total} posts salvo em {path}.')
+
+counters_cli = AppGroup('counters', help='Contadores desnormalizados de posts e comentários.')
+
+@counters_cli.command('reconcile')
+def reconcile_counters():
+    """Recalcula likes, dislikes, comentários e respostas a partir das interações."""
+    total = db_manager.reconcile_counters()
+    click.echo(f'Contadores reconciliados ({total} posts).')
+
+migrations_cli = AppGroup('migrations', help='Migrações versionadas do banco (app/migrations.py).')
+
+@migrations_cli.command('status')
+def migrations_status():
+    """Lista as migrações e quando cada uma foi aplicada."""
+    applied = applied_versions(maintenance_engine)
+    for migration in MIGRATIONS:
+        status = f'aplicada em {applied[migration.version]:%d/%m/%Y %H:%M}' if migration.version in applied else 'pendente'
+        click.echo(f'{migration.version:>4}  {status:<28} {migration.description}')
+
+@migrations_cli.command('upgrade')
+@click.option('--target', type=int, default=None, help='Aplica apenas até esta versão.')
+def migrations_upgrade(target):
+    """Aplica as migrações pendentes."""
+    applied = apply_migrations(maintenance_engine, target)
+    click.echo(f'Migrações aplicadas: {applied}' if applied else 'Nenhuma migração pendente.')
+
+@migrations_cli.command('benchmark')
+@click.argument('version', type=int)
+@click.option('--no-analyze', is_flag=True, help='Mostra só os planos, sem executar as consultas (EXPLAIN sem ANALYZE).')
+def migrations_benchmark(version, no_analyze):
+    """
+    Planos das consultas quentes antes e depois da migração VERSION.
+    Roda down/up em transações desfeitas com rollback; o DROP INDEX bloqueia a tabela enquanto isso.
+    """
+    migration = get_migration(version)
+    if not migration:
+        raise click.BadParameter(f'Migração {version} não existe.')
+    for name, plan_before, ms_before, plan_after, ms_after in benchmark_migration(maintenance_engine, migration, analyze=not no_analyze):
+        click.echo(f'=== {name}')
+        click.echo(f'--- antes ({ms_before:.1f} ms)')
+        click.echo('\n'.join(plan_before))
+        click.echo(f'--- depois ({ms_after:.1f} ms)')
+        click.echo('\n'.join(plan_after))
+        click.echo('')
+
+interactions_cli = AppGroup('interactions', help='Partições mensais da tabela interactions.')
+
+@interactions_cli.command('partitions')
+def interactions_partitions():
+    """Cria as partições dos próximos meses e lista as existentes."""
+    with maintenance_engine.begin() as conn:
+        if not is_partitioned(conn):
+            raise click.ClickException('interactions não é particionada; rode `flask migrations upgrade`.')
+        created = ensure_partitions(conn, months_ahead=current_app.config['INTERACTIONS_PARTITIONS_AHEAD'])
+        partitions = list_partitions(conn)
+    for name, start, end, rows in partitions:
+        click.echo(f'{name:<24} {start:%m/%Y}  ~{rows} linhas{"  (nova)" if name in created else ""}')
+
+@interactions_cli.command('archive')
+@click.option('--hot-months', type=int, default=None, help='Meses mais recentes que ficam no banco.')
+@click.option('--directory', default=None, help='Pasta dos arquivos .csv.gz.')
+@click.option('--dry-run', is_flag=True, help='Só lista as partições que seriam arquivadas.')
+def interactions_archive(hot_months, directory, dry_run):
+    """
+    Exporta as partições frias para arquivos .csv.gz e as remove do banco.
+    Os comentários arquivados (e suas reações) saem do site; os contadores são reconciliados no fim.
+    """
+    hot_months = hot_months if hot_months is not None else current_app.config['INTERACTIONS_HOT_MONTHS']
+    directory = directory or current_app.config['INTERACTIONS_ARCHIVE_DIR']
+    if not dry_run:
+        try:
+            check_copy_support(maintenance_engine)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+    with maintenance_engine.begin() as conn:
+        partitions = cold_partitions(conn, hot_months)
+    if not partitions:
+        click.echo('Nenhuma partição fria.')
+        return
+    archived = 0
+    for name, start, end, rows in partitions:
+        if dry_run:
+            click.echo(f'{name}: ~{rows} linhas seriam arquivadas.')
+            continue
+        total = archive_partition(maintenance_engine, name, directory)
+        if total is None:
+            click.echo(f'{name}: ignorada, há respostas em meses mais recentes a comentários desta partição.')
+        else:
+            click.echo(f'{name}: {total} interações arquivadas em {directory}.')
+            archived += 1
+    if archived:
+        db_manager.reconcile_counters()
+        click.echo('Contadores reconciliados.')
+
+def register_commands(app):
+    app.cli.add_command(feed_cli)
+    app.cli.add_command(recommendations_cli)
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(migrations_cli)
+    app.cli.add_command(interactions_cli)
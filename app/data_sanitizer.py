@@ -38,6 +38,12 @@ ALLOWED_CATEGORIES = [
     'Crise adolescência'
 ]
 
+# Categorias principais de um post (campo tags do PostForm)
+POST_TAGS = [
+    'Desenho Infantil', 'Educação', 'Saúde', 'Disciplina', 'Nutrição', 'Comportamento',
+    'Lazer', 'Tecnologia', 'Família', 'Desafios', 'Desafio Semanal'
+]
+
 def validate_fotos(form, field):
     # Filtra arquivos que realmente foram selecionados (não são vazios)
     selected_files = [f for f in field.data if isinstance(f, FileStorage) and f.filename]
@@ -122,9 +128,7 @@ class LoginForm(FlaskForm):
 class PostForm(FlaskForm):
     tituloInput = StringField(name='tituloInput', validators=[InputRequired(message='O título é obrigatório.'), Length(min=5, max=100, message="O título precisa conter entre %(min)d e %(max)d caracteres")])
     contentTextarea = TextAreaField(name='contentTextarea', validators=[InputRequired(message='O conteúdo é obrigatório.'), Length(min=30, max=2000, message="O conteúdo precisa conter entre %(min)d e %(max)d caracteres")])
-    tags = SelectField(name='tags', choices=[
-        ("Desenho Infantil", "Desenho Infantil"), ("Educação", "Educação"), ("Saúde", "Saúde"), ("Disciplina", "Disciplina"), ("Nutrição", "Nutrição"), ("Comportamento", "Comportamento"), ("Lazer", "Lazer"), ("Tecnologia", "Tecnologia"), ("Família", "Família"), ("Desafios", "Desafios"), ("Desafio Semanal", "Desafio Semanal")
-    ], validators=[InputRequired(message='Selecione uma categoria.'), validate_not_empty_choice], render_kw={'data-placeholder': 'true'})
+    tags = SelectField(name='tags', choices=[(t, t) for t in POST_TAGS], validators=[InputRequired(message='Selecione uma categoria.'), validate_not_empty_choice], render_kw={'data-placeholder': 'true'})
     hiddenOptionalTags = StringField(validators=[Optional(), validate_opcional])
     inputFiles = MultipleFileField(
         'Enviar Fotos (até 5, max. 10MB cada)', #label
@@ -1,22 +1,361 @@
 import os
+import math
 import logging
 from datetime import datetime, timedelta
 from argon2 import PasswordHasher, exceptions
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, ForeignKey, SmallInteger, desc, func, case, text
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship, joinedload
+from sqlalchemy import create_engine, event, Column, Integer, String, Text, DateTime, Boolean, ForeignKey, SmallInteger, Float, Index, UniqueConstraint, Computed, desc, func, case, text, select, update, tuple_
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Session, sessionmaker, scoped_session, declarative_base, relationship, joinedload, aliased, deferred
 from sqlalchemy.exc import IntegrityError, OperationalError
-from flask import current_app
+from sqlalchemy.pool import NullPool
+from sqlalchemy.engine import make_url
+from flask import current_app, has_request_context
+from flask.globals import app_ctx
+from app.migrations import apply_migrations, REACTIONS_MIGRATION
+from app.partitions import ensure_partitions, is_partitioned
+from collections import defaultdict
 import contextlib
+import contextvars
+import threading
 import json
 
-from dotenv import load_dotenv
-load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
+from config import Config
+DATABASE_URL = Config.DATABASE_URL
+
+def engine_options(config, statement_timeout: bool = True):
+    """
+    Argumentos do create_engine a partir do Config: tamanho do pool por processo (cada worker do
+    gunicorn tem o seu), reciclagem, espera por conexão e statement_timeout no servidor.
+    Com DB_PGBOUNCER o pool fica no PgBouncer (transaction pooling): NullPool, e nada de estado de
+    sessão no servidor, já que cada transação pode cair em outra conexão.
+    """
+    connect_args = {}
+    if make_url(config.DATABASE_URL).drivername == 'postgresql+psycopg':
+        connect_args['prepare_threshold'] = None # psycopg 3 prepara consultas repetidas no servidor
+    if config.DB_PGBOUNCER:
+        options = {'poolclass': NullPool}
+    else:
+        options = {
+            'pool_pre_ping': True,
+            'pool_size': config.DB_POOL_SIZE,
+            'max_overflow': config.DB_MAX_OVERFLOW,
+            'pool_recycle': config.DB_POOL_RECYCLE,
+            'pool_timeout': config.DB_POOL_TIMEOUT,
+        }
+        if statement_timeout and config.DB_STATEMENT_TIMEOUT_MS:
+            connect_args['options'] = f'-c statement_timeout={config.DB_STATEMENT_TIMEOUT_MS}'
+    options['connect_args'] = connect_args
+    return options
+
+engine = create_engine(DATABASE_URL, **engine_options(Config))
+# Inicialização, migrações e comandos de manutenção: sem statement_timeout (DDL e atualizações em lote
+# podem passar do limite das requisições) e sem manter conexões abertas
+maintenance_engine = create_engine(DATABASE_URL, poolclass=NullPool, connect_args=engine_options(Config, statement_timeout=False)['connect_args'])
+
+if Config.DB_PGBOUNCER and Config.DB_STATEMENT_TIMEOUT_MS:
+    @event.listens_for(engine, 'begin')
+    def _set_statement_timeout(conn):
+        # O PgBouncer não repassa `options` na conexão: o limite vale por transação (SET LOCAL)
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(Config.DB_STATEMENT_TIMEOUT_MS)}")
+
+class PoolMetrics:
+    """Uso do pool de conexões deste processo (expostos em /adm/db-pool)."""
+    def __init__(self, engine):
+        self.engine = engine
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.statement_timeouts = 0
+        self.max_checked_out = 0
+        self._checked_out = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+        event.listen(engine, 'handle_error', self._on_error)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self._checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self._checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self._checked_out = max(self._checked_out - 1, 0)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def _on_error(self, context):
+        error = context.original_exception
+        if (getattr(error, 'pgcode', None) or getattr(error, 'sqlstate', None)) == '57014': # query_canceled (statement_timeout)
+            self.statement_timeouts += 1
+
+    def snapshot(self):
+        pool = self.engine.pool
+        return {
+            'pid': os.getpid(),
+            'pool': type(pool).__name__,
+            'size': pool.size() if hasattr(pool, 'size') else 0,
+            'checked_out': self._checked_out,
+            'checked_in': pool.checkedin() if hasattr(pool, 'checkedin') else 0,
+            'overflow': pool.overflow() if hasattr(pool, 'overflow') else 0,
+            'max_checked_out': self.max_checked_out, # Perto de pool_size + max_overflow: pool saturado
+            'checkouts': self.checkouts,
+            'connects': self.connects,
+            'invalidations': self.invalidations,
+            'statement_timeouts': self.statement_timeouts,
+        }
+
+pool_metrics = PoolMetrics(engine)
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class RequestScopedSession(Session):
+    """
+    Sessão da requisição. Cada bloco get_db aninhado (um método chamado por outro) roda em um
+    SAVEPOINT guardado em info['savepoints'][profundidade]: o rollback() do bloco interno volta só ao
+    SAVEPOINT, sem desfazer nem expirar o que o bloco externo já fez na transação. commit() continua
+    gravando a transação inteira.
+    """
+    def _savepoint(self):
+        """SAVEPOINT ativo do bloco get_db atual, ou None fora de blocos aninhados."""
+        savepoint = self.info.get('savepoints', {}).get(self.info.get('depth', 0))
+        # Depois de um commit (que fecha os SAVEPOINTs) deixa de ser a transação aninhada da sessão;
+        # depois de um flush que falhou continua sendo, inativo, até o rollback()
+        return savepoint if savepoint is not None and savepoint is self.get_nested_transaction() else None
+
+    def commit(self):
+        if self._savepoint() is not None:
+            self.flush() # Se o flush falhar dentro do commit, o SQLAlchemy desfaz a transação inteira
+        super().commit()
+
+    def rollback(self):
+        savepoint = self._savepoint()
+        if savepoint is None:
+            super().rollback()
+            return
+        savepoint.rollback()
+        self.info['savepoints'][self.info['depth']] = self.begin_nested() # O resto do bloco continua isolado
+
+# Sessão compartilhada pelos métodos do DatabaseManager durante uma requisição: uma por app context,
+# removida no teardown_appcontext (ver DatabaseManager.get_db)
+RequestSession = scoped_session(
+    sessionmaker(class_=RequestScopedSession, autoflush=False, bind=engine),
+    scopefunc=lambda: id(app_ctx._get_current_object())
+)
+_unscoped = contextvars.ContextVar('db_unscoped', default=False)
 Base = declarative_base()
 
+# Ranking "hot": o engajamento líquido (likes - dislikes + comentários) em escala log10
+# somado à data de criação. A cada HOT_SCORE_DECAY segundos um post precisa de 10x mais
+# engajamento para manter a posição, ou seja, o peso decai exponencialmente com o tempo,
+# mas a ordem relativa só muda quando há escrita, então o score pode ser atualizado incrementalmente.
+HOT_SCORE_EPOCH = datetime(2025, 1, 1)
+HOT_SCORE_DECAY = 45000
+
+def calculate_hot_score(likes: int, dislikes: int, comments: int, created_at: datetime):
+    net = likes - dislikes + comments
+    order = math.log10(max(abs(net), 1))
+    sign = 1 if net > 0 else -1 if net < 0 else 0
+    seconds = ((created_at or datetime.now()) - HOT_SCORE_EPOCH).total_seconds()
+    return sign * order + seconds / HOT_SCORE_DECAY
+
+def hot_score_sql(likes: str, dislikes: str, comments: str, created_at: str = 'created_at'):
+    """Mesmo cálculo de calculate_hot_score em SQL, para atualizar o score na própria instrução de escrita."""
+    net = f"(({likes}) - ({dislikes}) + ({comments}))"
+    return (
+        f"(sign({net}) * log(greatest(abs({net}), 1)::double precision) + "
+        f"extract(epoch FROM (coalesce({created_at}, localtimestamp) - TIMESTAMP '{HOT_SCORE_EPOCH:%Y-%m-%d %H:%M:%S}')) / {HOT_SCORE_DECAY})"
+    )
+
+# Documento de busca textual dos posts (pesos: título > tags > conteúdo), gerado pelo próprio PostgreSQL
+# a cada INSERT/UPDATE. Ver app/search.py.
+SEARCH_CONFIG = 'portuguese'
+POST_SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(tag, '') || ' ' || coalesce(optional_tags, '')), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(content, '')), 'C')"
+)
+
+# Índices de trigramas (busca aproximada e por trecho, sem acentos) criados por init_all_dbs
+TRIGRAM_INDEXES = (
+    ('ix_posts_title_trgm', 'posts', 'title'),
+    ('ix_posts_tag_trgm', 'posts', 'tag'),
+    ('ix_users_username_trgm', 'users', 'username'),
+    ('ix_users_details_display_name_trgm', 'users_details', 'display_name'),
+)
+
+# Alternância de reações em uma única instrução (DatabaseManager._toggle_reaction): remove a reação
+# se for do mesmo tipo, troca se for do tipo oposto ou insere, e atualiza os contadores do alvo, tudo
+# em um round trip. A restrição uq_reactions_user_target impede reações duplicadas em cliques simultâneos;
+# se outro clique já gravou o mesmo tipo, o ON CONFLICT não altera nada e os contadores ficam intactos.
+REACTION_TARGETS = {
+    'post': {
+        'types': ('like_post', 'dislike_post'),
+        'target': "SELECT id, id AS post_id FROM posts WHERE id = :target_id AND is_deleted IS NOT TRUE",
+        'counters': (
+            "UPDATE posts SET like_count = like_count + delta.likes, dislike_count = dislike_count + delta.dislikes, "
+            f"hot_score = {hot_score_sql('like_count + delta.likes', 'dislike_count + delta.dislikes', 'comment_count')} "
+            "FROM delta WHERE posts.id = :target_id"
+        ),
+    },
+    'comment': {
+        'types': ('like_comment', 'dislike_comment'),
+        'target': "SELECT id, post_id FROM interactions WHERE id = :target_id AND type IN ('comment_post', 'reply_comment')",
+        'counters': (
+            "UPDATE interactions SET like_count = like_count + delta.likes, dislike_count = dislike_count + delta.dislikes "
+            "FROM delta WHERE interactions.id = :target_id"
+        ),
+    },
+}
+
+TOGGLE_REACTION_SQL = """
+WITH target AS ({target}),
+removed AS (
+    DELETE FROM reactions
+    WHERE user_id = :user_id AND target_type = :target_type AND target_id = :target_id AND type = :reaction_type
+    RETURNING type
+),
+upserted AS (
+    INSERT INTO reactions (user_id, target_type, target_id, type, "timestamp")
+    SELECT :user_id, :target_type, id, :reaction_type, localtimestamp FROM target
+    WHERE NOT EXISTS (SELECT 1 FROM removed)
+    ON CONFLICT (user_id, target_type, target_id) DO UPDATE
+        SET type = EXCLUDED.type, "timestamp" = EXCLUDED."timestamp"
+        WHERE reactions.type <> EXCLUDED.type
+    RETURNING (xmax = 0) AS inserted
+),
+changes AS (
+    SELECT type AS old_type, NULL AS new_type FROM removed
+    UNION ALL
+    SELECT CASE WHEN inserted THEN NULL ELSE :opposite_type END, :reaction_type FROM upserted
+),
+delta AS (
+    SELECT count(*) FILTER (WHERE new_type = :like_type) - count(*) FILTER (WHERE old_type = :like_type) AS likes,
+           count(*) FILTER (WHERE new_type = :dislike_type) - count(*) FILTER (WHERE old_type = :dislike_type) AS dislikes
+    FROM changes
+),
+bumped AS (
+    {counters} AND EXISTS (SELECT 1 FROM changes)
+)
+SELECT (SELECT post_id FROM target) AS post_id, (SELECT old_type FROM changes) AS old_type, (SELECT new_type FROM changes) AS new_type
+"""
+
+# Estado atual da reação de um usuário a um alvo (usado pelo ReactionBuffer antes de alternar em memória)
+REACTION_STATE_SQL = """
+WITH target AS ({target})
+SELECT (SELECT post_id FROM target) AS post_id,
+       (SELECT type FROM reactions WHERE user_id = :user_id AND target_type = :target_type AND target_id = :target_id) AS type
+"""
+
+# Gravação em lote do ReactionBuffer: define (não alterna) o estado final de cada (usuário, alvo),
+# com tipo NULL para remover, e aplica a diferença real aos contadores, tudo em uma instrução.
+APPLY_REACTIONS_SQL = f"""
+WITH input AS (
+    SELECT * FROM unnest(CAST(:user_ids AS integer[]), CAST(:target_types AS varchar[]), CAST(:target_ids AS integer[]), CAST(:types AS varchar[]))
+        AS input (user_id, target_type, target_id, type)
+),
+removed AS (
+    DELETE FROM reactions USING input
+    WHERE input.type IS NULL AND reactions.user_id = input.user_id
+      AND reactions.target_type = input.target_type AND reactions.target_id = input.target_id
+    RETURNING reactions.target_type, reactions.target_id, reactions.type
+),
+upserted AS (
+    INSERT INTO reactions (user_id, target_type, target_id, type, "timestamp")
+    SELECT user_id, target_type, target_id, type, localtimestamp FROM input
+    WHERE type IS NOT NULL AND CASE target_type
+        WHEN 'post' THEN EXISTS (SELECT 1 FROM posts WHERE posts.id = input.target_id AND posts.is_deleted IS NOT TRUE)
+        ELSE EXISTS (SELECT 1 FROM interactions WHERE interactions.id = input.target_id AND interactions.type IN ('comment_post', 'reply_comment'))
+    END
+    ON CONFLICT (user_id, target_type, target_id) DO UPDATE
+        SET type = EXCLUDED.type, "timestamp" = EXCLUDED."timestamp"
+        WHERE reactions.type <> EXCLUDED.type
+    RETURNING target_type, target_id, type, (xmax = 0) AS inserted
+),
+changes AS (
+    SELECT target_type, target_id, -(type LIKE 'like_%')::int AS likes, -(type LIKE 'dislike_%')::int AS dislikes FROM removed
+    UNION ALL
+    -- Numa atualização a reação antiga era a oposta
+    SELECT target_type, target_id,
+           CASE WHEN type LIKE 'like_%' THEN 1 WHEN inserted THEN 0 ELSE -1 END,
+           CASE WHEN type LIKE 'dislike_%' THEN 1 WHEN inserted THEN 0 ELSE -1 END
+    FROM upserted
+),
+delta AS (
+    SELECT target_type, target_id, sum(likes) AS likes, sum(dislikes) AS dislikes FROM changes GROUP BY target_type, target_id
+),
+posts_bumped AS (
+    UPDATE posts SET like_count = like_count + delta.likes, dislike_count = dislike_count + delta.dislikes,
+        hot_score = {hot_score_sql('like_count + delta.likes', 'dislike_count + delta.dislikes', 'comment_count')}
+    FROM delta WHERE delta.target_type = 'post' AND posts.id = delta.target_id
+),
+comments_bumped AS (
+    UPDATE interactions SET like_count = like_count + delta.likes, dislike_count = dislike_count + delta.dislikes
+    FROM delta WHERE delta.target_type = 'comment' AND interactions.id = delta.target_id
+)
+SELECT count(*) FROM changes
+"""
+
+# Post novo nos feeds pré-computados sem recalcular cada um (FeedRefresher.add_post_to_feeds), com o
+# score de :scores por usuário (:default_score para os demais). Ele entra nos feeds em que alcança as
+# :feed_size primeiras posições, com a posição do primeiro post de score menor ou igual; no empate de
+# posição vale o score (ver get_user_feed), então nenhum outro post precisa ser renumerado. Em um feed
+# cheio, o último post sai.
+INSERT_POST_INTO_FEEDS_SQL = """
+WITH scores AS (
+    SELECT * FROM unnest(CAST(:user_ids AS integer[]), CAST(:scores AS double precision[])) AS scores(user_id, score)
+),
+targets AS (
+    SELECT user_feed.user_id, coalesce(scores.score, :default_score) AS score,
+           coalesce(min(user_feed.position) FILTER (WHERE user_feed.score <= coalesce(scores.score, :default_score)),
+                    max(user_feed.position) + 1) AS position,
+           count(*) AS size
+    FROM user_feed LEFT JOIN scores ON scores.user_id = user_feed.user_id
+    GROUP BY user_feed.user_id, scores.score
+    HAVING count(*) FILTER (WHERE user_feed.score > coalesce(scores.score, :default_score)) < :feed_size
+       AND bool_and(user_feed.post_id <> :post_id)
+),
+dropped AS (
+    DELETE FROM user_feed WHERE id IN (
+        SELECT DISTINCT ON (user_feed.user_id) user_feed.id
+        FROM user_feed JOIN targets ON targets.user_id = user_feed.user_id
+        WHERE targets.size >= :feed_size
+        ORDER BY user_feed.user_id, user_feed.position DESC, user_feed.score, user_feed.post_id
+    )
+)
+INSERT INTO user_feed (user_id, post_id, score, position, created_at)
+SELECT user_id, :post_id, score, position, localtimestamp FROM targets
+"""
+
+# Usuários com feed que já interagiram (comentário, visualização ou reação ao post ou a um comentário
+# dele) com posts de cada uma das :tags, ou seja, que têm a tag no perfil do ContentBasedStrategy
+FEED_USERS_BY_TAG_SQL = """
+WITH tagged AS (
+    SELECT posts.id, tags.tag FROM posts
+    JOIN unnest(CAST(:tags AS varchar[])) AS tags(tag)
+      ON posts.tag = tags.tag OR tags.tag = ANY(string_to_array(posts.optional_tags, ','))
+),
+interested AS (
+    SELECT interactions.user_id, tagged.tag FROM interactions JOIN tagged ON interactions.post_id = tagged.id
+    UNION
+    SELECT reactions.user_id, tagged.tag FROM reactions
+    JOIN tagged ON reactions.target_type = 'post' AND reactions.target_id = tagged.id
+    UNION
+    SELECT reactions.user_id, tagged.tag FROM reactions
+    JOIN interactions ON reactions.target_type = 'comment' AND reactions.target_id = interactions.id
+    JOIN tagged ON interactions.post_id = tagged.id
+)
+SELECT user_id, tag FROM interested
+WHERE EXISTS (SELECT 1 FROM user_feed WHERE user_feed.user_id = interested.user_id)
+"""
+
 class User(Base):
     __tablename__ = 'users'
 
@@ -74,6 +413,20 @@ class Post(Base):
     created_at = Column(DateTime, default=datetime.now)
     image_urls = Column(Text, nullable=True)
     is_deleted = Column(Boolean, default=False)
+    hot_score = Column(Float, nullable=True) # Ver calculate_hot_score
+
+    # Contadores desnormalizados, mantidos na mesma transação das interações (ver _bump_counters)
+    like_count = Column(Integer, nullable=False, default=0, server_default='0')
+    dislike_count = Column(Integer, nullable=False, default=0, server_default='0')
+    comment_count = Column(Integer, nullable=False, default=0, server_default='0')
+
+    search_vector = deferred(Column(TSVECTOR, Computed(POST_SEARCH_VECTOR_SQL, persisted=True)))
+
+    __table_args__ = (
+        # Mesma ordem de get_posts_with_most_likes (NULLS LAST e desempate por id), para o índice servir o ORDER BY ... LIMIT
+        Index('ix_posts_hot_score_id', hot_score.desc().nullslast(), id.desc(), postgresql_where=(is_deleted == False)),
+        Index('ix_posts_search_vector', search_vector, postgresql_using='gin'),
+    )
 
     # Relacionamentos
     author_user = relationship("UserDetails", foreign_keys=[user_id], back_populates="posts")
@@ -105,28 +458,80 @@ class Resource(Base):
 
 
 class Interaction(Base):
+    """
+    Comentários, respostas e demais interações com posts. A tabela é particionada por mês de
+    `timestamp` (app/partitions.py), por isso a chave primária é (id, timestamp) e
+    parent_interaction_id não tem chave estrangeira.
+    """
     __tablename__ = "interactions"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey('users_details.user_id'), nullable=False)
     post_id = Column(Integer, ForeignKey('posts.id'), nullable=False)
-    parent_interaction_id = Column(Integer, ForeignKey('interactions.id'), nullable=True) 
-    type = Column(String(50), nullable=False)  # 'like_post', 'dislike_post', 'comment_post', 'like_comment', 'dislike_comment', 'reply_comment', 'view_post', 'share_post'
+    parent_interaction_id = Column(Integer, nullable=True) # interactions.id do comentário respondido
+    type = Column(String(50), nullable=False)  # 'comment_post', 'reply_comment', 'view_post', 'share_post' (likes/dislikes ficam em reactions)
     value = Column(String(352), nullable=True) # "@(usuário) " + 300 caracteres de comentários
     is_deleted = Column(Boolean, default=False)
-    timestamp = Column(DateTime, default=datetime.now)
+    timestamp = Column(DateTime, primary_key=True, default=datetime.now) # Chave de partição
+
+    # Contadores desnormalizados (usados apenas em comentários e respostas)
+    like_count = Column(Integer, nullable=False, default=0, server_default='0')
+    dislike_count = Column(Integer, nullable=False, default=0, server_default='0')
+    reply_count = Column(Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        Index('ix_interactions_parent_user', 'parent_interaction_id', 'user_id'),
+        # Migração 1 (app/migrations.py)
+        Index('ix_interactions_user_type_post', 'user_id', 'type', 'post_id'),
+        # Ordem das listas de comentários e de respostas (paginação por cursor: likes, data, id)
+        Index('ix_interactions_comment_order', 'post_id', 'type', like_count.desc(), timestamp.desc(), id.desc()),
+        Index('ix_interactions_reply_order', 'parent_interaction_id', 'type', like_count.desc(), timestamp.desc(), id.desc()),
+        {'postgresql_partition_by': 'RANGE ("timestamp")'},
+    )
 
     # Relacionamentos
     user_who_interacted = relationship("UserDetails", back_populates="interactions", foreign_keys=[user_id])
     post_being_interacted = relationship("Post", back_populates="interactions", foreign_keys=[post_id])
     
     # Hierarquia de comentários
-    parent_interaction = relationship("Interaction", remote_side=[id], back_populates="child_interactions")
-    child_interactions = relationship("Interaction", back_populates="parent_interaction", cascade="all, delete-orphan")
+    parent_interaction = relationship(
+        "Interaction", primaryjoin="foreign(Interaction.parent_interaction_id) == remote(Interaction.id)",
+        back_populates="child_interactions"
+    )
+    child_interactions = relationship(
+        "Interaction", primaryjoin="remote(foreign(Interaction.parent_interaction_id)) == Interaction.id",
+        back_populates="parent_interaction", cascade="all, delete-orphan"
+    )
 
     def __repr__(self):
         return f"<Interaction(id='{self.id}', post_id='{self.post_id}', user_id='{self.user_id}', type='{self.type}', parent_id={self.parent_interaction_id})>"
 
+class Reaction(Base):
+    """
+    Like/dislike de um usuário a um post ('post') ou comentário/resposta ('comment').
+    A restrição única garante no máximo uma reação por usuário e alvo, e permite alternar
+    a reação com um único INSERT ... ON CONFLICT (ver DatabaseManager._toggle_reaction).
+    """
+    __tablename__ = "reactions"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users_details.user_id'), nullable=False)
+    target_type = Column(String(10), nullable=False) # 'post' ou 'comment'
+    target_id = Column(Integer, nullable=False) # posts.id ou interactions.id, conforme target_type
+    type = Column(String(20), nullable=False) # 'like_post', 'dislike_post', 'like_comment', 'dislike_comment'
+    timestamp = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'target_type', 'target_id', name='uq_reactions_user_target'),
+        # Reações de um alvo (matriz de likes, PopularityPrior, reconcile_counters)
+        Index('ix_reactions_target', 'target_type', 'target_id', 'type', 'user_id'),
+    )
+
+    user = relationship("UserDetails", foreign_keys=[user_id])
+
+    def __repr__(self):
+        return f"<Reaction(user_id={self.user_id}, target={self.target_type}:{self.target_id}, type='{self.type}')>"
+
 class Report(Base):
     __tablename__ = 'reports'
     id = Column(Integer, primary_key=True, index=True)
@@ -180,19 +585,120 @@ class SavedPost(Base):
     user = relationship("User", foreign_keys=[user_id])
     post = relationship("Post", foreign_keys=[post_id])
 
+class UserFeed(Base):
+    __tablename__ = 'user_feed'
+    __table_args__ = (
+        Index('ix_user_feed_user_position', 'user_id', 'position'),
+        # Migração 5 (app/migrations.py): remoção de um post de todos os feeds
+        Index('ix_user_feed_post', 'post_id'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    post_id = Column(Integer, ForeignKey('posts.id'), nullable=False)
+    score = Column(Float, nullable=False)
+    position = Column(Integer, nullable=False) # 0 = primeiro post do feed
+    created_at = Column(DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f"<UserFeed(user_id={self.user_id}, post_id={self.post_id}, position={self.position})>"
+
 class DatabaseManager:
     def __init__(self):
         # A conexão e sessão são gerenciadas pelo SessionLocal
         self.ph = PasswordHasher() # Instancia o PasswordHasher
+        self._listeners = defaultdict(list) # Callbacks por evento, chamados após o commit
+        self.reaction_buffer = None # ReactionBuffer (app/reactions.py) quando REACTIONS_WRITE_BEHIND está ativo
+        self.request_scoped = False # Sessão única por requisição (DB_REQUEST_SCOPED_SESSION)
+
+    def init_app(self, app):
+        self.request_scoped = app.config.get('DB_REQUEST_SCOPED_SESSION', True)
+        app.teardown_appcontext(self._remove_request_session)
 
     @contextlib.contextmanager
     def get_db(self):
-        """Retorna uma nova sessão de banco de dados."""
-        db = SessionLocal()
+        """
+        Retorna uma sessão de banco de dados.
+        Durante uma requisição todas as chamadas usam a mesma sessão, fechada no teardown do app context.
+        Fora de requisições (threads, CLI, inicialização) ou dentro de unscoped(), cada chamada abre e
+        fecha uma sessão nova.
+
+        Como em sessões separadas, só é gravado o que cada bloco commita. Cada bloco externo é uma
+        transação: na saída, se ela ainda estiver aberta (leitura, flush sem commit ou uma instrução que
+        falhou), é desfeita e a conexão volta ao pool; os objetos carregados saem da sessão antes, com o
+        estado atual, como no close() de uma sessão própria. Um bloco aninhado roda em um SAVEPOINT (ver
+        RequestScopedSession): se falhar, ou der rollback, só o que ele fez é desfeito, e o SAVEPOINT de
+        um bloco aninhado que não commitou é desfeito na saída. Alterações não commitadas de objetos da
+        sessão são descartadas ao entrar e ao sair de cada bloco (_discard_uncommitted).
+        """
+        if not (self.request_scoped and has_request_context() and not _unscoped.get()):
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+            return
+
+        db = RequestSession()
+        depth = db.info.get('depth', 0) # Métodos que chamam outros métodos reutilizam a mesma sessão
+        self._discard_uncommitted(db)
+        db.info['depth'] = depth + 1
+        if depth > 0:
+            db.info.setdefault('savepoints', {})[depth + 1] = db.begin_nested()
         try:
             yield db
+        except Exception:
+            if depth == 0:
+                db.rollback()
+            raise
+        finally:
+            self._discard_uncommitted(db)
+            if depth > 0:
+                savepoint = db.info['savepoints'].pop(depth + 1)
+                if savepoint is db.get_nested_transaction(): # Fechado se o bloco commitou (o commit grava a transação inteira)
+                    savepoint.rollback()
+            db.info['depth'] = depth
+            if depth == 0 and db.in_transaction():
+                # Sem expunge, o rollback expiraria os objetos devolvidos pelo bloco
+                db.expunge_all()
+                db.rollback()
+
+    @contextlib.contextmanager
+    def unscoped(self):
+        """Dentro do bloco, get_db abre uma sessão própria a cada chamada (jobs em segundo plano)."""
+        token = _unscoped.set(True)
+        try:
+            yield
         finally:
-            db.close()
+            _unscoped.reset(token)
+
+    @staticmethod
+    def _discard_uncommitted(db):
+        """
+        Chamado ao entrar e ao sair de cada bloco get_db na sessão da requisição, para manter o efeito
+        que o close() de cada chamada tinha: só é gravado o que foi alterado e commitado dentro do
+        próprio bloco. Objetos alterados para exibição (ex: image_urls convertido em lista, às vezes
+        depois do bloco) saem da sessão com o estado atual, e o commit de outro método não os grava.
+        """
+        if not db.is_active:
+            db.rollback() # Flush que falhou sem rollback do chamador
+        for obj in [*db.new, *db.dirty, *db.deleted]:
+            db.expunge(obj)
+
+    def _remove_request_session(self, exception=None):
+        RequestSession.remove()
+
+    def add_listener(self, event: str, callback):
+        """Registra um callback para um evento do banco (ex: 'post_reaction')."""
+        self._listeners[event].append(callback)
+
+    def _notify(self, event: str, **payload):
+        """Chama os callbacks do evento. Falhas são logadas e não afetam a escrita já commitada."""
+        for callback in self._listeners[event]:
+            try:
+                callback(**payload)
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Listener de '{event}' falhou: {e}")
 
     # Helper para obter usuário de forma consistente
     def _get_user_by_field(self, field_name: str, value):
@@ -205,6 +711,80 @@ class DatabaseManager:
                 return db.query(User).filter(User.id == value).first()
             return None
 
+    # Helper para manter os contadores de comentários/respostas dentro da transação do chamador
+    # (os de reações são atualizados pelo próprio TOGGLE_REACTION_SQL).
+    # `delta` é +1 quando a interação é criada e -1 quando é removida.
+    def _bump_counters(self, db, interaction_type: str, post_id: int, parent_interaction_id: int, delta: int):
+        if parent_interaction_id is None:
+            column = {'comment_post': Post.comment_count}.get(interaction_type)
+            if column is not None:
+                db.query(Post).filter(Post.id == post_id).update({column: column + delta}, synchronize_session=False)
+                self._refresh_hot_score(db, post_id)
+        else:
+            column = {'reply_comment': Interaction.reply_count}.get(interaction_type)
+            if column is not None:
+                db.query(Interaction).filter(Interaction.id == parent_interaction_id).update({column: column + delta}, synchronize_session=False)
+
+    # Helper para recalcular o hot_score de um post a partir dos contadores, dentro da transação do chamador
+    def _refresh_hot_score(self, db, post_id: int):
+        row = db.query(Post.like_count, Post.dislike_count, Post.comment_count, Post.created_at).filter(Post.id == post_id).first()
+        if row:
+            db.query(Post).filter(Post.id == post_id).update({Post.hot_score: calculate_hot_score(*row)}, synchronize_session=False)
+
+    def recompute_hot_scores(self, only_missing: bool = False):
+        """Recalcula o hot_score de todos os posts (ou só dos que não têm) em lote, a partir dos contadores."""
+        with self.get_db() as db:
+            posts_query = db.query(Post.id, Post.like_count, Post.dislike_count, Post.comment_count, Post.created_at)
+            if only_missing:
+                posts_query = posts_query.filter(Post.hot_score == None)
+            updates = [
+                {'id': post_id, 'hot_score': calculate_hot_score(likes, dislikes, comments, created_at)}
+                for post_id, likes, dislikes, comments, created_at in posts_query.all()
+            ]
+            if updates:
+                db.bulk_update_mappings(Post, updates)
+                db.commit()
+            return len(updates)
+
+    def reconcile_counters(self):
+        """
+        Recalcula em lote todos os contadores desnormalizados a partir das tabelas de interações e
+        reações (e o hot_score, que depende deles). Usado nas migrações e pelo comando `flask counters reconcile`.
+        """
+        child = aliased(Interaction)
+
+        def count_children(parent_filter, interaction_type):
+            return select(func.count(child.id)).where(parent_filter, child.type == interaction_type).scalar_subquery()
+
+        def count_reactions(target_type, target_id, reaction_type):
+            return select(func.count(Reaction.id)).where(
+                Reaction.target_type == target_type,
+                Reaction.target_id == target_id,
+                Reaction.type == reaction_type
+            ).scalar_subquery()
+
+        with self.get_db() as db:
+            try:
+                db.execute(text("SET LOCAL statement_timeout = 0")) # Atualiza todas as linhas: sem o limite das requisições
+                posts_filter = (child.post_id == Post.id) & (child.parent_interaction_id == None)
+                db.execute(update(Post).values(
+                    like_count=count_reactions('post', Post.id, 'like_post'),
+                    dislike_count=count_reactions('post', Post.id, 'dislike_post'),
+                    comment_count=count_children(posts_filter, 'comment_post')
+                ))
+                comments_filter = child.parent_interaction_id == Interaction.id
+                db.execute(update(Interaction).where(Interaction.type.in_(['comment_post', 'reply_comment'])).values(
+                    like_count=count_reactions('comment', Interaction.id, 'like_comment'),
+                    dislike_count=count_reactions('comment', Interaction.id, 'dislike_comment'),
+                    reply_count=count_children(comments_filter, 'reply_comment')
+                ))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logging.getLogger(__name__).error(f"Erro ao reconciliar contadores: {e}")
+                raise
+        return self.recompute_hot_scores()
+
     # Helper para registrar interações
     def _register_interaction(self, user_id: int, post_id: int, interaction_type: str, value: str = None, parent_interaction_id: int = None):
         with self.get_db() as db:
@@ -217,25 +797,99 @@ class DatabaseManager:
                     parent_interaction_id=parent_interaction_id
                 )
                 db.add(new_interaction)
+                self._bump_counters(db, interaction_type, post_id, parent_interaction_id, 1)
                 db.commit()
                 db.refresh(new_interaction) # Recarrega o objeto para ter o ID gerado pelo DB
-                return True, new_interaction.id
             except Exception as e:
                 db.rollback()
                 return False, f"Erro inesperado ao salvar interação: {e}"
+            self._notify('interaction_registered', user_id=user_id, post_id=post_id, interaction_type=interaction_type, interaction_id=new_interaction.id)
+            return True, new_interaction.id
 
     def init_all_dbs(self):
         """Cria todas as tabelas definidas nos modelos no banco de dados."""
         try:
-            Base.metadata.create_all(bind=engine)
+            Base.metadata.create_all(bind=maintenance_engine)
             try:
-                with engine.begin() as conn:
+                with maintenance_engine.begin() as conn:
                     conn.execute(text("ALTER TABLE resources ADD COLUMN IF NOT EXISTS youtube_url TEXT;"))
                     conn.execute(text("ALTER TABLE resources ADD COLUMN IF NOT EXISTS attachment_urls TEXT;"))
                     conn.execute(text(r"UPDATE resources SET youtube_url = NULL WHERE youtube_url IS NOT NULL AND NOT (youtube_url ~ '^https://www\x2Eyoutube\x2Ecom/embed/[A-Za-z0-9_\-]{11}$');"))
                 logging.getLogger(__name__).info("Applied lightweight migrations for resources table (youtube_url / attachment_urls if missing).")
             except Exception as e:
                 logging.getLogger(__name__).warning(f"Could not apply lightweight resources migration: {e}")
+            try:
+                # Antes dos contadores: reconcile_counters termina recalculando o hot_score
+                with maintenance_engine.begin() as conn:
+                    conn.execute(text("ALTER TABLE posts ADD COLUMN IF NOT EXISTS hot_score DOUBLE PRECISION;"))
+                    # ix_posts_hot_score (só hot_score DESC, NULLs primeiro) não servia a ordenação do feed em alta
+                    conn.execute(text("DROP INDEX IF EXISTS ix_posts_hot_score;"))
+                    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_posts_hot_score_id ON posts (hot_score DESC NULLS LAST, id DESC) WHERE is_deleted = false;"))
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Could not apply hot_score migration: {e}")
+            try:
+                with maintenance_engine.begin() as conn:
+                    counters_missing = conn.execute(text(
+                        "SELECT 1 FROM information_schema.columns WHERE table_name = 'posts' AND column_name = 'like_count';"
+                    )).first() is None
+                    for table, columns in (('posts', ('like_count', 'dislike_count', 'comment_count')), ('interactions', ('like_count', 'dislike_count', 'reply_count'))):
+                        for column in columns:
+                            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} INTEGER NOT NULL DEFAULT 0;"))
+                with maintenance_engine.begin() as conn:
+                    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_interactions_parent_user ON interactions (parent_interaction_id, user_id);"))
+                    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_interactions_comment_order ON interactions (post_id, type, like_count DESC, timestamp DESC, id DESC);"))
+                    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_interactions_reply_order ON interactions (parent_interaction_id, type, like_count DESC, timestamp DESC, id DESC);"))
+                if counters_missing:
+                    self.reconcile_counters()
+                    logging.getLogger(__name__).info("Contadores de posts e comentários preenchidos.")
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Could not apply counters migration: {e}")
+            try:
+                with maintenance_engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ({POST_SEARCH_VECTOR_SQL}) STORED;"))
+                    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_posts_search_vector ON posts USING GIN (search_vector);"))
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Could not apply search_vector migration: {e}")
+            try:
+                # Busca aproximada (app/search.py): pg_trgm + unaccent. f_unaccent é um wrapper IMMUTABLE
+                # de unaccent(), necessário para que possa ser usado nos índices de expressão.
+                with maintenance_engine.begin() as conn:
+                    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm;"))
+                    conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent;"))
+                    conn.execute(text(
+                        "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text "
+                        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+                        "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;"
+                    ))
+                    for index_name, table, column in TRIGRAM_INDEXES:
+                        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} USING GIN (lower(f_unaccent({column})) gin_trgm_ops);"))
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Could not apply trigram search migration (fuzzy search disabled): {e}")
+            try:
+                backfilled = self.recompute_hot_scores(only_missing=True)
+                if backfilled:
+                    logging.getLogger(__name__).info(f"hot_score calculado para {backfilled} posts.")
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Could not backfill hot_score: {e}")
+            try:
+                applied = apply_migrations(maintenance_engine)
+                if applied:
+                    logging.getLogger(__name__).info(f"Migrações aplicadas: {applied}")
+                if REACTIONS_MIGRATION in applied:
+                    # Reações duplicadas foram descartadas na cópia, então os contadores são recalculados
+                    self.reconcile_counters()
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Could not apply versioned migrations: {e}")
+            try:
+                # Partições dos próximos meses (as que faltarem também são criadas por `flask interactions partitions`)
+                months_ahead = current_app.config.get('INTERACTIONS_PARTITIONS_AHEAD', 3) if current_app else 3
+                with maintenance_engine.begin() as conn:
+                    if is_partitioned(conn):
+                        created = ensure_partitions(conn, months_ahead=months_ahead)
+                        if created:
+                            logging.getLogger(__name__).info(f"Partições criadas: {created}")
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Could not create interactions partitions: {e}")
             logging.getLogger(__name__).info("Tabelas criadas ou já existentes no PostgreSQL.")
         except OperationalError as e:
             logging.getLogger(__name__).error(f"Erro ao conectar ou criar tabelas: {e}")
@@ -391,6 +1045,7 @@ class DatabaseManager:
                     new_profile = UserDetails(user_id=user.id)
                     db.add(new_profile)
                     db.commit()
+                    self._notify('user_activated', user_id=user.id, username=user.username)
                     return True # Verdadeiro se o usuário foi devidamente ativado
                 except Exception as e:
                     logging.getLogger(__name__).error(f"Erro na ativação do usuário: {e}")
@@ -531,6 +1186,30 @@ class DatabaseManager:
                 Interaction.id == interaction_id
             ).first()
 
+    def create_post(self, user_id: int, title: str, content: str, tag: str, optional_tags: str = None, image_urls: list | None = None):
+        """Cria um post. Retorna (True, id) em sucesso ou (False, mensagem) em erro."""
+        with self.get_db() as db:
+            try:
+                created_at = datetime.now()
+                new_post = Post(
+                    user_id=user_id,
+                    title=title,
+                    content=content,
+                    tag=tag,
+                    optional_tags=optional_tags,
+                    image_urls=json.dumps(image_urls) if image_urls else None,
+                    created_at=created_at,
+                    hot_score=calculate_hot_score(0, 0, 0, created_at)
+                )
+                db.add(new_post)
+                db.commit()
+                db.refresh(new_post) # Recarrega o objeto para ter o ID gerado pelo DB
+            except Exception as e:
+                db.rollback()
+                return False, str(e)
+            self._notify('post_created', post=new_post)
+            return True, new_post.id
+
     def delete_post_by_id(self, id):
         """Deleta posts pelo seu ID"""
         with self.get_db() as db:
@@ -538,9 +1217,34 @@ class DatabaseManager:
             if post:
                 post.is_deleted = True
                 db.commit()
+                self._notify('post_deleted', post_id=id)
                 return True
             return False
     
+    def delete_comment(self, interaction_id: int):
+        """Exclui definitivamente um comentário ou resposta (e suas respostas e reações)."""
+        with self.get_db() as db:
+            interaction = db.query(Interaction).filter(
+                Interaction.id == interaction_id,
+                Interaction.type.in_(['comment_post', 'reply_comment'])
+            ).first()
+            if not interaction:
+                return False
+            try:
+                self._bump_counters(db, interaction.type, interaction.post_id, interaction.parent_interaction_id, -1)
+                thread_ids = [interaction_id] + [reply.id for reply in interaction.child_interactions]
+                db.query(Reaction).filter(
+                    Reaction.target_type == 'comment',
+                    Reaction.target_id.in_(thread_ids)
+                ).delete(synchronize_session=False)
+                db.delete(interaction)
+                db.commit()
+                return True
+            except Exception as e:
+                db.rollback()
+                logging.getLogger(__name__).error(f"Erro ao excluir comentário {interaction_id}: {e}")
+                return False
+
     def delete_interaction_by_id(self, interaction_id):
         """Deleta posts pelo seu ID"""
         with self.get_db() as db:
@@ -551,77 +1255,117 @@ class DatabaseManager:
                 return True
             return False
 
+    def _toggle_reaction(self, user_id: int, target_type: str, target_id: int, reaction_type: str):
+        """
+        Alterna a reação do usuário a um alvo com TOGGLE_REACTION_SQL (uma instrução, um commit).
+        Retorna (post_id, tipo_antigo, tipo_novo); post_id é None se o alvo não existir e
+        tipo_antigo == tipo_novo == None se nada mudou (o mesmo clique já tinha sido gravado).
+        """
+        target = REACTION_TARGETS[target_type]
+        like_type, dislike_type = target['types']
+        with self.get_db() as db:
+            try:
+                row = db.execute(
+                    text(TOGGLE_REACTION_SQL.format(target=target['target'], counters=target['counters'])),
+                    {
+                        'user_id': user_id,
+                        'target_type': target_type,
+                        'target_id': target_id,
+                        'reaction_type': reaction_type,
+                        'opposite_type': dislike_type if reaction_type == like_type else like_type,
+                        'like_type': like_type,
+                        'dislike_type': dislike_type
+                    }
+                ).one()
+                db.commit()
+                return row.post_id, row.old_type, row.new_type
+            except Exception as e:
+                db.rollback()
+                logging.getLogger(__name__).error(f"Erro ao alternar reação {reaction_type} de {user_id} em {target_type}:{target_id}: {e}")
+                raise
+
+    def _toggle_or_buffer_reaction(self, user_id: int, target_type: str, target_id: int, reaction_type: str):
+        if self.reaction_buffer is not None:
+            return self.reaction_buffer.toggle(user_id, target_type, target_id, reaction_type)
+        return self._toggle_reaction(user_id, target_type, target_id, reaction_type)
+
+    def get_reaction_state(self, user_id: int, target_type: str, target_id: int):
+        """Retorna (post_id, tipo_da_reação_ou_None) em uma consulta; post_id é None se o alvo não existir."""
+        with self.get_db() as db:
+            row = db.execute(
+                text(REACTION_STATE_SQL.format(target=REACTION_TARGETS[target_type]['target'])),
+                {'user_id': user_id, 'target_type': target_type, 'target_id': target_id}
+            ).one()
+            return row.post_id, row.type
+
+    def apply_reactions(self, reactions):
+        """
+        Grava em uma instrução e um commit o estado final de várias reações:
+        [(user_id, target_type, target_id, tipo_ou_None)], sem repetir (user_id, target_type, target_id).
+        Retorna quantas reações mudaram de fato.
+        """
+        if not reactions:
+            return 0
+        user_ids, target_types, target_ids, types = (list(column) for column in zip(*reactions))
+        with self.get_db() as db:
+            try:
+                changed = db.execute(text(APPLY_REACTIONS_SQL), {
+                    'user_ids': user_ids, 'target_types': target_types, 'target_ids': target_ids, 'types': types
+                }).scalar()
+                db.commit()
+                return changed
+            except Exception:
+                db.rollback()
+                raise
+
+    def _with_pending_counts(self, target_type: str, target_id: int, likes: int, dislikes: int):
+        """Soma às contagens gravadas as reações ainda pendentes no ReactionBuffer."""
+        if self.reaction_buffer is None:
+            return likes, dislikes
+        pending_likes, pending_dislikes = self.reaction_buffer.count_delta(target_type, target_id)
+        return likes + pending_likes, dislikes + pending_dislikes
+
+    def _with_pending_reaction(self, user_id: int, target_type: str, target_id: int, stored_type):
+        """Tipo da reação do usuário considerando o ReactionBuffer (None = sem reação)."""
+        if self.reaction_buffer is None or not user_id:
+            return stored_type
+        pending, pending_type = self.reaction_buffer.pending_reaction(user_id, target_type, target_id)
+        return pending_type if pending else stored_type
+
     def toggle_post_reaction(self, user_id: int, post_id: int, reaction_type: str):
         """
         Registra, atualiza ou remove uma reação (like/dislike) a um post.
         reaction_type pode ser 'like_post' ou 'dislike_post'.
         """
-        with self.get_db() as db:
-            # 1. Verificar se o usuário já tem uma reação a este post
-            existing_reaction = db.query(Interaction).filter(
-                Interaction.user_id == user_id,
-                Interaction.post_id == post_id,
-                Interaction.type.in_(['like_post', 'dislike_post']), 
-                Interaction.parent_interaction_id == None # Apenas reações diretas ao post
-            ).first()
-
-            if existing_reaction:
-                if existing_reaction.type == reaction_type:
-                    # Se a reação existente for do mesmo tipo, o usuário está "desfazendo" a reação.
-                    db.delete(existing_reaction)
-                    db.commit()
-                    return True, ""
-                else:
-                    # Se a reação existente for de um tipo diferente, o usuário está "trocando" a reação.
-                    existing_reaction.type = reaction_type
-                    existing_reaction.timestamp = datetime.now() # Atualiza o timestamp da interação
-                    db.commit()
-                    return True, reaction_type
-            else:
-                # Se não houver reação existente, crie uma nova.
-                success, result = self._register_interaction(user_id, post_id, reaction_type, None, None)
-                if not success:
-                    return False, result
-                return True, reaction_type
+        try:
+            found, old_type, new_type = self._toggle_or_buffer_reaction(user_id, 'post', post_id, reaction_type)
+        except Exception as e:
+            return False, str(e)
+        if found is None:
+            return False, "Post não encontrado."
+        if old_type is None and new_type is None:
+            return True, reaction_type # Clique repetido: a reação já estava gravada
+        self._notify('post_reaction', user_id=user_id, post_id=post_id, old_type=old_type, new_type=new_type)
+        return True, new_type or ""
 
     def toggle_comment_reaction(self, user_id: int, comment_id: int, reaction_type: str):
         """
         Registra, atualiza ou remove uma reação (like/dislike) a um comentário.
         reaction_type pode ser 'like_comment' ou 'dislike_comment'.
         """
-        with self.get_db() as db:
-            comment_target = db.query(Interaction).filter(
-                Interaction.id == comment_id, 
-                Interaction.type.in_(['comment_post', 'reply_comment'])
-            ).first()
-
-            if not comment_target:
-                return False, "Comentário alvo não encontrado ou inválido."
-
-            existing_reaction = db.query(Interaction).filter(
-                Interaction.user_id == user_id,
-                Interaction.parent_interaction_id == comment_id,
-                Interaction.type.in_(['like_comment', 'dislike_comment']) 
-            ).first()
-
-            if existing_reaction:
-                if existing_reaction.type == reaction_type:
-                    # Se a reação existente for do mesmo tipo, o usuário está "desfazendo" a reação.
-                    db.delete(existing_reaction)
-                    db.commit()
-                    return True, "Reação ao comentário removida com sucesso!"
-                else:
-                    # Se a reação existente for de um tipo diferente, o usuário está "trocando" a reação.
-                    existing_reaction.type = reaction_type
-                    existing_reaction.timestamp = datetime.now()
-                    db.commit()
-                    return True, f"Reação ao comentário alterada para '{reaction_type}' com sucesso!"
-            else:
-                # Se não houver reação existente, crie uma nova.
-                success, result = self._register_interaction(user_id, comment_target.post_id, reaction_type, None, comment_id)
-                if not success:
-                    return False, result
-                return True, f"Reação '{reaction_type}' ao comentário registrada com sucesso!"
+        try:
+            post_id, old_type, new_type = self._toggle_or_buffer_reaction(user_id, 'comment', comment_id, reaction_type)
+        except Exception as e:
+            return False, str(e)
+        if post_id is None:
+            return False, "Comentário alvo não encontrado ou inválido."
+        if new_type is None and old_type is not None:
+            return True, "Reação ao comentário removida com sucesso!"
+        if old_type is not None:
+            return True, f"Reação ao comentário alterada para '{reaction_type}' com sucesso!"
+        if new_type is not None:
+            self._notify('interaction_registered', user_id=user_id, post_id=post_id, interaction_type=reaction_type, interaction_id=None)
+        return True, f"Reação '{reaction_type}' ao comentário registrada com sucesso!"
 
     def register_reply_to_comment(self, user_id: int, parent_comment_id: int, reply_text: str):
         """Registra uma resposta a um comentário existente."""
@@ -665,181 +1409,205 @@ class DatabaseManager:
             return comment
     
     def count_reactions_for_post(self, post_id: int, reaction_type: str):
-        """Conta o número de likes/dislikes para um post."""
+        """Conta o número de likes/dislikes para um post (lido do contador desnormalizado, mais as reações pendentes)."""
+        if reaction_type not in ('like_post', 'dislike_post'):
+            return 0
         with self.get_db() as db:
-            return db.query(Interaction).filter(
-                Interaction.post_id == post_id,
-                Interaction.type == reaction_type,
-                Interaction.parent_interaction_id == None # Apenas reações diretas ao post
-            ).count()
+            row = db.query(Post.like_count, Post.dislike_count).filter(Post.id == post_id).first()
+        likes, dislikes = self._with_pending_counts('post', post_id, *(row or (0, 0)))
+        return likes if reaction_type == 'like_post' else dislikes
 
     def count_comments_for_post(self, post_id: int):
-        """Conta o número de comentários para um post específico."""
+        """Conta o número de comentários para um post específico (lido do contador desnormalizado)."""
         with self.get_db() as db:
-            return db.query(Interaction).filter(
-                Interaction.post_id == post_id,
-                Interaction.type == 'comment_post',
-                Interaction.parent_interaction_id == None # Apenas comentários de nível superior
-            ).count()
+            return db.query(Post.comment_count).filter(Post.id == post_id).scalar() or 0
 
     def count_reactions_for_comment(self, comment_id: int, reaction_type: str):
-        """Conta o número de likes/dislikes para um comentário."""
+        """Conta o número de likes/dislikes para um comentário (lido do contador desnormalizado, mais as reações pendentes)."""
+        if reaction_type not in ('like_comment', 'dislike_comment'):
+            return 0
         with self.get_db() as db:
-            return db.query(Interaction).filter(
-                Interaction.parent_interaction_id == comment_id,
-                Interaction.type == reaction_type
-            ).count()
+            row = db.query(Interaction.like_count, Interaction.dislike_count).filter(Interaction.id == comment_id).first()
+        likes, dislikes = self._with_pending_counts('comment', comment_id, *(row or (0, 0)))
+        return likes if reaction_type == 'like_comment' else dislikes
 
-    def get_user_post_reaction(self, user_id: int, post_id: int):
-        """Obtém a reação do usuário a um post."""
+    def _get_user_reaction(self, user_id: int, target_type: str, target_id: int):
         with self.get_db() as db:
-            return db.query(Interaction).filter(
-                Interaction.user_id == user_id,
-                Interaction.post_id == post_id,
-                Interaction.type.in_(['like_post', 'dislike_post']),
-                Interaction.parent_interaction_id == None
+            reaction = db.query(Reaction).filter(
+                Reaction.user_id == user_id,
+                Reaction.target_type == target_type,
+                Reaction.target_id == target_id
             ).first()
+        if self.reaction_buffer is not None and user_id:
+            pending, pending_type = self.reaction_buffer.pending_reaction(user_id, target_type, target_id)
+            if pending:
+                # Reação ainda não gravada: objeto transitório com o estado pendente
+                return Reaction(user_id=user_id, target_type=target_type, target_id=target_id, type=pending_type) if pending_type else None
+        return reaction
+
+    def get_user_post_reaction(self, user_id: int, post_id: int):
+        """Obtém a reação (Reaction) do usuário a um post."""
+        return self._get_user_reaction(user_id, 'post', post_id)
 
     def get_user_comment_reaction(self, user_id: int, comment_id: int):
-        """Obtém a reação (like/dislike) de um usuário a um comentário ou resposta."""
+        """Obtém a reação (Reaction) de um usuário a um comentário ou resposta."""
+        return self._get_user_reaction(user_id, 'comment', comment_id)
+
+    def get_user_comment_reactions(self, user_id: int, interaction_ids):
+        """Reações de um usuário a vários comentários/respostas em uma consulta: {interaction_id: tipo}."""
+        if not user_id or not interaction_ids:
+            return {}
         with self.get_db() as db:
-            return db.query(Interaction).filter(
-                Interaction.user_id == user_id,
-                Interaction.parent_interaction_id == comment_id, # Associa a um comentário/resposta pai
-                Interaction.type.in_(['like_comment', 'dislike_comment']) 
-            ).first()
+            reactions = dict(db.query(Reaction.target_id, Reaction.type).filter(
+                Reaction.user_id == user_id,
+                Reaction.target_type == 'comment',
+                Reaction.target_id.in_(interaction_ids)
+            ).all())
+        if self.reaction_buffer is not None:
+            for interaction_id in interaction_ids:
+                reaction_type = self._with_pending_reaction(user_id, 'comment', interaction_id, reactions.get(interaction_id))
+                if reaction_type:
+                    reactions[interaction_id] = reaction_type
+                else:
+                    reactions.pop(interaction_id, None)
+        return reactions
 
     # Método para obter comentários paginados por like
-    def get_paginated_comments(self, post_id, offset=0, limit=5):
-        # Subconsulta para contar os likes de cada comentário
+    def get_paginated_comments(self, post_id, after=None, limit=5):
+        """
+        Retorna [(comentário, likes, dislikes, respostas)] de um post, ordenados por likes.
+        As contagens vêm dos contadores desnormalizados, então nenhuma reação é reagregada.
+        A paginação é por cursor: `after` é a chave (likes, timestamp, id) do último comentário
+        da página anterior, e a próxima página começa logo depois dela (índice ix_interactions_comment_order).
+        """
         with self.get_db() as db:
-            likes_count_subquery = db.query( # Conta quantas Interaction.id existem para Interaction.parent_interaction_id
-                Interaction.parent_interaction_id, 
-                func.count(Interaction.id).label('num_likes')
-            ).filter(
-                Interaction.type == 'like_comment',
-                Interaction.post_id == post_id
-            ).group_by(Interaction.parent_interaction_id).subquery() # Agrupa por Interaction.parent_interaction_id para contar os likes de cada comentário
-
-            dislikes_count_subquery = db.query(
-                Interaction.parent_interaction_id,
-                func.count(Interaction.id).label('num_dislikes')
-            ).filter(
-                Interaction.type == 'dislike_comment',
-                Interaction.post_id == post_id
-            ).group_by(Interaction.parent_interaction_id).subquery()
-            
-            replies_count_subquery = db.query(
-                Interaction.parent_interaction_id,
-                func.count(Interaction.id).label('num_replies')
-            ).filter(
-                Interaction.post_id == post_id,
-                Interaction.type == 'reply_comment'
-            ).group_by(Interaction.parent_interaction_id).subquery()
-
-            # Query principal para buscar os comentários
             comments = db.query(
-                Interaction, # Inclui a tabela de Interação
-                func.coalesce(likes_count_subquery.c.num_likes, 0).label('num_likes'), # Coalesce para garantir que comentários sem likes retornem 0, sem isso o LEFT JOIN retornaria None. Label é o nome da coluna.
-                func.coalesce(dislikes_count_subquery.c.num_dislikes, 0).label('num_dislikes'),
-                func.coalesce(replies_count_subquery.c.num_replies, 0).label('num_replies')
+                Interaction,
+                Interaction.like_count.label('num_likes'),
+                Interaction.dislike_count.label('num_dislikes'),
+                Interaction.reply_count.label('num_replies')
             ).options(
                 joinedload(Interaction.user_who_interacted)
             ).filter(
                 Interaction.post_id == post_id,
-                Interaction.type == 'comment_post',
-                Interaction.parent_interaction_id == None # Apenas comentários de nível superior
-            ).outerjoin( # Usa OUTER JOIN para garantir que comentários sem likes ainda sejam retornados. Se fosse INNER JOIN, comentários sem likes seriam excluídos.
-                likes_count_subquery, 
-                Interaction.id == likes_count_subquery.c.parent_interaction_id # A condição de junção é que o ID do comentário deve corresponder ao parent_interaction_id da subconsulta
-            ).outerjoin(
-                dislikes_count_subquery,
-                Interaction.id == dislikes_count_subquery.c.parent_interaction_id
-            ).outerjoin(
-                replies_count_subquery,
-                Interaction.id == replies_count_subquery.c.parent_interaction_id
-            ).order_by(
-                desc('num_likes'), # Ordena pelos likes, do maior para o menor
-                desc(Interaction.timestamp) # Critério de desempate
-            ).offset(offset).limit(limit).all()
-            
-            return comments
+                Interaction.parent_interaction_id == None, # Apenas comentários de nível superior
+                Interaction.type == 'comment_post'
+            )
+            return self._thread_page(comments, after, limit)
         
-    # Método para obter comentários paginados por like
-    def get_paginated_replies(self, post_id, comment_id, offset=0, limit=5):
-        # Subconsulta para contar os likes de cada resposta
+    # Método para obter respostas paginadas por like
+    def get_paginated_replies(self, post_id, comment_id, after=None, limit=5):
+        """Retorna [(resposta, likes, dislikes)] de um comentário, ordenadas por likes (mesma paginação por cursor dos comentários, índice ix_interactions_reply_order)."""
         with self.get_db() as db:
-            likes_count_subquery = db.query(
-                Interaction.parent_interaction_id,
-                func.count(Interaction.id).label('num_likes')
-            ).filter(
-                Interaction.type == 'like_comment',
-                Interaction.post_id == post_id
-            ).group_by(Interaction.parent_interaction_id).subquery()
-
-            dislikes_count_subquery = db.query(
-                Interaction.parent_interaction_id,
-                func.count(Interaction.id).label('num_dislikes')
-            ).filter(
-                Interaction.type == 'dislike_comment',
-                Interaction.post_id == post_id
-            ).group_by(Interaction.parent_interaction_id).subquery()
-
-            # Query principal para buscar as respostas/replies
             replies = db.query(
-                Interaction, # Inclui a tabela de Interação
-                func.coalesce(likes_count_subquery.c.num_likes, 0).label('num_likes'), # Coalesce para garantir que respostas sem likes retornem 0, sem isso o LEFT JOIN retornaria None. Label é o nome da coluna.
-                func.coalesce(dislikes_count_subquery.c.num_dislikes, 0).label('num_dislikes')
+                Interaction,
+                Interaction.like_count.label('num_likes'),
+                Interaction.dislike_count.label('num_dislikes')
             ).options(
                 joinedload(Interaction.user_who_interacted)
             ).filter(
                 Interaction.post_id == post_id,
-                Interaction.type == 'reply_comment',
-                Interaction.parent_interaction_id == comment_id # Reply do comentário específico
-            ).outerjoin( # Usa OUTER JOIN para garantir que respostas sem likes ainda sejam retornados. Se fosse INNER JOIN, respostas sem likes seriam excluídos.
-                likes_count_subquery, 
-                Interaction.id == likes_count_subquery.c.parent_interaction_id # A condição de junção é que o ID da resposta deve corresponder ao parent_interaction_id da subconsulta
-            ).outerjoin(
-                dislikes_count_subquery,
-                Interaction.id == dislikes_count_subquery.c.parent_interaction_id
-            ).order_by(
-                desc('num_likes'), # Ordena pelos likes, do maior para o menor
-                desc(Interaction.timestamp) # Critério de desempate
+                Interaction.parent_interaction_id == comment_id, # Reply do comentário específico
+                Interaction.type == 'reply_comment'
             )
-            
-            if limit and limit > 0:
-                replies = replies.offset(offset).limit(limit)
-            
-            replies = replies.all()
-            return replies
+            return self._thread_page(replies, after, limit)
+
+    def _thread_page(self, query, after, limit):
+        """
+        Aplica a ordem (likes desc, timestamp desc, id desc) e o cursor `after` a uma consulta de
+        comentários/respostas. O id desempata comentários com o mesmo número de likes e a mesma data,
+        então nenhuma linha se repete ou é pulada entre páginas. A ordem e o cursor usam os contadores
+        gravados; só as contagens exibidas incluem as reações pendentes do ReactionBuffer.
+        """
+        if after:
+            likes, timestamp, interaction_id = after
+            query = query.filter(
+                tuple_(Interaction.like_count, Interaction.timestamp, Interaction.id) < tuple_(likes, timestamp, interaction_id)
+            )
+        rows = query.order_by(
+            desc(Interaction.like_count), # Ordena pelos likes, do maior para o menor
+            desc(Interaction.timestamp), # Critério de desempate
+            desc(Interaction.id)
+        ).limit(limit).all()
+        if self.reaction_buffer is None:
+            return rows
+        return [(row[0], *self._with_pending_counts('comment', row[0].id, row[1], row[2]), *row[3:]) for row in rows]
     
+    def get_top_replies(self, comment_ids, viewer_id: int = None):
+        """
+        Retorna a resposta mais curtida de cada comentário de `comment_ids` em uma única consulta
+        (ROW_NUMBER() por comentário, na mesma ordem de get_paginated_replies), junto com a reação
+        do usuário `viewer_id` a essa resposta.
+        Formato: {comment_id: (resposta, likes, dislikes, tipo_da_reação_ou_None)}
+        """
+        if not comment_ids:
+            return {}
+        with self.get_db() as db:
+            ranked = db.query(
+                Interaction.id,
+                func.row_number().over(
+                    partition_by=Interaction.parent_interaction_id,
+                    order_by=(desc(Interaction.like_count), desc(Interaction.timestamp), desc(Interaction.id))
+                ).label('position')
+            ).filter(
+                Interaction.type == 'reply_comment',
+                Interaction.parent_interaction_id.in_(comment_ids)
+            ).subquery()
+
+            rows = db.query(
+                Interaction,
+                Interaction.like_count,
+                Interaction.dislike_count,
+                Reaction.type
+            ).join(
+                ranked, ranked.c.id == Interaction.id
+            ).outerjoin(
+                Reaction,
+                (Reaction.user_id == viewer_id) &
+                (Reaction.target_type == 'comment') &
+                (Reaction.target_id == Interaction.id)
+            ).options(
+                joinedload(Interaction.user_who_interacted)
+            ).filter(ranked.c.position == 1).all()
+
+            return {
+                reply.parent_interaction_id: (
+                    reply,
+                    *self._with_pending_counts('comment', reply.id, likes, dislikes),
+                    self._with_pending_reaction(viewer_id, 'comment', reply.id, reaction)
+                )
+                for reply, likes, dislikes, reaction in rows
+            }
+
     def get_posts_with_most_likes(self, offset: int = 0, limit: int = 10):
+        """Retorna os IDs dos posts em alta, ordenados pelo hot_score (índice ix_posts_hot_score_id), para hydrate_posts."""
         with self.get_db() as db:
-            return db.query(Post).filter(Post.is_deleted == False).options(joinedload(Post.author_user).joinedload(UserDetails.user)).offset(offset).limit(limit).all()
+            rows = db.query(Post.id).filter(Post.is_deleted == False).order_by(Post.hot_score.desc().nullslast(), Post.id.desc()).offset(offset).limit(limit).all()
+            return [post_id for (post_id,) in rows]
     
     def get_comment_amount_for_post(self, post_id: int):
         """Conta o número de comentários para um post específico."""
-        with self.get_db() as db:
-            return db.query(Interaction).filter(
-                Interaction.post_id == post_id,
-                Interaction.type == 'comment_post',
-                Interaction.parent_interaction_id == None # Apenas comentários de nível superior
-            ).count()
+        return self.count_comments_for_post(post_id)
 
     def get_reply_amout_for_comment(self, post_id: int, comment_id: int):
-        """Conta o número de respostas para um comentário específico."""
+        """Conta o número de respostas para um comentário específico (lido do contador desnormalizado)."""
         with self.get_db() as db:
-            return db.query(Interaction).filter(
-                Interaction.post_id == post_id,
-                Interaction.type == 'reply_comment',
-                Interaction.parent_interaction_id == comment_id
-            ).count()
+            return db.query(Interaction.reply_count).filter(
+                Interaction.id == comment_id,
+                Interaction.post_id == post_id
+            ).scalar() or 0
 
     def get_user_posts(self, user_id):
         with self.get_db() as db:
             posts = db.query(Post).filter(Post.user_id == user_id, Post.is_deleted == False).options(joinedload(Post.author_user).joinedload(UserDetails.user)).order_by(Post.created_at.desc()).all()
             return posts
 
+    def get_user_post_ids(self, user_id):
+        """Retorna os IDs dos posts do usuário, mais recentes primeiro, para hydrate_posts."""
+        with self.get_db() as db:
+            rows = db.query(Post.id).filter(Post.user_id == user_id, Post.is_deleted == False).order_by(Post.created_at.desc()).all()
+            return [post_id for (post_id,) in rows]
+
     def toggle_save_post(self, user_id: int, post_id: int):
         """Adiciona ou remove um post salvo para um usuário.
         Retorna (True, 'saved') se salvo, (True, 'unsaved') se removido, (False, mensagem) em erro.
@@ -865,23 +1633,14 @@ class DatabaseManager:
                 db.rollback()
                 return False, f'Erro ao alternar salvamento: {e}'
 
-    def get_saved_posts(self, user_id: int):
-        """Retorna lista de posts salvos por um usuário, ordenados por data de salvamento desc."""
-        with self.get_db() as db:
-            saved_entries = db.query(SavedPost).filter(SavedPost.user_id == user_id).order_by(SavedPost.created_at.desc()).all()
-            posts = []
-            for entry in saved_entries:
-                post = db.query(Post).filter(Post.id == entry.post_id, Post.is_deleted == False).options(joinedload(Post.author_user).joinedload(UserDetails.user)).first()
-                if post:
-                    if post.image_urls:
-                        try:
-                            post.image_urls = json.loads(post.image_urls)
-                        except Exception:
-                            post.image_urls = []
-                    else:
-                        post.image_urls = []
-                    posts.append(post)
-            return posts
+    def get_saved_post_ids(self, user_id: int):
+        """Retorna os IDs dos posts salvos por um usuário, ordenados por data de salvamento desc, para hydrate_posts."""
+        with self.get_db() as db:
+            rows = db.query(SavedPost.post_id).join(Post, Post.id == SavedPost.post_id).filter(
+                SavedPost.user_id == user_id,
+                Post.is_deleted == False
+            ).order_by(SavedPost.created_at.desc()).all()
+            return [post_id for (post_id,) in rows]
 
     def is_post_saved(self, user_id: int, post_id: int):
         """Retorna True se o post estiver salvo pelo usuário, False caso contrário."""
@@ -891,6 +1650,119 @@ class DatabaseManager:
             existing = db.query(SavedPost).filter(SavedPost.user_id == user_id, SavedPost.post_id == post_id).first()
             return True if existing else False
 
+    def hydrate_posts(self, post_ids, viewer_id: int = None):
+        """
+        Carrega tudo o que um card de post precisa para uma lista de IDs em um número fixo de consultas
+        (posts + autores e contadores, reação e salvos do usuário), em vez de várias consultas por post.
+        Retorna uma lista de dicts na mesma ordem de `post_ids`, ignorando posts inexistentes ou excluídos:
+        {'post', 'likes', 'dislikes', 'comments', 'user_reaction', 'is_saved'}
+        """
+        post_ids = list(dict.fromkeys(post_ids)) # Remove repetidos mantendo a ordem
+        if not post_ids:
+            return []
+        with self.get_db() as db:
+            posts = db.query(Post).filter(
+                Post.id.in_(post_ids),
+                Post.is_deleted == False
+            ).options(joinedload(Post.author_user).joinedload(UserDetails.user)).all()
+
+            reactions, saved = {}, set()
+            if viewer_id:
+                reactions = dict(db.query(Reaction.target_id, Reaction.type).filter(
+                    Reaction.user_id == viewer_id,
+                    Reaction.target_type == 'post',
+                    Reaction.target_id.in_(post_ids)
+                ).all())
+                saved = {post_id for (post_id,) in db.query(SavedPost.post_id).filter(
+                    SavedPost.user_id == viewer_id,
+                    SavedPost.post_id.in_(post_ids)
+                ).all()}
+
+        posts_by_id = {post.id: post for post in posts}
+        hydrated = []
+        for post_id in post_ids:
+            post = posts_by_id.get(post_id)
+            if not post:
+                continue
+            try:
+                post.image_urls = json.loads(post.image_urls) if post.image_urls else []
+            except Exception:
+                post.image_urls = []
+            likes, dislikes = self._with_pending_counts('post', post_id, post.like_count, post.dislike_count)
+            hydrated.append({
+                'post': post,
+                'likes': likes,
+                'dislikes': dislikes,
+                'comments': post.comment_count,
+                'user_reaction': self._with_pending_reaction(viewer_id, 'post', post_id, reactions.get(post_id)) or "",
+                'is_saved': post_id in saved
+            })
+        return hydrated
+
+    def save_user_feed(self, user_id: int, ranked_posts):
+        """Substitui o feed pré-computado do usuário por `ranked_posts` ([(post_id, score)] já ordenado)."""
+        with self.get_db() as db:
+            try:
+                db.query(UserFeed).filter(UserFeed.user_id == user_id).delete(synchronize_session=False)
+                db.add_all([
+                    UserFeed(user_id=user_id, post_id=post_id, score=score, position=position)
+                    for position, (post_id, score) in enumerate(ranked_posts)
+                ])
+                db.commit()
+                return True
+            except Exception as e:
+                db.rollback()
+                logging.getLogger(__name__).error(f"Erro ao salvar feed do usuário {user_id}: {e}")
+                return False
+
+    def get_user_feed(self, user_id: int, limit: int = 20):
+        """Retorna os IDs do feed pré-computado do usuário, na ordem do ranking."""
+        with self.get_db() as db:
+            # Posts inseridos depois do cálculo (insert_post_into_feeds) dividem a posição com o seguinte
+            rows = db.query(UserFeed.post_id).filter(UserFeed.user_id == user_id).order_by(
+                UserFeed.position, UserFeed.score.desc(), UserFeed.post_id.desc()
+            ).limit(limit).all()
+            return [post_id for (post_id,) in rows]
+
+    def get_user_ids_with_feed(self):
+        """Retorna os IDs dos usuários que possuem feed pré-computado."""
+        with self.get_db() as db:
+            return [user_id for (user_id,) in db.query(UserFeed.user_id).distinct().all()]
+
+    def remove_post_from_feeds(self, post_id: int):
+        """Remove um post de todos os feeds pré-computados."""
+        with self.get_db() as db:
+            db.query(UserFeed).filter(UserFeed.post_id == post_id).delete(synchronize_session=False)
+            db.commit()
+
+    def insert_post_into_feeds(self, post_id: int, scores, default_score: float, feed_size: int):
+        """
+        Insere um post novo nos feeds pré-computados em que ele alcança as `feed_size` primeiras posições.
+        `scores` é {user_id: score} de quem tem pontuação própria; os demais feeds usam `default_score`.
+        Retorna quantos feeds receberam o post.
+        """
+        with self.get_db() as db:
+            try:
+                changed = db.execute(text(INSERT_POST_INTO_FEEDS_SQL), {
+                    'post_id': post_id, 'user_ids': list(scores), 'scores': list(scores.values()),
+                    'default_score': default_score, 'feed_size': feed_size
+                }).rowcount
+                db.commit()
+                return changed
+            except Exception:
+                db.rollback()
+                raise
+
+    def get_feed_users_by_tag(self, tags):
+        """Retorna {tag: {user_id}} dos usuários com feed que já interagiram com posts de cada tag."""
+        users_by_tag = defaultdict(set)
+        tags = [tag for tag in tags if tag]
+        if tags:
+            with self.get_db() as db:
+                for user_id, tag in db.execute(text(FEED_USERS_BY_TAG_SQL), {'tags': tags}):
+                    users_by_tag[tag].add(user_id)
+        return users_by_tag
+
     def get_user_comments_n_replies(self, user_id):
         with self.get_db() as db:
             interactions = db.query(Interaction).filter(Interaction.user_id == user_id, Interaction.type.in_(['reply_comment', 'comment_post'])).order_by(Interaction.timestamp.desc()).all()
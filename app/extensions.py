@@ -5,12 +5,55 @@ from functools import wraps
 from datetime import datetime
 from app.database import DatabaseManager, User, ModerationHistory
 from app.email_service import EmailService
+from app.recommendation import RecommendationEngine, CollaborativeFilteringStrategy, ContentBasedStrategy, ItemSimilarityStrategy, LikeMatrix, PopularityPrior, TagIndex
+from app.feed import FeedRefresher
+from app.search import SearchService, SuggestionIndex
+from app.reactions import ReactionBuffer
 import boto3
 
 # Inicializando serviços
 email_service = EmailService()
 db_manager  = DatabaseManager()
 
+# Matriz de likes mantida em memória e atualizada a cada reação
+like_matrix = LikeMatrix(db_manager)
+db_manager.add_listener('post_reaction', like_matrix.on_post_reaction)
+db_manager.add_listener('post_deleted', like_matrix.on_post_deleted)
+
+# Candidatos "frios" com pontuação base de frescor e popularidade
+popularity_prior = PopularityPrior(db_manager)
+db_manager.add_listener('post_created', popularity_prior.on_post_created)
+db_manager.add_listener('post_deleted', popularity_prior.on_post_deleted)
+
+# Índice de categorias mantido em memória e atualizado a cada post criado ou deletado
+tag_index = TagIndex(db_manager)
+db_manager.add_listener('post_created', tag_index.on_post_created)
+db_manager.add_listener('post_deleted', tag_index.on_post_deleted)
+
+# Inicializa o sistema de recomendação e registra as estratégias
+recommendation_engine = RecommendationEngine(db_manager)
+recommendation_engine.register_strategy(CollaborativeFilteringStrategy(db_manager, like_matrix, popularity_prior))
+recommendation_engine.register_strategy(ContentBasedStrategy(db_manager, tag_index))
+
+# Vizinhança item-item gerada offline (flask recommendations build-similarity)
+item_similarity = ItemSimilarityStrategy(db_manager, like_matrix)
+recommendation_engine.register_strategy(item_similarity)
+
+# Feed pré-computado por usuário, atualizado em segundo plano
+feed_refresher = FeedRefresher(db_manager, recommendation_engine, popularity_prior, tag_index)
+
+# Reações gravadas em lote (opcional, REACTIONS_WRITE_BEHIND)
+reaction_buffer = ReactionBuffer(db_manager)
+
+# Busca de posts (textual + aproximada) com paginação por cursor
+search_service = SearchService(db_manager)
+
+# Autocompletar da busca (prefixos em memória), atualizado com novos posts e usuários
+suggestion_index = SuggestionIndex(db_manager)
+db_manager.add_listener('post_created', suggestion_index.on_post_created)
+db_manager.add_listener('post_deleted', suggestion_index.on_post_deleted)
+db_manager.add_listener('user_activated', suggestion_index.on_user_activated)
+
 class s3Handler:
     def __init__(self, app=None):
         if app is not None:
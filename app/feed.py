@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+class FeedRefresher:
+    """
+    Mantém a tabela user_feed com as recomendações pré-computadas de cada usuário.
+    Novas interações marcam feeds para atualização, que é feita por uma thread em segundo plano
+    (ou pelo comando `flask feed refresh`), fora do caminho da requisição.
+
+    Um post novo não recalcula os feeds: sem likes, a pontuação dele para cada usuário é a base de
+    post novo (PopularityPrior) mais os pesos das suas tags que o usuário já tem no perfil
+    (ContentBasedStrategy, TagIndex), e ele é inserido direto na posição correspondente de cada feed
+    (add_post_to_feeds). Posts excluídos saem dos feeds na mesma thread; sem a thread
+    (FEED_BACKGROUND_REFRESH desligado), os dois casos são tratados na hora.
+    """
+    def __init__(self, db_manager, recommendation_engine, popularity_prior=None, tag_index=None, app=None):
+        self.db_manager = db_manager
+        self.recommendation_engine = recommendation_engine
+        self.popularity_prior = popularity_prior
+        self.tag_index = tag_index
+        self.feed_size = 50
+        self.refresh_delay = 2.0 # Segundos agrupando eventos antes de recalcular
+        self._pending_users = set()
+        self._refresh_all = False
+        self._created_posts = [] # (post_id, tag, optional_tags) ainda não levados aos feeds
+        self._deleted_posts = set()
+        self._condition = threading.Condition()
+        self._worker = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.feed_size = app.config.get('FEED_SIZE', self.feed_size)
+        self.refresh_delay = app.config.get('FEED_REFRESH_DELAY', self.refresh_delay)
+
+        self.db_manager.add_listener('post_reaction', self.on_user_interaction)
+        self.db_manager.add_listener('interaction_registered', self.on_user_interaction)
+        self.db_manager.add_listener('post_created', self.on_post_created)
+        self.db_manager.add_listener('post_deleted', self.on_post_deleted)
+
+        if app.config.get('FEED_BACKGROUND_REFRESH', True):
+            self.start()
+
+    def start(self):
+        """Inicia a thread de atualização em segundo plano (uma por processo)."""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='feed-refresher', daemon=True)
+            self._worker.start()
+
+    # Listeners do DatabaseManager
+    def on_user_interaction(self, user_id, **_):
+        self.schedule(user_id)
+
+    def on_post_created(self, post, **_):
+        if self.popularity_prior is None or self.tag_index is None:
+            self.schedule_all()
+            return
+        if self._worker is None:
+            # Sem a thread (FEED_BACKGROUND_REFRESH desligado), insere na hora
+            self.add_post_to_feeds(post.id, post.tag, post.optional_tags)
+            return
+        with self._condition:
+            self._created_posts.append((post.id, post.tag, post.optional_tags))
+            self._condition.notify()
+
+    def on_post_deleted(self, post_id, **_):
+        if self._worker is None:
+            # Sem a thread (FEED_BACKGROUND_REFRESH desligado), remove na hora
+            self.db_manager.remove_post_from_feeds(post_id)
+            return
+        with self._condition:
+            self._deleted_posts.add(post_id)
+            self._condition.notify()
+
+    def schedule(self, user_id: int):
+        """Marca o feed de um usuário para ser recalculado."""
+        with self._condition:
+            self._pending_users.add(user_id)
+            self._condition.notify()
+
+    def schedule_all(self):
+        """Marca todos os feeds existentes para serem recalculados."""
+        with self._condition:
+            self._refresh_all = True
+            self._condition.notify()
+
+    def refresh_user(self, user_id: int):
+        """Recalcula e persiste o feed de um usuário. Retorna [(post_id, score)]."""
+        ranked = self.recommendation_engine.rank_posts(user_id, top_n=self.feed_size)
+        self.db_manager.save_user_feed(user_id, ranked)
+        return ranked
+
+    def refresh_all(self):
+        """Recalcula o feed de todos os usuários que já possuem um. Retorna a quantidade."""
+        user_ids = self.db_manager.get_user_ids_with_feed()
+        self._refresh_many(user_ids)
+        return len(user_ids)
+
+    def add_post_to_feeds(self, post_id: int, tag: str, optional_tags: str = None):
+        """
+        Insere um post novo nos feeds existentes com a pontuação que o RecommendationEngine daria a
+        ele (ainda sem likes, só as estratégias de frescor e de tags contam). Retorna quantos feeds mudaram.
+        """
+        base_score = self.popularity_prior.new_post_score()
+        scores = defaultdict(lambda: base_score)
+        weights = self.tag_index.post_weights(tag, optional_tags)
+        for t, user_ids in self.db_manager.get_feed_users_by_tag(weights).items():
+            for user_id in user_ids:
+                scores[user_id] += weights[t]
+        return self.db_manager.insert_post_into_feeds(post_id, dict(scores), base_score, self.feed_size)
+
+    def _refresh_many(self, user_ids):
+        for user_id in user_ids:
+            try:
+                self.refresh_user(user_id)
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Erro ao atualizar feed do usuário {user_id}: {e}")
+
+    def get_feed(self, user_id: int, top_n: int = 20):
+        """
+        Retorna os IDs do feed pré-computado. Se o usuário ainda não tem feed
+        (primeiro acesso), ele é calculado na hora e persistido.
+        """
+        post_ids = self.db_manager.get_user_feed(user_id, limit=top_n)
+        if not post_ids:
+            post_ids = [post_id for post_id, score in self.refresh_user(user_id)[:top_n]]
+        return post_ids
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not (self._pending_users or self._refresh_all or self._created_posts or self._deleted_posts):
+                    self._condition.wait()
+            # Agrupa eventos próximos (ex: vários likes seguidos) em uma única atualização
+            time.sleep(self.refresh_delay)
+            with self._condition:
+                user_ids, self._pending_users = self._pending_users, set()
+                refresh_all, self._refresh_all = self._refresh_all, False
+                created_posts, self._created_posts = self._created_posts, []
+                deleted_posts, self._deleted_posts = self._deleted_posts, set()
+
+            try:
+                # Job em segundo plano: nunca usa a sessão de uma requisição
+                with self.db_manager.unscoped():
+                    for post_id in deleted_posts:
+                        self.db_manager.remove_post_from_feeds(post_id)
+                    for post_id, tag, optional_tags in created_posts:
+                        if post_id not in deleted_posts:
+                            self.add_post_to_feeds(post_id, tag, optional_tags)
+                    if refresh_all:
+                        user_ids |= set(self.db_manager.get_user_ids_with_feed())
+                    self._refresh_many(user_ids)
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Erro na atualização de feeds em segundo plano: {e}")
@@ -0,0 +1,242 @@
+"""
+Migrações versionadas do banco.
+
+As migrações antigas de init_all_dbs são idempotentes (IF NOT EXISTS) e continuam lá; as
+novas mudanças de esquema entram aqui, numeradas, e cada versão aplicada fica registrada
+em schema_migrations. Cada migração roda na sua própria transação, protegida por um
+advisory lock para que vários workers iniciando juntos não apliquem a mesma versão duas vezes.
+
+Os passos de `up`/`down` são comandos SQL ou funções que recebem a conexão da transação,
+para mudanças que dependem do estado do banco (ex: particionamento, em app/partitions.py).
+
+`down` desfaz a migração; além de permitir reverter, é usado pelo benchmark
+(flask migrations benchmark), que mostra os planos das consultas quentes antes (`down`) e
+depois (`up`) da migração, ambos em transações desfeitas com rollback.
+"""
+import logging
+import time
+from sqlalchemy import text
+from app.partitions import partition_interactions, unpartition_interactions
+
+MIGRATIONS_TABLE = 'schema_migrations'
+MIGRATIONS_LOCK_ID = 7_240_020 # Chave do pg_advisory_xact_lock das migrações
+
+class Migration:
+    def __init__(self, version: int, description: str, up, down=()):
+        self.version = version
+        self.description = description
+        self.up = up
+        self.down = down
+
+MIGRATIONS = [
+    Migration(1, 'Índices compostos e parciais das consultas quentes de interactions', up=(
+        # Histórico de comentários do usuário e posts com que ele interagiu (ContentBasedStrategy);
+        # até a migração 2 servia também as reações do usuário a um post
+        "CREATE INDEX IF NOT EXISTS ix_interactions_user_type_post ON interactions (user_id, type, post_id);",
+        # Reações e comentários diretos ao post (matriz de likes e PopularityPrior). Removido na
+        # migração 4: desde a migração 2 as reações ficam em reactions
+        "CREATE INDEX IF NOT EXISTS ix_interactions_post_reactions ON interactions (post_id, type, user_id) WHERE parent_interaction_id IS NULL;",
+        # Coberto por ix_interactions_comment_order (post_id, type, ...) e ix_interactions_reply_order
+        # (parent_interaction_id, type, ...), então só custava escrita
+        "DROP INDEX IF EXISTS ix_interactions_post_type_parent;",
+    ), down=(
+        "CREATE INDEX IF NOT EXISTS ix_interactions_post_type_parent ON interactions (post_id, type, parent_interaction_id);",
+        "DROP INDEX IF EXISTS ix_interactions_post_reactions;",
+        "DROP INDEX IF EXISTS ix_interactions_user_type_post;",
+    )),
+    Migration(2, 'Likes e dislikes movidos de interactions para reactions (uma reação por usuário e alvo)', up=(
+        # A tabela já existe se create_all rodou antes (model Reaction); em bancos antigos é criada aqui
+        "CREATE TABLE IF NOT EXISTS reactions ("
+        "id SERIAL PRIMARY KEY, "
+        "user_id INTEGER NOT NULL REFERENCES users_details (user_id), "
+        "target_type VARCHAR(10) NOT NULL, "
+        "target_id INTEGER NOT NULL, "
+        "type VARCHAR(20) NOT NULL, "
+        "\"timestamp\" TIMESTAMP, "
+        "CONSTRAINT uq_reactions_user_target UNIQUE (user_id, target_type, target_id));",
+        "CREATE INDEX IF NOT EXISTS ix_reactions_target ON reactions (target_type, target_id, type, user_id);",
+        # Sem a restrição única havia reações repetidas; fica só a mais recente de cada usuário e alvo
+        "INSERT INTO reactions (user_id, target_type, target_id, type, \"timestamp\") "
+        "SELECT DISTINCT ON (user_id, target_type, target_id) user_id, target_type, target_id, type, \"timestamp\" FROM ("
+        "SELECT id, user_id, 'post' AS target_type, post_id AS target_id, type, \"timestamp\" FROM interactions "
+        "WHERE type IN ('like_post', 'dislike_post') AND parent_interaction_id IS NULL "
+        "UNION ALL "
+        "SELECT id, user_id, 'comment', parent_interaction_id, type, \"timestamp\" FROM interactions "
+        "WHERE type IN ('like_comment', 'dislike_comment') AND parent_interaction_id IS NOT NULL"
+        ") AS old_reactions ORDER BY user_id, target_type, target_id, \"timestamp\" DESC NULLS LAST, id DESC "
+        "ON CONFLICT (user_id, target_type, target_id) DO NOTHING;",
+        "DELETE FROM interactions WHERE type IN ('like_post', 'dislike_post', 'like_comment', 'dislike_comment');",
+    ), down=(
+        "INSERT INTO interactions (user_id, post_id, parent_interaction_id, type, \"timestamp\", is_deleted) "
+        "SELECT user_id, target_id, NULL, type, coalesce(\"timestamp\", localtimestamp), false FROM reactions WHERE target_type = 'post';",
+        "INSERT INTO interactions (user_id, post_id, parent_interaction_id, type, \"timestamp\", is_deleted) "
+        "SELECT r.user_id, c.post_id, r.target_id, r.type, coalesce(r.\"timestamp\", localtimestamp), false "
+        "FROM reactions r JOIN interactions c ON c.id = r.target_id WHERE r.target_type = 'comment';",
+        "DROP TABLE IF EXISTS reactions;",
+    )),
+    Migration(3, 'interactions particionada por mês de timestamp (chave primária (id, timestamp))',
+              up=(partition_interactions,), down=(unpartition_interactions,)),
+    Migration(4, 'Remove ix_interactions_post_reactions (as reações ficam em reactions desde a migração 2)', up=(
+        # Os comentários de um post usam ix_interactions_comment_order; o índice só custava escrita
+        "DROP INDEX IF EXISTS ix_interactions_post_reactions;",
+    ), down=(
+        "CREATE INDEX IF NOT EXISTS ix_interactions_post_reactions ON interactions (post_id, type, user_id) WHERE parent_interaction_id IS NULL;",
+    )),
+    Migration(5, 'Índice de user_feed por post (remoção de um post excluído de todos os feeds)', up=(
+        "CREATE INDEX IF NOT EXISTS ix_user_feed_post ON user_feed (post_id);",
+    ), down=(
+        "DROP INDEX IF EXISTS ix_user_feed_post;",
+    )),
+]
+
+# Versão que move as reações; init_all_dbs reconcilia os contadores depois de aplicá-la
+REACTIONS_MIGRATION = 2
+
+# Consultas quentes usadas pelo benchmark, no mesmo formato das geradas pelo DatabaseManager
+# e pelas estratégias de recomendação. Os parâmetros vêm de sample_benchmark_params.
+HOT_QUERIES = [
+    # interactions: comentários, respostas e histórico (migrações 1, 3 e 4)
+    ('get_paginated_comments',
+     "SELECT * FROM interactions WHERE post_id = :post_id AND parent_interaction_id IS NULL "
+     "AND type = 'comment_post' ORDER BY like_count DESC, timestamp DESC, id DESC LIMIT 11"),
+    ('get_paginated_replies',
+     "SELECT * FROM interactions WHERE post_id = :post_id AND parent_interaction_id = :comment_id "
+     "AND type = 'reply_comment' ORDER BY like_count DESC, timestamp DESC, id DESC LIMIT 11"),
+    ('get_comments_for_post',
+     "SELECT * FROM interactions WHERE post_id = :post_id AND type = 'comment_post' "
+     "AND parent_interaction_id IS NULL ORDER BY timestamp"),
+    ('get_top_replies',
+     "SELECT * FROM interactions WHERE parent_interaction_id = :comment_id AND type = 'reply_comment' "
+     "ORDER BY like_count DESC, timestamp DESC, id DESC LIMIT 1"),
+    ('histórico de comentários do usuário',
+     "SELECT * FROM interactions WHERE user_id = :user_id AND type IN ('reply_comment', 'comment_post') "
+     "ORDER BY timestamp DESC"),
+    ('ContentBasedStrategy (posts com interação do usuário)',
+     "SELECT DISTINCT post_id FROM interactions WHERE user_id = :user_id"),
+    # reactions (migração 2)
+    ('toggle_post_reaction / get_user_post_reaction',
+     "SELECT * FROM reactions WHERE user_id = :reactor_id AND target_type = 'post' AND target_id = :post_id"),
+    ('toggle_comment_reaction / get_user_comment_reaction',
+     "SELECT * FROM reactions WHERE user_id = :reactor_id AND target_type = 'comment' AND target_id = :comment_id"),
+    ('hydrate_posts (reações do usuário)',
+     "SELECT target_id, type FROM reactions WHERE user_id = :reactor_id AND target_type = 'post' "
+     "AND target_id IN (SELECT id FROM posts ORDER BY id DESC LIMIT 20)"),
+    ('LikeMatrix (carga dos likes)',
+     "SELECT user_id, target_id FROM reactions WHERE target_type = 'post' AND type = 'like_post'"),
+    ('PopularityPrior (likes dos posts recentes)',
+     "SELECT target_id, count(*) FROM reactions WHERE target_type = 'post' AND type = 'like_post' "
+     "AND target_id IN (SELECT id FROM posts ORDER BY id DESC LIMIT 200) GROUP BY target_id"),
+    # user_feed (migração 5)
+    ('remove_post_from_feeds',
+     "SELECT id FROM user_feed WHERE post_id = :post_id"),
+]
+
+def _ensure_table(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+        "version INTEGER PRIMARY KEY, description TEXT NOT NULL, applied_at TIMESTAMP NOT NULL DEFAULT now());"
+    ))
+
+def _run(conn, statements):
+    for statement in statements:
+        if callable(statement):
+            statement(conn)
+        else:
+            conn.execute(text(statement))
+
+def applied_versions(engine):
+    """Retorna {versão: data de aplicação} das migrações já aplicadas."""
+    with engine.begin() as conn:
+        _ensure_table(conn)
+        return dict(conn.execute(text(f"SELECT version, applied_at FROM {MIGRATIONS_TABLE};")).all())
+
+def get_migration(version: int):
+    for migration in MIGRATIONS:
+        if migration.version == version:
+            return migration
+    return None
+
+def apply_migrations(engine, target: int = None):
+    """Aplica, em ordem, as migrações pendentes (até `target`, se informado). Retorna as versões aplicadas."""
+    applied = []
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if target is not None and migration.version > target:
+            break
+        with engine.begin() as conn:
+            _ensure_table(conn)
+            conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id);"), {'lock_id': MIGRATIONS_LOCK_ID})
+            already_applied = conn.execute(
+                text(f"SELECT 1 FROM {MIGRATIONS_TABLE} WHERE version = :version;"), {'version': migration.version}
+            ).first()
+            if already_applied:
+                continue
+            _run(conn, migration.up)
+            conn.execute(
+                text(f"INSERT INTO {MIGRATIONS_TABLE} (version, description) VALUES (:version, :description);"),
+                {'version': migration.version, 'description': migration.description}
+            )
+        logging.getLogger(__name__).info(f"Migração {migration.version} aplicada: {migration.description}")
+        applied.append(migration.version)
+    return applied
+
+def sample_benchmark_params(engine):
+    """
+    Escolhe o usuário, o post e o comentário com mais interações, e o usuário com mais reações,
+    para parametrizar HOT_QUERIES.
+    """
+    with engine.begin() as conn:
+        user_id = conn.execute(text(
+            "SELECT user_id FROM interactions GROUP BY user_id ORDER BY count(*) DESC LIMIT 1;"
+        )).scalar()
+        reactor_id = None
+        if conn.execute(text("SELECT to_regclass('reactions');")).scalar():
+            reactor_id = conn.execute(text(
+                "SELECT user_id FROM reactions GROUP BY user_id ORDER BY count(*) DESC LIMIT 1;"
+            )).scalar()
+        post_id = conn.execute(text(
+            "SELECT post_id FROM interactions GROUP BY post_id ORDER BY count(*) DESC LIMIT 1;"
+        )).scalar()
+        comment_id = conn.execute(text(
+            "SELECT parent_interaction_id FROM interactions WHERE parent_interaction_id IS NOT NULL "
+            "GROUP BY parent_interaction_id ORDER BY count(*) DESC LIMIT 1;"
+        )).scalar()
+    return {'user_id': user_id or 0, 'reactor_id': reactor_id or 0, 'post_id': post_id or 0, 'comment_id': comment_id or 0}
+
+def _explain(conn, params, analyze: bool):
+    options = 'ANALYZE, BUFFERS, ' if analyze else ''
+    plans = []
+    for name, sql in HOT_QUERIES:
+        start = time.perf_counter()
+        try:
+            # Savepoint por consulta: uma consulta que não existe naquele esquema (ex: tabela criada
+            # pela migração) não aborta as demais
+            with conn.begin_nested():
+                plan = [row[0] for row in conn.execute(text(f"EXPLAIN ({options}COSTS OFF) {sql}"), params)]
+        except Exception as e:
+            plan = [f"(indisponível: {str(e).splitlines()[0]})"]
+        plans.append((name, plan, (time.perf_counter() - start) * 1000))
+    return plans
+
+def benchmark_migration(engine, migration: Migration, analyze: bool = True):
+    """
+    Retorna [(consulta, plano_antes, ms_antes, plano_depois, ms_depois)] das HOT_QUERIES.
+    O "antes" roda os comandos `down` da migração e o "depois" os comandos `up`, cada um dentro de
+    uma transação desfeita com rollback.
+    DROP INDEX bloqueia a tabela até o rollback, então não rode em produção fora de manutenção.
+    """
+    params = sample_benchmark_params(engine)
+    plans = []
+    with engine.connect() as conn:
+        # As duas medições são desfeitas: o esquema termina como estava, aplicada ou não a migração
+        for statements in (migration.down, migration.up):
+            transaction = conn.begin()
+            try:
+                _run(conn, statements)
+                plans.append(_explain(conn, params, analyze))
+            finally:
+                transaction.rollback()
+    before, after = plans
+    return [
+        (name, plan_before, ms_before, plan_after, ms_after)
+        for (name, plan_before, ms_before), (_, plan_after, ms_after) in zip(before, after)
+    ]
@@ -0,0 +1,207 @@
+"""
+Particionamento mensal da tabela interactions por `timestamp`.
+
+Cada mês fica em uma partição própria (interactions_y2026m01, ...) e interactions_default recebe
+o que cair fora delas. Como uma linha nunca muda de mês, só as partições recentes recebem escrita:
+o autovacuum trabalha nelas e as antigas ficam congeladas. Consultas com filtro ou ordem por data
+são podadas às partições do intervalo; as buscas por post ou comentário consultam o índice de
+cada partição, por isso as partições frias são arquivadas (flask interactions archive).
+
+A chave de uma tabela particionada precisa incluir a coluna de partição, então a chave primária
+passa a ser (id, timestamp) e interactions.id deixa de poder ser referenciada por chave estrangeira:
+a ligação resposta -> comentário (parent_interaction_id) é mantida pela aplicação.
+"""
+import gzip
+import logging
+import os
+from datetime import date, datetime
+from sqlalchemy import text
+
+PARTITIONED_TABLE = 'interactions'
+DEFAULT_PARTITION = 'interactions_default'
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f'{PARTITIONED_TABLE}_y{month.year}m{month.month:02d}'
+
+def is_partitioned(conn) -> bool:
+    relkind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table);"), {'table': PARTITIONED_TABLE}).scalar()
+    return relkind == 'p'
+
+def list_partitions(conn):
+    """Retorna [(nome, início, fim, linhas_estimadas)] das partições mensais, da mais antiga à mais recente."""
+    rows = conn.execute(text(
+        "SELECT c.relname, c.reltuples::bigint FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname;"
+    ), {'table': PARTITIONED_TABLE}).all()
+    partitions = []
+    for name, rows_estimate in rows:
+        if name == DEFAULT_PARTITION:
+            continue
+        start = date(int(name[-7:-3]), int(name[-2:]), 1)
+        partitions.append((name, start, add_months(start, 1), max(rows_estimate, 0)))
+    return partitions
+
+def ensure_partitions(conn, first_month: date = None, months_ahead: int = 3):
+    """
+    Cria a partição padrão e as partições mensais de `first_month` (ou do mês atual) até
+    `months_ahead` meses à frente. Linhas de um mês que caíram na partição padrão (o processo ficou
+    sem criar partições por muito tempo) são movidas para a partição nova. Retorna as partições criadas.
+    """
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARTITIONED_TABLE} DEFAULT;"))
+    existing = {name for name, _, _, _ in list_partitions(conn)}
+    month = first_month or month_start(datetime.now())
+    last = add_months(month_start(datetime.now()), months_ahead)
+    created = []
+    while month <= last:
+        name = partition_name(month)
+        if name not in existing:
+            bounds = {'start': month, 'end': add_months(month, 1)}
+            stray = conn.execute(text(
+                f'SELECT 1 FROM {DEFAULT_PARTITION} WHERE "timestamp" >= :start AND "timestamp" < :end LIMIT 1;'
+            ), bounds).first()
+            if stray:
+                # ATTACH falharia com linhas do intervalo na partição padrão: elas vão para a tabela nova antes
+                conn.execute(text(f"CREATE TABLE {name} (LIKE {PARTITIONED_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS);"))
+                conn.execute(text(
+                    f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE "timestamp" >= :start AND "timestamp" < :end RETURNING *) '
+                    f'INSERT INTO {name} SELECT * FROM moved;'
+                ), bounds)
+                conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}');"))
+            else:
+                conn.execute(text(f"CREATE TABLE {name} PARTITION OF {PARTITIONED_TABLE} FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}');"))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+def _rebuild_interactions(conn, partitioned: bool):
+    """
+    Recria interactions como tabela particionada (ou comum, no `down`) e copia os dados.
+    Roda na transação da migração, com a tabela bloqueada até o commit.
+    """
+    from app.database import Interaction # Import tardio: app.database importa app.migrations
+
+    old_table = f'{PARTITIONED_TABLE}_{"unpartitioned" if partitioned else "partitioned"}'
+    conn.execute(text(f"LOCK TABLE {PARTITIONED_TABLE} IN ACCESS EXCLUSIVE MODE;"))
+    first_timestamp = conn.execute(text(f'SELECT min("timestamp") FROM {PARTITIONED_TABLE};')).scalar()
+    conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} RENAME TO {old_table};"))
+    # Nomes de índices são globais no schema: os da tabela antiga saem para serem recriados na nova
+    for (index_name,) in conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = :table AND indexname <> :pkey;"
+    ), {'table': old_table, 'pkey': f'{PARTITIONED_TABLE}_pkey'}).all():
+        conn.execute(text(f"DROP INDEX {index_name};"))
+    conn.execute(text(f"ALTER TABLE {old_table} RENAME CONSTRAINT {PARTITIONED_TABLE}_pkey TO {old_table}_pkey;"))
+
+    # INCLUDING DEFAULTS mantém o nextval da mesma sequência de ids
+    partition_by = ' PARTITION BY RANGE ("timestamp")' if partitioned else ''
+    conn.execute(text(f"CREATE TABLE {PARTITIONED_TABLE} (LIKE {old_table} INCLUDING DEFAULTS){partition_by};"))
+    if partitioned:
+        ensure_partitions(conn, month_start(first_timestamp) if first_timestamp else None)
+    conn.execute(text(f"INSERT INTO {PARTITIONED_TABLE} SELECT * FROM {old_table};"))
+    # A coluna de partição vira parte da chave primária e não aceita nulos (linhas sem data vão para o mês atual)
+    conn.execute(text(f'UPDATE {PARTITIONED_TABLE} SET "timestamp" = localtimestamp WHERE "timestamp" IS NULL;'))
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id');"), {'table': old_table}).scalar()
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {PARTITIONED_TABLE}.id;"))
+    conn.execute(text(f"DROP TABLE {old_table};"))
+
+    conn.execute(text(f'ALTER TABLE {PARTITIONED_TABLE} ALTER COLUMN "timestamp" SET NOT NULL;'))
+    primary_key = 'id, "timestamp"' if partitioned else 'id'
+    conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} ADD PRIMARY KEY ({primary_key});"))
+    conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} ADD FOREIGN KEY (user_id) REFERENCES users_details (user_id);"))
+    conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} ADD FOREIGN KEY (post_id) REFERENCES posts (id);"))
+    if not partitioned:
+        conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} ADD FOREIGN KEY (parent_interaction_id) REFERENCES {PARTITIONED_TABLE} (id);"))
+    for index in Interaction.__table__.indexes:
+        index.create(conn, checkfirst=True)
+    conn.execute(text(f"ANALYZE {PARTITIONED_TABLE};"))
+
+def partition_interactions(conn):
+    """`up` da migração: particiona a tabela existente ou, em bancos novos (create_all), só cria as partições."""
+    if not is_partitioned(conn):
+        _rebuild_interactions(conn, partitioned=True)
+    else:
+        ensure_partitions(conn)
+
+def unpartition_interactions(conn):
+    """`down` da migração: volta interactions a uma tabela comum, com a chave estrangeira das respostas."""
+    if is_partitioned(conn):
+        _rebuild_interactions(conn, partitioned=False)
+
+def cold_partitions(conn, hot_months: int):
+    """Partições mensais inteiramente anteriores aos últimos `hot_months` meses."""
+    cutoff = add_months(month_start(datetime.now()), -hot_months)
+    return [partition for partition in list_partitions(conn) if partition[2] <= cutoff]
+
+# Drivers com COPY ... TO STDOUT (a API de cópia é diferente em cada um, ver _copy_to_file)
+COPY_DRIVERS = ('psycopg2', 'psycopg')
+
+def check_copy_support(engine):
+    """Falha antes de começar se o driver do engine não tiver suporte a COPY."""
+    if engine.dialect.driver not in COPY_DRIVERS:
+        raise RuntimeError(
+            f"Arquivamento de partições precisa de psycopg2 ou psycopg 3 (driver atual: {engine.dialect.driver})."
+        )
+
+def _copy_to_file(conn, sql: str, file):
+    """Executa `sql` (COPY ... TO STDOUT) na conexão da transação e grava a saída em `file` (binário)."""
+    cursor = conn.connection.cursor()
+    if conn.dialect.driver == 'psycopg':
+        with cursor.copy(sql) as copy:
+            for data in copy:
+                file.write(data)
+    else:
+        cursor.copy_expert(sql, file)
+
+def archive_partition(engine, name: str, directory: str):
+    """
+    Exporta a partição `name` para {directory}/{name}.csv.gz, e as reações aos seus comentários para
+    {name}.reactions.csv.gz, depois desanexa e apaga a partição, tudo em uma transação.
+    Retorna quantas interações foram arquivadas, ou None se algum comentário da partição tiver
+    respostas em partições mais novas (a partição fica como está, para não deixar respostas órfãs).
+    Os contadores dos posts precisam ser reconciliados depois.
+    """
+    check_copy_support(engine)
+    orphans_sql = text(
+        f"SELECT count(*) FROM {PARTITIONED_TABLE} reply WHERE reply.parent_interaction_id IN (SELECT id FROM {name}) "
+        f"AND reply.tableoid <> to_regclass(:name);"
+    )
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{name}.csv.gz')
+    reactions_path = os.path.join(directory, f'{name}.reactions.csv.gz')
+    try:
+        with engine.begin() as conn:
+            if conn.execute(orphans_sql, {'name': name}).scalar():
+                return None
+            total = conn.execute(text(f"SELECT count(*) FROM {name};")).scalar()
+            # O COPY sai na codificação do cliente (UTF-8): os bytes vão direto para o arquivo
+            with gzip.open(path, 'wb') as archive:
+                _copy_to_file(conn, f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER);", archive)
+            with gzip.open(reactions_path, 'wb') as archive:
+                _copy_to_file(
+                    conn,
+                    f"COPY (DELETE FROM reactions WHERE target_type = 'comment' AND target_id IN (SELECT id FROM {name}) RETURNING *) "
+                    "TO STDOUT WITH (FORMAT csv, HEADER);",
+                    archive
+                )
+            conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {name};"))
+            # Com a tabela bloqueada pelo DETACH, confere de novo: uma resposta pode ter chegado durante a exportação
+            if conn.execute(text(
+                f"SELECT count(*) FROM {PARTITIONED_TABLE} WHERE parent_interaction_id IN (SELECT id FROM {name});"
+            )).scalar():
+                raise RuntimeError(f"{name} recebeu respostas durante o arquivamento; tente novamente.")
+            conn.execute(text(f"DROP TABLE {name};"))
+    except Exception:
+        # Nada foi apagado (rollback): os arquivos incompletos saem para não parecerem um arquivamento válido
+        for file_path in (path, reactions_path):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        raise
+    logging.getLogger(__name__).info(f"Partição {name} arquivada em {path} ({total} interações).")
+    return total
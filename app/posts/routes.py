@@ -4,11 +4,10 @@ from app.extensions import login_required, db_manager, s3
 from app.api.routes import get_post_with_details, get_user_icon
 from botocore.exceptions import ClientError
 from app.data_sanitizer import PostForm, ALLOWED_CATEGORIES
-from app.database import Post
 from app.posts import bp
 from PIL import Image
 from werkzeug.datastructures import FileStorage
-import json, uuid, os, io
+import uuid, os, io
 
 @bp.route('/escrever', methods=['GET', 'POST'])
 @login_required
@@ -62,26 +61,20 @@ def create_post():
                     flash(f'Erro inesperado ao processar {file.filename}: {e}', 'danger')
                     logging.getLogger(__name__).error(f"Erro geral: {e}")
         
-        with db_manager.get_db() as db:
-            image_urls_json = json.dumps(uploaded_files_info) if uploaded_files_info else None
-
-            try:
-                new_post = Post(
-                    user_id=session['id'],
-                    title=form.tituloInput.data.strip(),
-                    content=form.contentTextarea.data.strip(),
-                    tag=form.tags.data,
-                    optional_tags=form.hiddenOptionalTags.data,
-                    image_urls=image_urls_json
-                )
-                db.add(new_post)
-                db.commit()
-                db.refresh(new_post) # Recarrega o objeto para ter o ID gerado pelo DB
-                flash('Post criado com sucesso!', 'success')
-                return jsonify({'success': True, 'message': new_post.id}), 201
-            except Exception as e:
-                db.rollback()
-                return jsonify({'success': False, 'message': 'Erro ao criar post. Tente novamente.'}), 400
+        success, result = db_manager.create_post(
+            user_id=session['id'],
+            title=form.tituloInput.data.strip(),
+            content=form.contentTextarea.data.strip(),
+            tag=form.tags.data,
+            optional_tags=form.hiddenOptionalTags.data,
+            image_urls=uploaded_files_info
+        )
+        if success:
+            flash('Post criado com sucesso!', 'success')
+            return jsonify({'success': True, 'message': result}), 201
+        else:
+            logging.getLogger(__name__).error(f"Erro ao criar post: {result}")
+            return jsonify({'success': False, 'message': 'Erro ao criar post. Tente novamente.'}), 400
     else:
         logging.getLogger(__name__).warning(f"Erro de validação no create_post: {form.errors}")
         return jsonify({'success': False, 'errors': form.errors, 'message': 'Erro de validação.'}), 400
@@ -99,7 +92,7 @@ def view_post(post_id):
                            post_likes=post['post_likes'],
                            post_dislikes=post['post_dislikes'],
                            user_post_reaction=post['user_post_reaction'],
-                           next_offset=post['next_offset'],
+                           next_cursor=post['next_cursor'],
                            total_comments=post['total_comments'],
                            is_saved=db_manager.is_post_saved(session.get('id', 0), post_id) if session.get('id') else False,
                            user_icon=get_user_icon(session.get('id')))
@@ -256,7 +256,7 @@ function renderReply(reply_content) {
 
 function renderPost(post_package) {
 	// post: {
-	//   id, title, content, tag, optional_tags, image_urls, created_at, author_user, user_post_reaction, likes, dislikes, comments, total_comments
+	//   id, title, content, tag, optional_tags, image_urls, created_at, author_user, user_post_reaction, likes, dislikes, comments, total_comments, next_cursor
 	// }
 
 	let optionalTagsHtml = '';
@@ -348,7 +348,7 @@ function renderPost(post_package) {
 			${commentsHtml}
 		</div>
 		<div class="mt-8 text-center">
-			${post_package.total_comments - (post_package.comments ? post_package.comments.length : 0) > 0 ? `
+			${post_package.next_cursor ? `
 			<button id="loadMoreComments" class="inline-block bg-blue-600 hover:bg-blue-700 text-white font-bold py-2 px-6 rounded-full transition duration-300 ease-in-out">
 				Carregar mais comentários
 			</button>` : ''}
@@ -447,7 +447,7 @@ function attachCommentEventListeners() {
 
 let commenting = false;
 let loadingposts = false;
-function attachPostEventListeners(postId, total_comments, rendered_comments) {
+function attachPostEventListeners(postId, next_cursor) {
 	// Evento de clique para os botões de resposta dos comentários
 	initializeAuthButtons(
 		document.getElementById('commentsSection'),
@@ -679,7 +679,7 @@ function attachPostEventListeners(postId, total_comments, rendered_comments) {
 				toggleNotification(notifId);
 
 				try {
-					const request = await fetch(`/api/posts/${postId}/comments?offset=${rendered_comments}&limit=10`);
+					const request = await fetch(`/api/posts/${postId}/comments?cursor=${encodeURIComponent(next_cursor)}&limit=10`);
 					const result = await request.json();
 
 					if (result.success) {
@@ -689,9 +689,9 @@ function attachPostEventListeners(postId, total_comments, rendered_comments) {
 						});
 						attachOptionsButtons(); // Anexa os event listeners aos botões de opções
 
-						rendered_comments += 5; // Incrementa o número de comentários a serem carregados
+						next_cursor = result.next_cursor; // Cursor da próxima página (null quando não há mais comentários)
 						// Verifica se todos os comentários foram carregados
-						if (total_comments <= rendered_comments) {
+						if (!next_cursor) {
 							loadMoreButton.style.display = 'none'; // Esconde o botão se não houver mais comentários
 						}
 					} else {
@@ -768,11 +768,8 @@ async function openCommentModal(commentId, postId) {
 			}
 
 			// Adiciona as respostas ao modal
-			result.replies.forEach(reply => {
-				commentModalContent.innerHTML += renderReply(reply); // Use uma função separada para renderizar respostas
-			});
+			appendReplies(commentModalContent, result, commentId, postId);
 			attachCommentEventListeners(); // Anexa os event listeners
-			attachOptionsButtons(); // Anexa os event listeners aos botões de opções
 		} else {
 			commentModalContent.innerHTML = 'Erro ao carregar respostas.';
 		}
@@ -783,6 +780,50 @@ async function openCommentModal(commentId, postId) {
 	loadingcomments = false;
 }
 
+// Adiciona uma página de respostas ao modal e, se houver mais, o botão para carregar a próxima (por cursor)
+function appendReplies(commentModalContent, result, commentId, postId) {
+	const loadMoreButton = document.getElementById('loadMoreReplies');
+	if (loadMoreButton) {
+		loadMoreButton.remove();
+	}
+	result.replies.forEach(reply => {
+		commentModalContent.insertAdjacentHTML('beforeend', renderReply(reply)); // Use uma função separada para renderizar respostas
+	});
+	if (result.next_cursor) {
+		commentModalContent.insertAdjacentHTML('beforeend', `
+			<div class="mt-4 text-center">
+				<button id="loadMoreReplies" class="inline-block bg-blue-600 cursor-pointer hover:bg-blue-700 text-white font-bold py-2 px-6 rounded-full transition duration-300 ease-in-out">
+					Carregar mais respostas
+				</button>
+			</div>`);
+		document.getElementById('loadMoreReplies').addEventListener('click', () => loadMoreReplies(commentId, postId, result.next_cursor));
+	}
+	attachOptionsButtons(); // Anexa os event listeners aos botões de opções
+}
+
+async function loadMoreReplies(commentId, postId, cursor) {
+	if (loadingcomments) {
+		return;
+	}
+	loadingcomments = true;
+	const commentModalContent = document.getElementById('commentModalContent');
+
+	try {
+		const request = await fetch(`/api/posts/${postId}/comment/${commentId}/replies?cursor=${encodeURIComponent(cursor)}`);
+		const result = await request.json();
+
+		if (result.success) {
+			appendReplies(commentModalContent, result, commentId, postId);
+		} else {
+			alert('Erro ao carregar mais respostas: ' + result.message);
+		}
+	} catch (error) {
+		console.log(error);
+		alert('Erro de conexão.');
+	}
+	loadingcomments = false;
+}
+
 // Fecha modais ao pressionar a tecla ESC
 document.addEventListener('keydown', function(event) {
 	if (event.key === 'Escape') {
@@ -892,7 +933,7 @@ document.addEventListener('DOMContentLoaded', async () => {
 					const modalContent = postModal.querySelector('.post-modal-content');
 					modalContent.innerHTML = renderPost(data);
 					openModal('postModal');
-					attachPostEventListeners(postId, data.total_comments, data.next_offset); // Passa o ID do post e o número total de comentários
+					attachPostEventListeners(postId, data.next_cursor); // Passa o ID do post e o cursor da próxima página de comentários
 					attachOptionsButtons(); // Anexa os event listeners aos botões de opções
 				}
 			} catch(error) {
@@ -920,7 +961,7 @@ document.addEventListener('DOMContentLoaded', async () => {
 					const modalContent = postModal.querySelector('.post-modal-content');
 					modalContent.innerHTML = renderPost(data);
 					openModal('postModal');
-					attachPostEventListeners(postId, data.total_comments, data.next_offset);
+					attachPostEventListeners(postId, data.next_cursor);
 					attachOptionsButtons();
 				}
 			} catch (err) {
@@ -0,0 +1,186 @@
+import atexit
+import logging
+import threading
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+# Falhas do banco (conexão, statement_timeout), não das reações: o lote espera o próximo flush
+# sem contar tentativa
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+def _reaction_weights(reaction_type):
+    """(likes, dislikes) que uma reação soma aos contadores do alvo."""
+    if reaction_type is None:
+        return 0, 0
+    return (0, 1) if reaction_type.startswith('dislike_') else (1, 0)
+
+class ReactionBuffer:
+    """
+    Escrita adiada (write-behind) das reações, opcional (REACTIONS_WRITE_BEHIND).
+
+    Cada clique só lê o estado atual da reação (uma consulta, sem escrita) e guarda o estado
+    desejado por (usuário, alvo) em memória; cliques repetidos no mesmo alvo se anulam ali mesmo.
+    Uma thread grava o lote a cada REACTIONS_FLUSH_INTERVAL_MS em uma única instrução e um único
+    commit (DatabaseManager.apply_reactions), o que reduz commits e WAL em posts virais.
+
+    Enquanto não são gravadas, as reações pendentes aparecem nas leituras do DatabaseManager
+    (reação do usuário e contagens) por meio de pending_reaction/count_delta. O buffer é por processo:
+    com vários workers, outro worker só vê o clique depois do flush. O lote pendente é gravado
+    no encerramento do processo (atexit); um kill -9 perde no máximo um intervalo de cliques.
+
+    Se o lote falhar, ele é dividido ao meio até isolar as reações com erro (ex: usuário apagado
+    antes do flush); as demais são gravadas. Uma reação que falha em REACTIONS_FLUSH_MAX_ATTEMPTS
+    flushes seguidos é descartada e registrada no log.
+    """
+    def __init__(self, db_manager, app=None):
+        self.db_manager = db_manager
+        self.enabled = False
+        self.flush_interval = 0.2 # Segundos entre gravações
+        self.max_batch = 1000 # Reações pendentes que antecipam o flush
+        self.max_attempts = 3 # Flushes com erro antes de descartar uma reação
+        self._pending = {} # (user_id, target_type, target_id) -> {'post_id', 'base', 'type'}
+        self._flushing = {} # Lote sendo gravado agora (continua visível nas leituras até o commit)
+        self._deltas = {} # (target_type, target_id) -> [likes, dislikes] ainda não gravados
+        self._attempts = {} # (user_id, target_type, target_id) -> flushes que falharam
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._worker = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.flush_interval = app.config.get('REACTIONS_FLUSH_INTERVAL_MS', self.flush_interval * 1000) / 1000
+        self.max_batch = app.config.get('REACTIONS_FLUSH_MAX_BATCH', self.max_batch)
+        self.max_attempts = app.config.get('REACTIONS_FLUSH_MAX_ATTEMPTS', self.max_attempts)
+        if app.config.get('REACTIONS_WRITE_BEHIND', False):
+            self.enabled = True
+            self.db_manager.reaction_buffer = self
+            self.start()
+
+    def start(self):
+        """Inicia a thread de gravação (uma por processo) e registra o flush no encerramento."""
+        if self._worker is None or not self._worker.is_alive():
+            self._stopped.clear()
+            self._worker = threading.Thread(target=self._run, name='reaction-buffer', daemon=True)
+            self._worker.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Para a thread e grava o que estiver pendente."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._worker is not None and self._worker is not threading.current_thread():
+            self._worker.join(timeout=5)
+        self.flush()
+
+    def toggle(self, user_id: int, target_type: str, target_id: int, reaction_type: str):
+        """
+        Alterna a reação em memória, com a mesma semântica de DatabaseManager._toggle_reaction.
+        Retorna (post_id, tipo_antigo, tipo_novo); post_id é None se o alvo não existir.
+        """
+        key = (user_id, target_type, target_id)
+        with self._lock:
+            entry = self._current(key)
+        if entry is None:
+            # Primeiro clique neste alvo desde o último flush: lê o estado gravado
+            post_id, stored_type = self.db_manager.get_reaction_state(user_id, target_type, target_id)
+            if post_id is None:
+                return None, None, None
+            entry = {'post_id': post_id, 'base': stored_type, 'type': stored_type}
+
+        with self._lock:
+            entry = self._current(key) or entry # Outro clique simultâneo pode ter chegado antes
+            old_type = entry['type']
+            new_type = None if old_type == reaction_type else reaction_type
+            base = entry['base'] if key in self._pending else entry['type']
+            self._pending[key] = {'post_id': entry['post_id'], 'base': base, 'type': new_type}
+            self._add_delta(target_type, target_id, _reaction_weights(new_type), _reaction_weights(old_type))
+            pending = len(self._pending)
+        if pending >= self.max_batch:
+            self._wakeup.set()
+        return entry['post_id'], old_type, new_type
+
+    def pending_reaction(self, user_id: int, target_type: str, target_id: int):
+        """Retorna (True, tipo_ou_None) se houver reação pendente do usuário no alvo, senão (False, None)."""
+        with self._lock:
+            entry = self._current((user_id, target_type, target_id))
+        return (True, entry['type']) if entry else (False, None)
+
+    def count_delta(self, target_type: str, target_id: int):
+        """(likes, dislikes) ainda não gravados nos contadores do alvo."""
+        with self._lock:
+            likes, dislikes = self._deltas.get((target_type, target_id), (0, 0))
+        return likes, dislikes
+
+    def flush(self):
+        """Grava as reações pendentes em um lote. Retorna quantas reações foram gravadas."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = self._flushing = self._pending
+                self._pending = {}
+            failed = dict(self._apply(list(batch), batch))
+            if failed:
+                logging.getLogger(__name__).error(
+                    f"Erro ao gravar {len(failed)} de {len(batch)} reações pendentes: {next(iter(failed.values()))}"
+                )
+            with self._lock:
+                for key, entry in batch.items():
+                    error = failed.get(key)
+                    if error is not None:
+                        attempts = self._attempts.get(key, 0) + (0 if isinstance(error, TRANSIENT_ERRORS) else 1)
+                        if attempts < self.max_attempts or key in self._pending:
+                            self._attempts[key] = attempts
+                            self._requeue(key, entry)
+                            continue
+                        logging.getLogger(__name__).error(
+                            f"Reação descartada após {attempts} tentativas: usuário {key[0]}, {key[1]} {key[2]}, "
+                            f"{entry['base']} -> {entry['type']} ({error})"
+                        )
+                    self._attempts.pop(key, None)
+                    # Gravada (ou descartada): sai da sobreposição das leituras
+                    self._add_delta(key[1], key[2], _reaction_weights(entry['base']), _reaction_weights(entry['type']))
+                self._flushing = {}
+            return len(batch) - len(failed)
+
+    def _apply(self, keys, batch):
+        """
+        Grava as reações `keys` do lote em uma instrução; se falhar, divide ao meio até isolar as
+        que falham. Retorna [(chave, erro)] das reações não gravadas.
+        """
+        try:
+            self.db_manager.apply_reactions([(*key, batch[key]['type']) for key in keys])
+            return []
+        except TRANSIENT_ERRORS as e:
+            return [(key, e) for key in keys]
+        except Exception as e:
+            if len(keys) == 1:
+                return [(keys[0], e)]
+            middle = len(keys) // 2
+            return self._apply(keys[:middle], batch) + self._apply(keys[middle:], batch)
+
+    def _requeue(self, key, entry):
+        """Devolve uma reação não gravada; um clique feito durante o flush continua valendo sobre ela."""
+        if key in self._pending:
+            self._pending[key]['base'] = entry['base']
+        else:
+            self._pending[key] = entry
+
+    def _current(self, key):
+        return self._pending.get(key) or self._flushing.get(key)
+
+    def _add_delta(self, target_type, target_id, added, removed):
+        delta = self._deltas.setdefault((target_type, target_id), [0, 0])
+        delta[0] += added[0] - removed[0]
+        delta[1] += added[1] - removed[1]
+        if delta == [0, 0]:
+            del self._deltas[(target_type, target_id)]
+
+    def _run(self):
+        with self.db_manager.unscoped():
+            while not self._stopped.is_set():
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                self.flush()
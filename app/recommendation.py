@@ -1,97 +1,608 @@
-from app.database import DatabaseManager, User, Post, Interaction
+from app.database import DatabaseManager, User, Post, Interaction, Reaction
+from app.cache import MemoryCache, create_cache
+from datetime import datetime
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from scipy import sparse
+from sqlalchemy import and_, func, select, union
+from sklearn.preprocessing import normalize
+import numpy as np
+import joblib
+import logging
+import os
+import threading
+import time
+
+class LikeMatrix:
+    """
+    Matriz esparsa usuário × post (CSR) com os likes ('like_post').
+    É carregada do banco uma vez e atualizada incrementalmente a cada reação,
+    assim o cálculo de co-ocorrência não precisa consultar a tabela de interações.
+    """
+    RELOAD_INTERVAL = 600 # Segundos até recarregar do banco (outros workers também escrevem)
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        self._user_rows = {} # user_id -> linha
+        self._post_cols = {} # post_id -> coluna
+        self._post_ids = np.empty(0, dtype=np.int64) # coluna -> post_id
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._pending = {} # (user_id, post_id) -> 1.0 (like) ou 0.0 (like removido)
+        self._deleted_posts = set() # Posts deletados cujas colunas ainda não foram zeradas
+
+    def load(self):
+        """(Re)constrói a matriz a partir de todos os likes do banco."""
+        with self.db_manager.get_db() as db:
+            likes = db.query(Reaction.user_id, Reaction.target_id).join(
+                Post, Post.id == Reaction.target_id
+            ).filter(
+                Reaction.target_type == 'post',
+                Reaction.type == 'like_post',
+                Post.is_deleted == False
+            ).all()
+
+        user_ids = np.fromiter((u for u, _ in likes), dtype=np.int64, count=len(likes))
+        post_ids = np.fromiter((p for _, p in likes), dtype=np.int64, count=len(likes))
+        users, rows = np.unique(user_ids, return_inverse=True)
+        posts, cols = np.unique(post_ids, return_inverse=True)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(likes), dtype=np.float32), (rows, cols)),
+            shape=(len(users), len(posts))
+        )
+        matrix.data[:] = 1.0 # Likes duplicados contam uma vez só
+
+        with self._lock:
+            self._user_rows = {int(u): i for i, u in enumerate(users)}
+            self._post_cols = {int(p): i for i, p in enumerate(posts)}
+            self._post_ids = posts
+            self._matrix = matrix
+            self._loaded_at = time.monotonic()
+            # Alterações pendentes são estados absolutos, então reaplicá-las é seguro
+            self._compact()
+
+    def set_like(self, user_id: int, post_id: int, liked: bool):
+        """Registra um like (ou sua remoção). A CSR só é reconstruída na próxima leitura."""
+        with self._lock:
+            self._pending[(user_id, post_id)] = 1.0 if liked else 0.0
+
+    def on_post_reaction(self, user_id, post_id, old_type, new_type, **_):
+        """Listener de 'post_reaction' do DatabaseManager."""
+        if 'like_post' in (old_type, new_type):
+            self.set_like(user_id, post_id, new_type == 'like_post')
+
+    def on_post_deleted(self, post_id, **_):
+        """Listener de 'post_deleted': posts deletados deixam de ser candidatos."""
+        with self._lock:
+            self._deleted_posts.add(post_id)
+            self._pending = {key: value for key, value in self._pending.items() if key[1] != post_id}
+
+    def _compact(self):
+        """Aplica as alterações pendentes na CSR (deve ser chamado com o lock)."""
+        if self._deleted_posts:
+            cols = [self._post_cols[p] for p in self._deleted_posts if p in self._post_cols]
+            if cols:
+                keep = np.ones(self._matrix.shape[1], dtype=np.float32)
+                keep[cols] = 0
+                self._matrix = self._matrix.multiply(keep).tocsr()
+                self._matrix.eliminate_zeros()
+            self._deleted_posts = set()
+        if not self._pending:
+            return
+        new_post_ids = []
+        for user_id, post_id in self._pending:
+            if user_id not in self._user_rows:
+                self._user_rows[user_id] = len(self._user_rows)
+            if post_id not in self._post_cols:
+                self._post_cols[post_id] = len(self._post_ids) + len(new_post_ids)
+                new_post_ids.append(post_id)
+        if new_post_ids:
+            self._post_ids = np.concatenate([self._post_ids, np.asarray(new_post_ids, dtype=np.int64)])
+
+        shape = (len(self._user_rows), len(self._post_ids))
+        rows = np.fromiter((self._user_rows[u] for u, _ in self._pending), dtype=np.int64, count=len(self._pending))
+        cols = np.fromiter((self._post_cols[p] for _, p in self._pending), dtype=np.int64, count=len(self._pending))
+        values = np.fromiter(self._pending.values(), dtype=np.float32, count=len(self._pending))
+
+        matrix = self._matrix.copy()
+        matrix.resize(shape)
+        touched = sparse.csr_matrix((np.ones(len(values), dtype=np.float32), (rows, cols)), shape=shape)
+        # Zera as posições alteradas e grava o novo estado delas
+        matrix = matrix - matrix.multiply(touched) + sparse.csr_matrix((values, (rows, cols)), shape=shape)
+        matrix.eliminate_zeros()
+
+        self._matrix = matrix.tocsr()
+        self._pending = {}
+
+    def _snapshot(self):
+        """Retorna (matriz, post_ids, linhas) atualizados, recarregando se necessário."""
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.RELOAD_INTERVAL:
+                self.load()
+            self._compact()
+            return self._matrix, self._post_ids, self._user_rows
+
+    def liked_posts(self, user_id: int):
+        """Retorna os IDs dos posts curtidos pelo usuário."""
+        matrix, post_ids, user_rows = self._snapshot()
+        row = user_rows.get(user_id)
+        if row is None:
+            return np.empty(0, dtype=np.int64)
+        return post_ids[matrix.getrow(row).indices]
+
+    def co_like_scores(self, user_id: int):
+        """
+        Conta, para cada post, quantos usuários "semelhantes" (que curtiram ao menos
+        um post em comum) o curtiram. Retorna (post_ids, scores, liked_post_ids),
+        sem os posts que o próprio usuário já curtiu.
+        """
+        matrix, post_ids, user_rows = self._snapshot()
+        empty = np.empty(0, dtype=np.int64)
+        row = user_rows.get(user_id)
+        if row is None:
+            return empty, np.empty(0, dtype=np.float32), empty
+
+        user_vector = matrix.getrow(row).toarray().ravel()
+        liked_cols = np.flatnonzero(user_vector)
+        if not liked_cols.size:
+            return empty, np.empty(0, dtype=np.float32), empty
+
+        similar_users = (matrix @ user_vector) > 0 # Likes em comum por usuário
+        similar_users[row] = False
+        scores = matrix.T @ similar_users.astype(np.float32) # Likes dos semelhantes por post
+        scores[liked_cols] = 0
+        recommended = np.flatnonzero(scores)
+        return post_ids[recommended], scores[recommended], post_ids[liked_cols]
+
+class PopularityPrior:
+    """
+    Vetor pré-computado dos posts candidatos (não deletados, mais recentes) com uma
+    pontuação base que mistura frescor e popularidade. Substitui a varredura de todos
+    os posts a cada requisição: é recalculado periodicamente e ajustado quando posts
+    são criados ou deletados.
+    """
+    REFRESH_INTERVAL = 300 # Segundos até recalcular a partir do banco
+    MAX_CANDIDATES = 1000 # Apenas os posts mais recentes entram como candidatos
+    BASE_SCORE = 0.5 # Score máximo de um post "frio"
+    FRESHNESS_WEIGHT = 0.5 # Peso do frescor; o restante é popularidade (likes)
+    HALF_LIFE_HOURS = 72 # Em quantas horas o frescor de um post cai pela metade
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._lock = threading.Lock()
+        self._refreshed_at = None
+        self._post_ids = np.empty(0, dtype=np.int64)
+        self._scores = np.empty(0, dtype=np.float64)
+
+    def _base_scores(self, ages_hours, likes):
+        freshness = 0.5 ** (np.asarray(ages_hours, dtype=np.float64) / self.HALF_LIFE_HOURS)
+        likes = np.log1p(np.asarray(likes, dtype=np.float64))
+        popularity = likes / likes.max() if likes.size and likes.max() > 0 else np.zeros_like(likes)
+        return self.BASE_SCORE * (self.FRESHNESS_WEIGHT * freshness + (1 - self.FRESHNESS_WEIGHT) * popularity)
+
+    def refresh(self):
+        """Recalcula os candidatos e suas pontuações base a partir do banco."""
+        with self.db_manager.get_db() as db:
+            recent = db.query(Post.id, Post.created_at).filter(
+                Post.is_deleted == False
+            ).order_by(Post.id.desc()).limit(self.MAX_CANDIDATES).subquery()
+            rows = db.query(recent.c.id, recent.c.created_at, func.count(Reaction.id)).outerjoin(
+                Reaction, and_(
+                    Reaction.target_type == 'post',
+                    Reaction.target_id == recent.c.id,
+                    Reaction.type == 'like_post'
+                )
+            ).group_by(recent.c.id, recent.c.created_at).all()
+
+        now = datetime.now()
+        post_ids = np.fromiter((post_id for post_id, _, _ in rows), dtype=np.int64, count=len(rows))
+        ages = [max((now - created_at).total_seconds() / 3600, 0) if created_at else 0 for _, created_at, _ in rows]
+        scores = self._base_scores(ages, [likes for _, _, likes in rows])
+        with self._lock:
+            self._post_ids, self._scores = post_ids, scores
+            self._refreshed_at = time.monotonic()
+
+    def candidates(self):
+        """Retorna (post_ids, scores) dos candidatos, recalculando se estiverem velhos."""
+        if self._refreshed_at is None or time.monotonic() - self._refreshed_at > self.REFRESH_INTERVAL:
+            self.refresh()
+        with self._lock:
+            return self._post_ids, self._scores
+
+    def new_post_score(self):
+        """Pontuação base de um post recém-criado: frescor máximo e nenhum like."""
+        return self.BASE_SCORE * self.FRESHNESS_WEIGHT
+
+    def on_post_created(self, post, **_):
+        """Listener de 'post_created': posts novos entram com frescor máximo e sem likes."""
+        with self._lock:
+            if self._refreshed_at is not None:
+                self._post_ids = np.append(self._post_ids, post.id)
+                self._scores = np.append(self._scores, self.new_post_score())
+
+    def on_post_deleted(self, post_id, **_):
+        """Listener de 'post_deleted'."""
+        with self._lock:
+            keep = self._post_ids != post_id
+            self._post_ids, self._scores = self._post_ids[keep], self._scores[keep]
 
 class RecommendationStrategy:
+    timeout = None # Segundos; None usa o timeout padrão do RecommendationEngine
+
     def get_scores(self, user_id):
+        """Retorna {post_id: score} ou uma tupla de arrays (post_ids, scores)."""
         raise NotImplementedError
 
 class CollaborativeFilteringStrategy(RecommendationStrategy):
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, like_matrix=None, popularity_prior=None):
         self.db_manager = db_manager
+        self.like_matrix = like_matrix or LikeMatrix(db_manager)
+        self.popularity_prior = popularity_prior or PopularityPrior(db_manager)
 
     def get_scores(self, user_id):
+        # Co-ocorrência de likes calculada com produtos matriz-vetor esparsos
+        post_ids, co_likes, liked_post_ids = self.like_matrix.co_like_scores(user_id)
+
+        # Posts "frios": candidatos do prior que o usuário não curtiu e que não estão nas recomendações
+        prior_ids, prior_scores = self.popularity_prior.candidates()
+        cold = ~np.isin(prior_ids, post_ids) & ~np.isin(prior_ids, liked_post_ids)
+        return (
+            np.concatenate([post_ids, prior_ids[cold]]),
+            np.concatenate([co_likes.astype(np.float64), prior_scores[cold]])
+        ) # Retorna (post_ids, scores)
+
+class TagIndex:
+    """
+    Índice em memória das categorias dos posts não deletados. Cada linha da matriz
+    de pesos representa um post e cada coluna uma tag: a categoria principal vale 2
+    e cada tag opcional vale 1, então pontuar um usuário é um único produto matriz-vetor.
+    """
+    RELOAD_INTERVAL = 600 # Segundos até recarregar do banco (outros workers também escrevem)
+    MAIN_TAG_WEIGHT = 2 # Pontuação maior para categoria principal
+    OPTIONAL_TAG_WEIGHT = 1 # Pontuação para sub-tags
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        self._tag_cols = {} # tag -> coluna
+        self._post_rows = {} # post_id -> linha
+        self._post_ids = np.zeros(0, dtype=np.int64) # linha -> post_id (0 para linhas livres)
+        self._weights = np.zeros((0, 0), dtype=np.int16)
+        self._size = 0 # Linhas ocupadas
+
+    def load(self):
+        """(Re)constrói o índice a partir dos posts não deletados."""
         with self.db_manager.get_db() as db:
-            # Busca posts que o usuário curtiu
-            liked_posts = db.query(Interaction.post_id).filter(
-                Interaction.user_id == user_id,
-                Interaction.type == 'like_post'
-            ).all()
-            liked_post_ids = [p.post_id for p in liked_posts]
+            posts = db.query(Post.id, Post.tag, Post.optional_tags).filter(Post.is_deleted == False).all()
 
-            # Busca outros usuários que curtiram os mesmos posts
-            similar_users = db.query(Interaction.user_id).filter(
-                Interaction.post_id.in_(liked_post_ids),
-                Interaction.type == 'like_post',
-                Interaction.user_id != user_id
-            ).distinct().all()
+        with self._lock:
+            self._tag_cols = {}
+            self._post_rows = {}
+            self._post_ids = np.zeros(max(len(posts), 64), dtype=np.int64)
+            self._weights = np.zeros((len(self._post_ids), 32), dtype=np.int16)
+            self._size = 0
+            for post_id, tag, optional_tags in posts:
+                self._add(post_id, tag, optional_tags)
+            self._loaded_at = time.monotonic()
 
-            # Busca posts que esses usuários curtiram e que o usuário atual não curtiu
-            similar_user_ids = [u.user_id for u in similar_users]
-            recommended_posts = db.query(Interaction.post_id).filter(
-                Interaction.user_id.in_(similar_user_ids),
-                Interaction.type == 'like_post',
-                ~Interaction.post_id.in_(liked_post_ids)
-            ).all()
+    def _column(self, tag):
+        """Retorna a coluna da tag, criando-a (e alargando a matriz) se necessário."""
+        col = self._tag_cols.get(tag)
+        if col is None:
+            col = len(self._tag_cols)
+            self._tag_cols[tag] = col
+            if col >= self._weights.shape[1]:
+                extra = np.zeros((self._weights.shape[0], self._weights.shape[1] or 32), dtype=np.int16)
+                self._weights = np.hstack([self._weights, extra])
+        return col
+
+    def _add(self, post_id, tag, optional_tags):
+        """Insere um post no índice (deve ser chamado com o lock)."""
+        if post_id in self._post_rows:
+            self._remove(post_id)
+        if self._size >= len(self._post_ids):
+            capacity = max(64, len(self._post_ids) * 2)
+            self._post_ids = np.concatenate([self._post_ids, np.zeros(capacity - len(self._post_ids), dtype=np.int64)])
+            self._weights = np.vstack([self._weights, np.zeros((capacity - self._weights.shape[0], self._weights.shape[1]), dtype=np.int16)])
+
+        row = self._size
+        self._size += 1
+        self._post_rows[post_id] = row
+        self._post_ids[row] = post_id
+        for t, weight in self.post_weights(tag, optional_tags).items():
+            self._weights[row, self._column(t)] += weight
 
-            scores = defaultdict(int) # Dicionário para armazenar pontuação dos posts
-            for p in recommended_posts:
-                scores[p.post_id] += 1 # Soma 1 para cada vez que o post é recomendado
+    @classmethod
+    def post_weights(cls, tag, optional_tags):
+        """Pesos {tag: peso} de um post: a pontuação dele para um usuário é a soma dos pesos das tags do usuário."""
+        weights = defaultdict(int)
+        if tag:
+            weights[tag] += cls.MAIN_TAG_WEIGHT
+        if optional_tags and isinstance(optional_tags, str):
+            for t in optional_tags.split(','):
+                weights[t] += cls.OPTIONAL_TAG_WEIGHT
+        return weights
 
-            # Inclui posts sem nenhuma interação e que o usuário ainda não curtiu
-            all_post_ids = set([pid for (pid,) in db.query(Post.id).all()])
-            already_seen = set(liked_post_ids) | set(scores.keys())
-            # Busca posts que o usuário não curtiu e que não estão nas recomendações
-            for post_id in all_post_ids:
-                if post_id not in already_seen:
-                    scores[post_id] += 0.5  # Score menor para posts "frios"
-            return scores # Retorna {post_id: score}
+    def _remove(self, post_id):
+        """Remove um post do índice zerando sua linha (deve ser chamado com o lock)."""
+        row = self._post_rows.pop(post_id, None)
+        if row is not None:
+            self._weights[row, :] = 0
+            self._post_ids[row] = 0
+
+    def on_post_created(self, post, **_):
+        """Listener de 'post_created' do DatabaseManager."""
+        with self._lock:
+            if self._loaded_at is not None:
+                self._add(post.id, post.tag, post.optional_tags)
+
+    def on_post_deleted(self, post_id, **_):
+        """Listener de 'post_deleted' do DatabaseManager."""
+        with self._lock:
+            if self._loaded_at is not None:
+                self._remove(post_id)
+
+    def scores(self, tags):
+        """Retorna (post_ids, scores) dos posts com alguma tag em comum com `tags`."""
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.RELOAD_INTERVAL:
+                self.load()
+            user_vector = np.zeros(self._weights.shape[1], dtype=np.int16)
+            cols = [self._tag_cols[t] for t in tags if t in self._tag_cols]
+            user_vector[cols] = 1
+            scores = self._weights[:self._size] @ user_vector
+            post_ids = self._post_ids[:self._size]
+        matched = np.flatnonzero(scores > 0)
+        return post_ids[matched], scores[matched]
 
 class ContentBasedStrategy(RecommendationStrategy):
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, tag_index=None):
         self.db_manager = db_manager
+        self.tag_index = tag_index or TagIndex(db_manager)
 
     def get_scores(self, user_id):
         with self.db_manager.get_db() as db:
+            # Posts com que o usuário interagiu: comentários/visualizações, reações ao post e reações a comentários do post
+            interacted = union(
+                select(Interaction.post_id).where(Interaction.user_id == user_id),
+                select(Reaction.target_id).where(Reaction.user_id == user_id, Reaction.target_type == 'post'),
+                select(Interaction.post_id).join(
+                    Reaction, and_(Reaction.target_type == 'comment', Reaction.target_id == Interaction.id)
+                ).where(Reaction.user_id == user_id)
+            ).subquery()
             # Busca categorias/tags dos posts que o usuário interagiu
             user_interactions = db.query(Post.tag, Post.optional_tags).join(
-                Interaction, Interaction.post_id == Post.id
-            ).filter(
-                Interaction.user_id == user_id
-            ).all()
-            tags = set() # Conjunto para armazenar tags/categorias
-            for tag, optional_tags in user_interactions:
-                tags.add(tag)
-                if optional_tags:
-                    tags.update(optional_tags.split(',')) # Separa e adiciona sub-tags
-            
-            # Busca todos os posts e compara as tags
-            posts = db.query(Post.id, Post.tag, Post.optional_tags).all()
-            scores = defaultdict(int) # Dicionário para pontuação
-            for post_id, tag, optional_tags in posts:
-                score = 0
-                if tag in tags:
-                    score += 2 # Pontuação maior para categoria principal
-                if optional_tags:
-                    for t in optional_tags.split(','):
-                        if t in tags:
-                            score += 1 # Pontuação para sub-tags
-                if score > 0:
-                    scores[post_id] = score # Só adiciona se houver pontuação
-            return scores # Retorna {post_id: score}
+                interacted, interacted.c.post_id == Post.id
+            ).distinct().all()
+        tags = set() # Conjunto para armazenar tags/categorias
+        for tag, optional_tags in user_interactions:
+            tags.add(tag)
+            if optional_tags:
+                tags.update(optional_tags.split(',')) # Separa e adiciona sub-tags
+
+        # Compara as tags com o índice pré-computado em vez de ler todos os posts
+        return self.tag_index.scores(tags) # Retorna (post_ids, scores)
+
+def build_item_similarity(db_manager, path, top_k=20, block_size=1024):
+    """
+    Job offline: calcula, para cada post, os `top_k` posts mais semelhantes pela
+    similaridade de cosseno entre seus vetores de likes e salva o resultado em `path`
+    (arrays numpy sem compressão, que o ItemSimilarityStrategy abre com memory-map).
+    Retorna a quantidade de posts no modelo.
+    """
+    with db_manager.get_db() as db:
+        likes = db.query(Reaction.user_id, Reaction.target_id).join(
+            Post, Post.id == Reaction.target_id
+        ).filter(
+            Reaction.target_type == 'post',
+            Reaction.type == 'like_post',
+            Post.is_deleted == False
+        ).all()
+
+    user_ids = np.fromiter((u for u, _ in likes), dtype=np.int64, count=len(likes))
+    liked_post_ids = np.fromiter((p for _, p in likes), dtype=np.int64, count=len(likes))
+    users, rows = np.unique(user_ids, return_inverse=True)
+    post_ids, cols = np.unique(liked_post_ids, return_inverse=True)
+
+    # Vetores de likes por post (post × usuário), normalizados para que o produto seja o cosseno
+    items = sparse.csr_matrix(
+        (np.ones(len(likes), dtype=np.float32), (cols, rows)),
+        shape=(len(post_ids), len(users))
+    )
+    items = normalize(items, norm='l2', axis=1)
+
+    neighbors = np.full((len(post_ids), top_k), -1, dtype=np.int32) # Linha do vizinho (-1 = vazio)
+    similarities = np.zeros((len(post_ids), top_k), dtype=np.float32)
+    # Calcula em blocos de linhas para não materializar a matriz post × post inteira
+    for start in range(0, len(post_ids), block_size):
+        block = (items[start:start + block_size] @ items.T).tocsr()
+        for offset in range(block.shape[0]):
+            row = start + offset
+            cols_row = block.indices[block.indptr[offset]:block.indptr[offset + 1]]
+            sims_row = block.data[block.indptr[offset]:block.indptr[offset + 1]]
+            keep = cols_row != row # O próprio post não é vizinho dele mesmo
+            cols_row, sims_row = cols_row[keep], sims_row[keep]
+            if len(sims_row) > top_k:
+                best = np.argpartition(-sims_row, top_k)[:top_k]
+                cols_row, sims_row = cols_row[best], sims_row[best]
+            order = np.argsort(-sims_row)
+            neighbors[row, :len(order)] = cols_row[order]
+            similarities[row, :len(order)] = sims_row[order]
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    joblib.dump({'post_ids': post_ids, 'neighbors': neighbors, 'similarities': similarities}, tmp_path)
+    os.replace(tmp_path, path) # Troca atômica: os workers nunca leem um arquivo pela metade
+    return len(post_ids)
+
+class ItemSimilarityStrategy(RecommendationStrategy):
+    """
+    Pontua posts pela vizinhança (top-K por cosseno) dos posts que o usuário curtiu.
+    A vizinhança é gerada offline por `build_item_similarity`; aqui só há consultas
+    aos arrays memory-mapped, então o custo é O(likes × K).
+    """
+    def __init__(self, db_manager, like_matrix=None, path=None):
+        self.db_manager = db_manager
+        self.like_matrix = like_matrix or LikeMatrix(db_manager)
+        self.path = path
+        self._lock = threading.Lock()
+        self._model = None
+        self._model_mtime = None
+
+    def init_app(self, app):
+        self.path = app.config.get('ITEM_SIMILARITY_PATH', self.path)
+
+    def _get_model(self):
+        """Abre o modelo com memory-map, reabrindo quando o job gera um arquivo novo."""
+        try:
+            mtime = os.path.getmtime(self.path) if self.path else None
+        except OSError:
+            mtime = None
+        if mtime is None:
+            return None
+        with self._lock:
+            if mtime != self._model_mtime:
+                try:
+                    self._model = joblib.load(self.path, mmap_mode='r')
+                    self._model_mtime = mtime
+                except Exception as e:
+                    logging.getLogger(__name__).warning(f"Não foi possível carregar o modelo de similaridade: {e}")
+            return self._model
+
+    def get_scores(self, user_id):
+        model = self._get_model()
+        if model is None:
+            return {}
+        post_ids = model['post_ids']
+        liked = self.like_matrix.liked_posts(user_id)
+        if not liked.size or not len(post_ids):
+            return {}
+
+        # Linhas do modelo correspondentes aos posts curtidos (post_ids é ordenado)
+        in_model = liked[np.isin(liked, post_ids)]
+        if not in_model.size:
+            return {}
+        rows = np.searchsorted(post_ids, in_model)
+
+        neighbors = np.asarray(model['neighbors'][rows]).ravel()
+        similarities = np.asarray(model['similarities'][rows]).ravel()
+        valid = neighbors >= 0
+        candidate_ids = post_ids[neighbors[valid]]
+        similarities = similarities[valid]
+        not_liked = ~np.isin(candidate_ids, liked)
+        candidate_ids, similarities = candidate_ids[not_liked], similarities[not_liked]
+
+        # Vizinhos repetidos (semelhantes a mais de um post curtido) são somados pelo engine
+        return candidate_ids, similarities # Retorna (post_ids, scores)
 
 class RecommendationEngine:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, max_workers=4, strategy_timeout=2.0):
         self.db_manager = db_manager
         self.strategies = [] # Lista de estratégias registradas
+        self.strategy_timeout = strategy_timeout # Segundos que cada estratégia tem para responder
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='recommendation')
+        self.cache = MemoryCache(namespace='rec:') # Rankings por usuário
+
+    def init_app(self, app):
+        self.strategy_timeout = app.config.get('RECOMMENDATION_STRATEGY_TIMEOUT', self.strategy_timeout)
+        max_workers = app.config.get('RECOMMENDATION_MAX_WORKERS')
+        if max_workers:
+            self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='recommendation')
+
+        self.cache = create_cache(
+            app.config.get('RECOMMENDATION_CACHE_URL'),
+            max_entries=app.config.get('RECOMMENDATION_CACHE_MAX_ENTRIES', 10000),
+            default_ttl=app.config.get('RECOMMENDATION_CACHE_TTL', 300),
+            namespace='rec:'
+        )
+        # Invalida o cache quando algo de que as pontuações dependem muda
+        self.db_manager.add_listener('post_reaction', self.on_user_interaction)
+        self.db_manager.add_listener('interaction_registered', self.on_user_interaction)
+        self.db_manager.add_listener('post_created', self.on_posts_changed)
+        self.db_manager.add_listener('post_deleted', self.on_posts_changed)
+
+    def on_user_interaction(self, user_id, **_):
+        self.invalidate(user_id)
+
+    def on_posts_changed(self, **_):
+        self.invalidate()
+
+    def invalidate(self, user_id=None):
+        """Remove o ranking em cache de um usuário, ou de todos se user_id for None."""
+        if user_id is None:
+            self.cache.clear()
+        else:
+            self.cache.delete(str(user_id))
 
     def register_strategy(self, strategy):
         self.strategies.append(strategy) # Adiciona uma estratégia
 
+    @staticmethod
+    def _as_arrays(scores):
+        """Normaliza o retorno de get_scores para (post_ids, scores) em arrays numpy."""
+        if isinstance(scores, tuple):
+            post_ids, values = scores
+            return np.asarray(post_ids, dtype=np.int64), np.asarray(values, dtype=np.float64)
+        post_ids = np.fromiter(scores.keys(), dtype=np.int64, count=len(scores))
+        values = np.fromiter(scores.values(), dtype=np.float64, count=len(scores))
+        return post_ids, values
+
+    def _collect_scores(self, user_id):
+        """Executa as estratégias em paralelo; as que estouram o timeout são ignoradas."""
+        started = time.monotonic()
+        futures = [
+            (strategy, self._executor.submit(strategy.get_scores, user_id))
+            for strategy in self.strategies
+        ]
+        results = []
+        for strategy, future in futures:
+            timeout = strategy.timeout if strategy.timeout is not None else self.strategy_timeout
+            remaining = max(0.0, started + timeout - time.monotonic())
+            try:
+                results.append(self._as_arrays(future.result(timeout=remaining)))
+            except FutureTimeoutError:
+                future.cancel()
+                logging.getLogger(__name__).warning(f"{type(strategy).__name__} excedeu {timeout}s e foi ignorada para o usuário {user_id}.")
+            except Exception as e:
+                logging.getLogger(__name__).error(f"{type(strategy).__name__} falhou para o usuário {user_id}: {e}")
+        return results
+
+    def rank_posts(self, user_id, top_n=10, use_cache=True):
+        if use_cache:
+            cached = self.cache.get(str(user_id))
+            if cached and cached['top_n'] >= top_n:
+                return [tuple(item) for item in cached['ranked'][:top_n]]
+
+        ranked = self._rank(user_id, top_n)
+        self.cache.set(str(user_id), {'top_n': top_n, 'ranked': ranked})
+        return ranked
+
+    def _rank(self, user_id, top_n):
+        results = self._collect_scores(user_id)
+        if not results:
+            return []
+        post_ids = np.concatenate([ids for ids, _ in results])
+        scores = np.concatenate([values for _, values in results])
+        if not post_ids.size:
+            return []
+
+        # Soma as pontuações de todas as estratégias por post
+        unique_ids, inverse = np.unique(post_ids, return_inverse=True)
+        combined = np.bincount(inverse, weights=scores, minlength=len(unique_ids))
+
+        # Seleciona o top-N sem ordenar todos os candidatos: só quem alcança o N-ésimo maior score
+        if len(combined) > top_n:
+            kth = np.partition(combined, len(combined) - top_n)[len(combined) - top_n]
+            top = np.flatnonzero(combined >= kth)
+        else:
+            top = np.arange(len(combined))
+        order = top[np.lexsort((-unique_ids[top], -combined[top]))][:top_n] # Score desc, posts mais novos primeiro no empate
+        return list(zip(unique_ids[order].tolist(), combined[order].tolist())) # Retorna [(post_id, score)] dos posts recomendados
+
     def recommend_posts(self, user_id, top_n=10):
-        combined_scores = defaultdict(float) # Dicionário para somar pontuações de todas estratégias
-        for strategy in self.strategies:
-            scores = strategy.get_scores(user_id) # Obtém pontuações da estratégia
-            for post_id, score in scores.items():
-                combined_scores[post_id] += score # Soma pontuações
-        recommended = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True) # Ordena por score
-        return [post_id for post_id, score in recommended[:top_n]] # Retorna os IDs dos posts recomendados
+        return [post_id for post_id, score in self.rank_posts(user_id, top_n)] # Retorna os IDs dos posts recomendados
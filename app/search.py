@@ -0,0 +1,350 @@
+from sqlalchemy import func, or_, and_, desc, text, cast, literal
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+from app.database import Post, User, UserDetails, SEARCH_CONFIG
+from app.data_sanitizer import ALLOWED_CATEGORIES, POST_TAGS
+from app.cache import MemoryCache, create_cache
+from bisect import bisect_left, bisect_right
+import base64
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+class SearchService:
+    """
+    Busca de posts compartilhada pela página /pesquisar e pela API.
+
+    - Busca textual (search_vector, índice GIN) ordenada por ts_rank; se não encontrar nada,
+      usa a busca aproximada por trigramas (pg_trgm + unaccent) ordenada pela similaridade.
+    - Paginação por cursor (keyset) sobre (relevância, id): cada página é uma consulta com LIMIT,
+      sem OFFSET crescente, e os resultados nunca são todos materializados.
+    - Limite máximo de resultados por busca (max_results), inclusive na contagem exibida.
+    - Os cards são carregados em lote com db_manager.hydrate_posts (contadores, reação e salvos).
+    - As páginas ficam em cache por pouco tempo (apenas IDs, total e cursor; os dados de cada
+      usuário são recarregados a cada requisição). O cache é limpo quando um post é criado ou deletado.
+    """
+    def __init__(self, db_manager, app=None):
+        self.db_manager = db_manager
+        self.page_size = 20
+        self.max_page_size = 50
+        self.max_results = 500
+        self.fuzzy_threshold = 0.3
+        self.cache = MemoryCache(default_ttl=60, namespace='search:')
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.page_size = app.config.get('SEARCH_PAGE_SIZE', self.page_size)
+        self.max_results = app.config.get('SEARCH_MAX_RESULTS', self.max_results)
+        self.fuzzy_threshold = app.config.get('SEARCH_FUZZY_THRESHOLD', self.fuzzy_threshold)
+
+        self.cache = create_cache(
+            app.config.get('SEARCH_CACHE_URL'),
+            max_entries=app.config.get('SEARCH_CACHE_MAX_ENTRIES', 2000),
+            default_ttl=app.config.get('SEARCH_CACHE_TTL', 60),
+            namespace='search:'
+        )
+        # Resultados em cache ficam desatualizados quando o conjunto de posts muda
+        self.db_manager.add_listener('post_created', self.on_posts_changed)
+        self.db_manager.add_listener('post_deleted', self.on_posts_changed)
+
+    def on_posts_changed(self, **_):
+        self.cache.clear()
+
+    @staticmethod
+    def parse_query(raw_query: str):
+        """Separa o filtro de categoria entre parênteses: 'birras (Comportamento)' -> ('birras', 'Comportamento')."""
+        query = (raw_query or '').strip()
+        category = None
+        category_match = re.search(r'\(([^)]+)\)', query)
+        if category_match:
+            category = category_match.group(1).strip()
+            query = query.replace(f'({category_match.group(1)})', '').strip()
+        return query, category
+
+    def search(self, raw_query: str, viewer_id: int = None, cursor: str = None, limit: int = None, mode: str = None, threshold: float = None):
+        """
+        Executa uma página da busca. `cursor` é o next_cursor da página anterior (ou None na primeira).
+        `mode` força 'text' ou 'fuzzy'; por padrão usa a busca textual com fallback aproximado.
+        Retorna dict com query, category, mode, cards (de hydrate_posts), total (limitado a
+        max_results), total_capped e next_cursor (None na última página).
+        Levanta ValueError se o cursor for inválido.
+        """
+        query, category = self.parse_query(raw_query)
+        limit = min(max(limit or self.page_size, 1), self.max_page_size)
+        threshold = self._clamp_threshold(threshold)
+
+        position = None
+        served = 0
+        if cursor:
+            mode, position, served = self._decode_cursor(cursor)
+        limit = min(limit, self.max_results - served)
+
+        cache_key = json.dumps([' '.join(query.lower().split()), (category or '').lower(), cursor or '', mode, limit, threshold])
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            cached = self._search_page(query, category, mode, threshold, position, served, limit)
+            self.cache.set(cache_key, cached)
+
+        return {
+            'query': query,
+            'category': category,
+            'mode': cached['mode'],
+            'cards': self.db_manager.hydrate_posts(cached['post_ids'], viewer_id),
+            'total': cached['total'],
+            'total_capped': cached['total'] >= self.max_results,
+            'next_cursor': cached['next_cursor']
+        }
+
+    def _search_page(self, query, category, mode, threshold, position, served, limit):
+        # Executa a busca no banco; o resultado (sem dados do usuário) é o que vai para o cache
+        with self.db_manager.get_db() as db:
+            if mode is None:
+                mode = 'text'
+                if query and not self._matches(db, query, category, 'text', threshold).first():
+                    mode = 'fuzzy'
+            if mode == 'fuzzy':
+                # Em um SAVEPOINT: se falhar, só ele é desfeito, não a transação da requisição (sessão compartilhada)
+                savepoint = db.begin_nested()
+                try:
+                    total, rows = self._fetch_page(db, query, category, mode, threshold, position, limit)
+                    savepoint.commit()
+                except Exception as e:
+                    # Sem pg_trgm/unaccent no banco: a busca aproximada simplesmente não retorna resultados
+                    savepoint.rollback()
+                    logging.getLogger(__name__).warning(f"Busca aproximada indisponível: {e}")
+                    total, rows = 0, []
+            else:
+                total, rows = self._fetch_page(db, query, category, mode, threshold, position, limit)
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        served += len(rows)
+        next_cursor = None
+        if has_more and served < self.max_results:
+            last_id, last_rank = rows[-1]
+            next_cursor = self._encode_cursor(mode, last_rank, last_id, served)
+
+        return {
+            'mode': mode,
+            'post_ids': [post_id for post_id, _ in rows],
+            'total': total,
+            'next_cursor': next_cursor
+        }
+
+    def search_users(self, query: str, limit: int = 10, threshold: float = None):
+        """Busca aproximada de usuários ativos por @username ou nome de exibição, ordenada pela similaridade."""
+        term = _normalize(query)
+        username, display_name = _normalize(User.username), _normalize(UserDetails.display_name)
+        pattern = _normalize(_like_pattern(query))
+        similarity = func.greatest(func.word_similarity(term, username), func.coalesce(func.word_similarity(term, display_name), 0))
+
+        with self.db_manager.get_db() as db:
+            _set_similarity_threshold(db, self._clamp_threshold(threshold))
+            rows = db.query(User.id, User.username, UserDetails.display_name, UserDetails.icon_url).join(
+                UserDetails, UserDetails.user_id == User.id
+            ).filter(
+                User.active == True,
+                or_(
+                    term.op('<%')(username),
+                    term.op('<%')(display_name),
+                    username.like(pattern, escape='\\'),
+                    display_name.like(pattern, escape='\\')
+                )
+            ).order_by(desc(similarity), User.id).limit(min(max(limit, 1), self.max_page_size)).all()
+            return [
+                {'id': user_id, 'username': username, 'display_name': display_name, 'icon_url': icon_url}
+                for user_id, username, display_name, icon_url in rows
+            ]
+
+    def _fetch_page(self, db, query, category, mode, threshold, position, limit):
+        # Retorna (total limitado, [(post_id, relevância)]) com uma linha extra para saber se há próxima página
+        matches = self._matches(db, query, category, mode, threshold)
+        total = db.query(func.count()).select_from(matches.limit(self.max_results).subquery()).scalar()
+        if limit <= 0:
+            return total, []
+
+        # A relevância é convertida para double precision para que o cursor compare valores exatos
+        if not query:
+            rank = literal(0.0)
+        elif mode == 'fuzzy':
+            term = _normalize(query)
+            rank = func.greatest(func.word_similarity(term, _normalize(Post.title)), func.coalesce(func.word_similarity(term, _normalize(Post.tag)), 0))
+        else:
+            rank = func.ts_rank(Post.search_vector, func.websearch_to_tsquery(SEARCH_CONFIG, query))
+        rank = cast(rank, DOUBLE_PRECISION)
+
+        page = matches.add_columns(rank)
+        if position:
+            last_rank, last_id = position
+            page = page.filter(or_(rank < last_rank, and_(rank == last_rank, Post.id < last_id)))
+        return total, page.order_by(desc(rank), Post.id.desc()).limit(limit + 1).all()
+
+    def _matches(self, db, query, category, mode, threshold):
+        matches = db.query(Post.id).filter(Post.is_deleted == False)
+
+        if query and mode == 'fuzzy':
+            # Tolerante a acentos, maiúsculas, erros de digitação (similaridade >= threshold) e trechos de palavras
+            _set_similarity_threshold(db, threshold)
+            term = _normalize(query)
+            title, tag = _normalize(Post.title), _normalize(Post.tag)
+            pattern = _normalize(_like_pattern(query))
+            matches = matches.filter(or_(
+                term.op('<%')(title),
+                term.op('<%')(tag),
+                title.like(pattern, escape='\\')
+            ))
+        elif query:
+            matches = matches.filter(Post.search_vector.op('@@')(func.websearch_to_tsquery(SEARCH_CONFIG, query)))
+
+        # Aplica filtro de categoria se fornecido
+        if category:
+            matches = matches.filter(or_(
+                Post.tag.ilike(f'%{category}%'),
+                Post.optional_tags.ilike(f'%{category}%')
+            ))
+        return matches
+
+    def _clamp_threshold(self, threshold):
+        return min(max(threshold if threshold is not None else self.fuzzy_threshold, 0.0), 1.0)
+
+    @staticmethod
+    def _encode_cursor(mode, rank, post_id, served):
+        payload = json.dumps([mode, rank, post_id, served], separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        try:
+            mode, rank, post_id, served = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if mode not in ('text', 'fuzzy'):
+                raise ValueError(mode)
+            return mode, (float(rank), int(post_id)), int(served)
+        except Exception as e:
+            raise ValueError("Cursor de pesquisa inválido.") from e
+
+class SuggestionIndex:
+    """
+    Índice de prefixos em memória para o autocompletar da busca (/api/search/suggest).
+    Guarda chaves normalizadas (minúsculas, sem acentos) em uma lista ordenada, então cada
+    consulta é uma busca binária (bisect) seguida de uma varredura curta, sem acessar o banco.
+    Cada título/nome é indexado a partir de cada palavra, para sugerir também termos do meio.
+    Novos posts e usuários entram pelos listeners; uma recarga periódica cobre o resto
+    (edições de perfil e escritas feitas por outros workers).
+    """
+    RELOAD_INTERVAL = 600 # Segundos até recarregar do banco
+    MAX_POSTS = 20000 # Títulos mais recentes indexados
+    MAX_WORDS = 8 # Palavras de cada texto usadas como início de uma chave
+    MAX_SCAN = 300 # Máximo de chaves examinadas por consulta
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        self._keys = [] # Chaves normalizadas, ordenadas
+        self._entries = [] # (tipo, id, rótulo) na mesma posição da chave
+        self._removed_posts = set() # Posts deletados desde a última recarga
+
+    def load(self):
+        """(Re)constrói o índice com as categorias, os títulos mais recentes e os usuários ativos."""
+        with self.db_manager.get_db() as db:
+            posts = db.query(Post.id, Post.title).filter(Post.is_deleted == False).order_by(Post.id.desc()).limit(self.MAX_POSTS).all()
+            users = db.query(User.id, User.username, UserDetails.display_name).join(
+                UserDetails, UserDetails.user_id == User.id
+            ).filter(User.active == True).all()
+
+        items = []
+        for category in dict.fromkeys(POST_TAGS + ALLOWED_CATEGORIES):
+            items.extend(self._items(('category', None, category), category))
+        for user_id, username, display_name in users:
+            items.extend(self._items(('user', user_id, username), username, display_name))
+        for post_id, title in posts:
+            items.extend(self._items(('post', post_id, title), title))
+        items.sort(key=lambda item: item[0])
+
+        with self._lock:
+            self._keys = [key for key, _ in items]
+            self._entries = [entry for _, entry in items]
+            self._removed_posts = set()
+            self._loaded_at = time.monotonic()
+
+    def _items(self, entry, *texts):
+        # Gera (chave, entrada) para cada início de palavra dos textos
+        keys = set()
+        for value in texts:
+            words = normalize_text(value).split()
+            for start in range(min(len(words), self.MAX_WORDS)):
+                keys.add(' '.join(words[start:]))
+        return [(key, entry) for key in keys]
+
+    def _insert(self, entry, *texts):
+        """Insere uma entrada mantendo a ordenação (deve ser chamado com o lock)."""
+        for key, item in self._items(entry, *texts):
+            position = bisect_right(self._keys, key)
+            self._keys.insert(position, key)
+            self._entries.insert(position, item)
+
+    def on_post_created(self, post, **_):
+        """Listener de 'post_created' do DatabaseManager."""
+        with self._lock:
+            if self._loaded_at is not None:
+                self._insert(('post', post.id, post.title), post.title)
+
+    def on_post_deleted(self, post_id, **_):
+        """Listener de 'post_deleted' do DatabaseManager."""
+        with self._lock:
+            self._removed_posts.add(post_id)
+
+    def on_user_activated(self, user_id, username, **_):
+        """Listener de 'user_activated' do DatabaseManager."""
+        with self._lock:
+            if self._loaded_at is not None:
+                self._insert(('user', user_id, username), username)
+
+    def suggest(self, prefix: str, limit: int = 8):
+        """
+        Retorna até `limit` sugestões para o prefixo: categorias primeiro, depois usuários e títulos.
+        Cada sugestão é {'type': 'category'|'user'|'post', 'id', 'label'}.
+        """
+        prefix = normalize_text(prefix)
+        if not prefix:
+            return []
+        found = {'category': [], 'user': [], 'post': []}
+        seen = set()
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.RELOAD_INTERVAL:
+                self.load()
+            position = bisect_left(self._keys, prefix)
+            end = min(position + self.MAX_SCAN, len(self._keys))
+            while position < end and self._keys[position].startswith(prefix):
+                kind, entry_id, label = self._entries[position]
+                position += 1
+                # Títulos iguais de posts diferentes viram uma única sugestão
+                if (kind, label) in seen or len(found[kind]) >= limit:
+                    continue
+                if kind == 'post' and entry_id in self._removed_posts:
+                    continue
+                seen.add((kind, label))
+                found[kind].append({'type': kind, 'id': entry_id, 'label': label})
+        return (found['category'] + found['user'] + found['post'])[:limit]
+
+def normalize_text(value):
+    """Minúsculas e sem acentos ('Amamentação' -> 'amamentacao'), como no f_unaccent do banco."""
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+def _normalize(expr):
+    # Mesma expressão dos índices de trigramas criados em init_all_dbs
+    return func.lower(func.f_unaccent(expr))
+
+def _like_pattern(query: str):
+    escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+def _set_similarity_threshold(db, threshold: float):
+    # Equivale a SET LOCAL: vale só para a transação atual. O operador <% usa esse limite e o índice GIN.
+    db.execute(text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"), {'threshold': str(threshold)})
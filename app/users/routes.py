@@ -4,7 +4,7 @@ from app.extensions import login_required, db_manager, s3
 from app.database import UserDetails
 from app.data_sanitizer import ProfileEditForm
 from botocore.exceptions import ClientError
-from app.main.routes import get_interactions
+from app.api.routes import get_post_cards
 from app.users import bp
 from PIL import Image
 from urllib.parse import unquote
@@ -60,27 +60,7 @@ def upload_to_s3(file, folder):
     return None
 
 def get_user_posts(id):
-    posts = []
-    for post in db_manager.get_user_posts(id):
-        post_reactions = get_interactions(post.id)
-        posts.append({  
-            'id': post.id,
-            'title': post.title,
-            'content': post.content,
-            'tag': post.tag,
-            'optional_tags': post.optional_tags,
-            'created_at': post.created_at,
-            'author': post.author_user.display_name,
-            'authorat': post.author_user.user.username,
-            'authoricon': post.author_user.icon_url,
-            'userid': post.author_user.user_id,
-            'image_urls': json.loads(post.image_urls) if post.image_urls else [], 
-            'likes': post_reactions["likes"],
-            'dislikes': post_reactions["dislikes"],
-            'comments': post_reactions["comments"],
-            'user_reaction': post_reactions["user_reaction"]
-        })
-    return posts
+    return get_post_cards(db_manager.get_user_post_ids(id))
 
 @bp.route('/<int:id>')
 def view_profile(id):
@@ -14,8 +14,65 @@ class Config:
     SESSION_COOKIE_SAMESITE = 'Lax'
     PERMANENT_SESSION_LIFETIME = 2678400 # 31 dias em segundos
 
+    # Banco de dados. O pool é por processo: cada worker do gunicorn abre até DB_POOL_SIZE + DB_MAX_OVERFLOW
+    # conexões. DB_STATEMENT_TIMEOUT_MS (0 desativa) limita cada consulta das requisições e dos jobs;
+    # inicialização, migrações e comandos de manutenção rodam sem limite.
+    DATABASE_URL = os.getenv('DATABASE_URL')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800)) # Segundos; -1 mantém as conexões indefinidamente
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10)) # Espera máxima por uma conexão livre
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+    # PgBouncer em transaction pooling: NullPool e statement_timeout por transação (SET LOCAL)
+    DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', 'false').lower() == 'true'
+
+    # Sessão compartilhada por requisição (False = uma sessão por chamada)
+    DB_REQUEST_SCOPED_SESSION = os.getenv('DB_REQUEST_SCOPED_SESSION', 'true').lower() == 'true'
+
     # AWS S3
     AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
     AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
     AWS_REGION = os.getenv('AWS_REGION')
-    S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
\ No newline at end of file
+    S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
+
+    # Feed de recomendações pré-computado
+    FEED_SIZE = int(os.getenv('FEED_SIZE', 50))
+    FEED_REFRESH_DELAY = float(os.getenv('FEED_REFRESH_DELAY', 2))
+    FEED_BACKGROUND_REFRESH = os.getenv('FEED_BACKGROUND_REFRESH', 'true').lower() == 'true'
+
+    # Modelo de similaridade item-item (gerado por `flask recommendations build-similarity`)
+    ITEM_SIMILARITY_PATH = os.getenv('ITEM_SIMILARITY_PATH', os.path.join('instance', 'item_similarity.joblib'))
+    ITEM_SIMILARITY_TOP_K = int(os.getenv('ITEM_SIMILARITY_TOP_K', 20))
+
+    # Execução das estratégias de recomendação
+    RECOMMENDATION_MAX_WORKERS = int(os.getenv('RECOMMENDATION_MAX_WORKERS', 4))
+    RECOMMENDATION_STRATEGY_TIMEOUT = float(os.getenv('RECOMMENDATION_STRATEGY_TIMEOUT', 2))
+
+    # Cache de recomendações (em memória por padrão; redis://... para compartilhar entre workers)
+    RECOMMENDATION_CACHE_URL = os.getenv('RECOMMENDATION_CACHE_URL')
+    RECOMMENDATION_CACHE_TTL = int(os.getenv('RECOMMENDATION_CACHE_TTL', 300))
+    RECOMMENDATION_CACHE_MAX_ENTRIES = int(os.getenv('RECOMMENDATION_CACHE_MAX_ENTRIES', 10000))
+
+    # Busca de posts: tamanho da página e máximo de resultados navegáveis por busca
+    SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', 20))
+    SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', 500))
+
+    # Cache de resultados de busca (apenas IDs; redis://... para compartilhar entre workers)
+    SEARCH_CACHE_URL = os.getenv('SEARCH_CACHE_URL')
+    SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 60))
+    SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 2000))
+
+    # Busca aproximada (pg_trgm): similaridade mínima entre 0 e 1
+    SEARCH_FUZZY_THRESHOLD = float(os.getenv('SEARCH_FUZZY_THRESHOLD', 0.3))
+
+    # Particionamento mensal de interactions: partições criadas à frente e meses mantidos no banco
+    # antes de `flask interactions archive` exportar a partição para INTERACTIONS_ARCHIVE_DIR
+    INTERACTIONS_PARTITIONS_AHEAD = int(os.getenv('INTERACTIONS_PARTITIONS_AHEAD', 3))
+    INTERACTIONS_HOT_MONTHS = int(os.getenv('INTERACTIONS_HOT_MONTHS', 12))
+    INTERACTIONS_ARCHIVE_DIR = os.getenv('INTERACTIONS_ARCHIVE_DIR', os.path.join('instance', 'archive'))
+
+    # Reações com escrita adiada (write-behind): cliques acumulados em memória e gravados em lote
+    REACTIONS_WRITE_BEHIND = os.getenv('REACTIONS_WRITE_BEHIND', 'false').lower() == 'true'
+    REACTIONS_FLUSH_INTERVAL_MS = int(os.getenv('REACTIONS_FLUSH_INTERVAL_MS', 200))
+    REACTIONS_FLUSH_MAX_BATCH = int(os.getenv('REACTIONS_FLUSH_MAX_BATCH', 1000))
+    REACTIONS_FLUSH_MAX_ATTEMPTS = int(os.getenv('REACTIONS_FLUSH_MAX_ATTEMPTS', 3)) # Flushes com erro antes de descartar a reação
@@ -0,0 +1,50 @@
+"""
+Os testes que usam o banco rodam em um PostgreSQL descartável indicado por TEST_DATABASE_URL
+(o schema public é apagado e recriado a cada teste). Sem a variável, esses testes são pulados.
+"""
+import os
+import pytest
+from sqlalchemy import text
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+# app.database cria os engines na importação a partir de DATABASE_URL (sem conectar)
+os.environ['DATABASE_URL'] = TEST_DATABASE_URL or 'postgresql+psycopg2://localhost/tcc_test'
+os.environ.setdefault('SECRET_KEY', 'test')
+os.environ['FEED_BACKGROUND_REFRESH'] = 'false'
+os.environ['REACTIONS_WRITE_BEHIND'] = 'false'
+
+@pytest.fixture
+def empty_database():
+    """Banco de testes sem nenhuma tabela."""
+    if not TEST_DATABASE_URL:
+        pytest.skip('TEST_DATABASE_URL não definida')
+    from app.database import engine, maintenance_engine
+    engine.dispose()
+    with maintenance_engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE;"))
+        conn.execute(text("CREATE SCHEMA public;"))
+    yield maintenance_engine
+    engine.dispose()
+
+@pytest.fixture
+def database(empty_database):
+    """Banco de testes com o schema atual (init_all_dbs)."""
+    from app.extensions import db_manager
+    db_manager.init_all_dbs()
+    return empty_database
+
+@pytest.fixture
+def app(empty_database):
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+def create_user(db_manager, username='usuario'):
+    """Cria e ativa um usuário (com users_details), retornando o id."""
+    email = f'{username}@example.com'
+    success, message = db_manager.save_user(username, email, 'senha-de-teste')
+    assert success, message
+    assert db_manager.activate_user(email)
+    return db_manager._get_user_by_field('email', email).id
@@ -0,0 +1,89 @@
+import time
+from app.database import UserFeed
+from app.extensions import db_manager, recommendation_engine, popularity_prior, tag_index
+from app.feed import FeedRefresher
+from conftest import create_user
+
+def feed_of(user_id):
+    return db_manager.get_user_feed(user_id, limit=50)
+
+def feed_scores(user_id):
+    with db_manager.get_db() as db:
+        return dict(db.query(UserFeed.post_id, UserFeed.score).filter(UserFeed.user_id == user_id).all())
+
+def test_new_post_is_inserted_into_feeds_without_refreshing(database):
+    refresher = FeedRefresher(db_manager, recommendation_engine, popularity_prior, tag_index)
+    refresher.feed_size = 3
+    ana, bia, caio = (create_user(db_manager, name) for name in ('ana', 'bia', 'caio'))
+    old_posts = [db_manager.create_post(ana, f'Post {i}', 'Conteúdo', 'rotina')[1] for i in range(3)]
+    sleep_post = db_manager.create_post(ana, 'Sono', 'Conteúdo', 'geral', optional_tags='sono,bebê')[1]
+    db_manager._register_interaction(bia, sleep_post, 'comment_post', 'Comentário') # bia: geral, sono, bebê
+
+    base = popularity_prior.new_post_score()
+    db_manager.save_user_feed(ana, [(old_posts[0], base + 1), (old_posts[1], base - 0.1), (old_posts[2], base - 0.2)])
+    db_manager.save_user_feed(bia, [(old_posts[0], base + 1.5), (old_posts[1], base + 0.5)])
+    db_manager.save_user_feed(caio, [(old_posts[0], base + 3), (old_posts[1], base + 2), (old_posts[2], base + 1)])
+
+    new_post = db_manager.create_post(caio, 'Dúvida', 'Conteúdo', 'saude', optional_tags='sono')[1]
+    assert refresher.add_post_to_feeds(new_post, 'saude', 'sono') == 2
+    # ana: só a pontuação de post novo, o último post sai do feed cheio
+    assert feed_of(ana) == [old_posts[0], new_post, old_posts[1]]
+    # bia: + peso da tag opcional "sono"
+    assert feed_of(bia) == [old_posts[0], new_post, old_posts[1]]
+    assert feed_scores(bia)[new_post] == base + tag_index.OPTIONAL_TAG_WEIGHT
+    # caio: o post não alcança o feed
+    assert feed_of(caio) == old_posts
+
+    # Mesma pontuação que o RecommendationEngine daria ao recalcular o feed
+    popularity_prior.refresh()
+    ranked = dict(recommendation_engine.rank_posts(bia, top_n=10, use_cache=False))
+    assert abs(ranked[new_post] - feed_scores(bia)[new_post]) < 1e-3
+    # Repetir não duplica o post
+    assert refresher.add_post_to_feeds(new_post, 'saude', 'sono') == 0
+
+def test_inserted_posts_keep_the_ranking_order(database):
+    refresher = FeedRefresher(db_manager, recommendation_engine, popularity_prior, tag_index)
+    refresher.feed_size = 4
+    ana = create_user(db_manager, 'ana')
+    old_posts = [db_manager.create_post(ana, f'Post {i}', 'Conteúdo', 'rotina')[1] for i in range(2)]
+    base = popularity_prior.new_post_score()
+    db_manager.save_user_feed(ana, [(old_posts[0], base + 1), (old_posts[1], base - 1)])
+
+    # Os dois entram na mesma posição (a de old_posts[1]); o mais novo vem antes no empate de score
+    new_posts = [db_manager.create_post(ana, f'Novo {i}', 'Conteúdo', 'rotina')[1] for i in range(2)]
+    for post_id in new_posts:
+        refresher.add_post_to_feeds(post_id, 'rotina')
+    assert feed_of(ana) == [old_posts[0], new_posts[1], new_posts[0], old_posts[1]]
+
+    # Feed cheio: o último sai
+    newest = db_manager.create_post(ana, 'Mais novo', 'Conteúdo', 'rotina')[1]
+    refresher.add_post_to_feeds(newest, 'rotina')
+    assert feed_of(ana) == [old_posts[0], newest, new_posts[1], new_posts[0]]
+
+    db_manager.remove_post_from_feeds(new_posts[1])
+    assert feed_of(ana) == [old_posts[0], newest, new_posts[0]]
+
+def test_deleted_post_is_removed_by_the_background_thread(database):
+    refresher = FeedRefresher(db_manager, recommendation_engine, popularity_prior, tag_index)
+    refresher.refresh_delay = 0
+    ana = create_user(db_manager, 'ana')
+    posts = [db_manager.create_post(ana, f'Post {i}', 'Conteúdo', 'rotina')[1] for i in range(2)]
+    db_manager.save_user_feed(ana, [(posts[0], 2.0), (posts[1], 1.0)])
+
+    refresher.start()
+    refresher.on_post_deleted(posts[0])
+    deadline = time.monotonic() + 5
+    while feed_of(ana) != [posts[1]] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert feed_of(ana) == [posts[1]]
+
+def test_new_post_is_inserted_inline_without_the_background_thread(database):
+    refresher = FeedRefresher(db_manager, recommendation_engine, popularity_prior, tag_index)
+    ana = create_user(db_manager, 'ana')
+    old_post = db_manager.create_post(ana, 'Post', 'Conteúdo', 'rotina')[1]
+    db_manager.save_user_feed(ana, [(old_post, popularity_prior.new_post_score() - 1)])
+
+    new_post = db_manager.get_post_by_id(db_manager.create_post(ana, 'Novo', 'Conteúdo', 'rotina')[1])
+    refresher.on_post_created(new_post)
+    assert feed_of(ana) == [new_post.id, old_post]
+    assert refresher._created_posts == []
@@ -0,0 +1,26 @@
+from sqlalchemy import event, text
+from app.database import engine
+from app.extensions import db_manager
+from conftest import create_user
+
+def test_trending_query_is_served_by_hot_score_index(database):
+    user_id = create_user(db_manager)
+    for i in range(3):
+        db_manager.create_post(user_id, f'Post {i}', 'Conteúdo', 'geral')
+
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        post_ids = db_manager.get_posts_with_most_likes()
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    assert len(post_ids) == 3
+
+    statement, parameters = next((s, p) for s, p in statements if 'hot_score' in s and 'ORDER BY' in s)
+    with engine.begin() as conn:
+        conn.execute(text("SET LOCAL enable_seqscan = off;")) # Tabela pequena: força o planejador a mostrar se o índice serve
+        plan = '\n'.join(row[0] for row in conn.exec_driver_sql(f'EXPLAIN {statement}', parameters))
+    assert 'ix_posts_hot_score_id' in plan
+    assert 'Sort' not in plan
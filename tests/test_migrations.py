@@ -0,0 +1,71 @@
+import logging
+from datetime import datetime
+from sqlalchemy import text
+from app.database import calculate_hot_score
+from app.extensions import db_manager
+from app.partitions import is_partitioned
+
+# Tabelas do schema original (commit baseline), antes de contadores, hot_score, reactions e partições
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    id SERIAL PRIMARY KEY, username VARCHAR(32) NOT NULL UNIQUE, email VARCHAR(100) NOT NULL UNIQUE,
+    password TEXT NOT NULL, power SMALLINT, creation_date TIMESTAMP, active BOOLEAN
+);
+CREATE INDEX ix_users_id ON users (id);
+CREATE TABLE users_details (
+    id SERIAL PRIMARY KEY, user_id INTEGER NOT NULL UNIQUE REFERENCES users (id), display_name VARCHAR(32),
+    bio TEXT, badges TEXT, icon_url TEXT, banner_url TEXT
+);
+CREATE INDEX ix_users_details_id ON users_details (id);
+CREATE TABLE posts (
+    id SERIAL PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users_details (user_id), title VARCHAR(255) NOT NULL,
+    content TEXT NOT NULL, tag VARCHAR(25), optional_tags VARCHAR(75), created_at TIMESTAMP, image_urls TEXT, is_deleted BOOLEAN
+);
+CREATE INDEX ix_posts_id ON posts (id);
+CREATE TABLE interactions (
+    id SERIAL PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users_details (user_id), post_id INTEGER NOT NULL REFERENCES posts (id),
+    parent_interaction_id INTEGER REFERENCES interactions (id), type VARCHAR(50) NOT NULL, value VARCHAR(352),
+    is_deleted BOOLEAN, timestamp TIMESTAMP
+);
+CREATE INDEX ix_interactions_id ON interactions (id);
+"""
+
+BASELINE_DATA = """
+INSERT INTO users (id, username, email, password, power, creation_date, active) VALUES
+    (1, 'ana', 'ana@example.com', 'x', 0, now(), true), (2, 'bia', 'bia@example.com', 'x', 0, now(), true);
+INSERT INTO users_details (user_id) VALUES (1), (2);
+INSERT INTO posts (id, user_id, title, content, tag, created_at, is_deleted) VALUES (1, 1, 'Post', 'Conteúdo', 'geral', :created_at, false);
+INSERT INTO interactions (id, user_id, post_id, parent_interaction_id, type, value, is_deleted, timestamp) VALUES
+    (1, 1, 1, NULL, 'like_post', NULL, false, now()),
+    (2, 2, 1, NULL, 'like_post', NULL, false, now()),
+    (3, 2, 1, NULL, 'comment_post', 'Comentário', false, now()),
+    (4, 1, 1, 3, 'reply_comment', 'Resposta', false, now()),
+    (5, 1, 1, 3, 'like_comment', NULL, false, now());
+SELECT setval('users_id_seq', 2), setval('posts_id_seq', 1), setval('interactions_id_seq', 5);
+"""
+
+def test_upgrade_from_baseline_schema(empty_database, caplog):
+    created_at = datetime(2026, 1, 10, 12, 0)
+    with empty_database.begin() as conn:
+        conn.execute(text(BASELINE_SCHEMA))
+        conn.execute(text(BASELINE_DATA), {'created_at': created_at})
+
+    with caplog.at_level(logging.WARNING):
+        db_manager.init_all_dbs()
+    # pg_trgm/unaccent podem faltar no servidor de testes: a busca aproximada é opcional
+    failures = [record.getMessage() for record in caplog.records if 'trigram' not in record.getMessage()]
+    assert failures == []
+
+    with empty_database.connect() as conn:
+        post = conn.execute(text("SELECT like_count, dislike_count, comment_count, hot_score FROM posts WHERE id = 1;")).one()
+        comment = conn.execute(text("SELECT like_count, reply_count FROM interactions WHERE id = 3;")).one()
+        reactions = conn.execute(text("SELECT target_type, target_id, user_id, type FROM reactions ORDER BY id;")).all()
+        indexes = set(conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = 'interactions';")).scalars())
+        assert is_partitioned(conn)
+    assert tuple(post[:3]) == (2, 0, 1)
+    assert post.hot_score == calculate_hot_score(2, 0, 1, created_at)
+    assert tuple(comment) == (1, 1)
+    assert sorted(map(tuple, reactions)) == [('comment', 3, 1, 'like_comment'), ('post', 1, 1, 'like_post'), ('post', 1, 2, 'like_post')]
+    # Criado pela migração 1 e removido pela 4 (reações em reactions)
+    assert 'ix_interactions_user_type_post' in indexes
+    assert 'ix_interactions_post_reactions' not in indexes
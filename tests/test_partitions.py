@@ -0,0 +1,63 @@
+import csv
+import gzip
+import io
+from contextlib import contextmanager
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import text
+from app.extensions import db_manager
+from app.partitions import add_months, archive_partition, ensure_partitions, list_partitions, month_start, partition_name
+from app import partitions
+from conftest import create_user
+
+class FakeCopyCursor:
+    """Cursor do psycopg 3: cursor.copy(sql) é um gerenciador de contexto que itera blocos (memoryview)."""
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.statements = []
+
+    @contextmanager
+    def copy(self, sql):
+        self.statements.append(sql)
+        yield (memoryview(chunk) for chunk in self.chunks)
+
+def fake_conn(driver, cursor=None):
+    return SimpleNamespace(dialect=SimpleNamespace(driver=driver), connection=SimpleNamespace(cursor=lambda: cursor))
+
+def test_copy_with_psycopg3_writes_the_chunks():
+    cursor = FakeCopyCursor([b'id,value\n', '1,Olá\n'.encode('utf-8')])
+    archive = io.BytesIO()
+    partitions._copy_to_file(fake_conn('psycopg', cursor), "COPY interactions_y2020m01 TO STDOUT;", archive)
+    assert cursor.statements == ["COPY interactions_y2020m01 TO STDOUT;"]
+    assert archive.getvalue().decode('utf-8') == 'id,value\n1,Olá\n'
+
+def test_archive_fails_before_touching_anything_with_unsupported_driver(tmp_path):
+    engine = SimpleNamespace(dialect=SimpleNamespace(driver='asyncpg'), begin=None)
+    with pytest.raises(RuntimeError, match='asyncpg'):
+        archive_partition(engine, 'interactions_y2020m01', str(tmp_path / 'archive'))
+    assert not (tmp_path / 'archive').exists()
+
+def test_archive_partition_exports_and_drops_it(database, tmp_path):
+    ana, bia = create_user(db_manager, 'ana'), create_user(db_manager, 'bia')
+    post_id = db_manager.create_post(ana, 'Post', 'Conteúdo', 'geral')[1]
+    comment_id = db_manager._register_interaction(bia, post_id, 'comment_post', 'Comentário antigo')[1]
+    db_manager.toggle_comment_reaction(ana, comment_id, 'like_comment')
+    old_month = add_months(month_start(datetime.now()), -14)
+    with database.begin() as conn:
+        ensure_partitions(conn, first_month=old_month)
+        # Mover a linha para um mês antigo a leva para a partição daquele mês
+        conn.execute(text("UPDATE interactions SET timestamp = :ts WHERE id = :id;"), {'ts': datetime(old_month.year, old_month.month, 10), 'id': comment_id})
+
+    name = partition_name(old_month)
+    assert archive_partition(database, name, str(tmp_path)) == 1
+
+    with gzip.open(tmp_path / f'{name}.csv.gz', 'rt', encoding='utf-8') as archive:
+        rows = list(csv.DictReader(archive))
+    assert [(int(row['id']), row['value']) for row in rows] == [(comment_id, 'Comentário antigo')]
+    with gzip.open(tmp_path / f'{name}.reactions.csv.gz', 'rt', encoding='utf-8') as archive:
+        reactions = list(csv.DictReader(archive))
+    assert [(int(row['target_id']), row['type']) for row in reactions] == [(comment_id, 'like_comment')]
+    with database.connect() as conn:
+        assert name not in {partition[0] for partition in list_partitions(conn)}
+        assert conn.execute(text("SELECT count(*) FROM reactions WHERE target_type = 'comment';")).scalar() == 0
@@ -0,0 +1,32 @@
+from sqlalchemy import event
+from app.database import engine
+from app.extensions import db_manager
+from conftest import create_user
+
+def test_saved_posts_are_loaded_in_a_fixed_number_of_queries(database, app):
+    ana, bia = create_user(db_manager, 'ana'), create_user(db_manager, 'bia')
+    posts = [db_manager.create_post(bia, f'Post {i}', 'Conteúdo', 'geral')[1] for i in range(5)]
+    for post_id in posts:
+        db_manager.toggle_save_post(ana, post_id)
+    db_manager.delete_post_by_id(posts[2])
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['id'] = ana
+
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        response = client.get('/api/saved')
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+
+    assert response.status_code == 200
+    saved = response.get_json()['posts']
+    # Mais recentes primeiro, sem o post excluído, com os dados do card
+    assert [post['id'] for post in saved] == [posts[4], posts[3], posts[1], posts[0]]
+    assert all(post['is_saved'] and post['authorat'] == 'bia' for post in saved)
+    # IDs salvos + posts com autores + reações + salvos, sem uma consulta por post
+    assert len([s for s in statements if 'posts' in s]) == 3
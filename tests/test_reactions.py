@@ -0,0 +1,63 @@
+import logging
+from sqlalchemy.exc import IntegrityError, OperationalError
+from app.reactions import ReactionBuffer
+
+DELETED_USER = 99
+
+class FakeDatabaseManager:
+    """apply_reactions falha (chave estrangeira) em qualquer lote com uma reação do usuário apagado."""
+    def __init__(self):
+        self.stored = {}
+        self.calls = 0
+        self.unavailable = False
+
+    def get_reaction_state(self, user_id, target_type, target_id):
+        return target_id, self.stored.get((user_id, target_type, target_id))
+
+    def apply_reactions(self, reactions):
+        self.calls += 1
+        if self.unavailable:
+            raise OperationalError('INSERT INTO reactions ...', {}, Exception('server closed the connection unexpectedly'))
+        if any(user_id == DELETED_USER for user_id, _, _, _ in reactions):
+            raise IntegrityError('INSERT INTO reactions ...', {}, Exception('violates foreign key constraint'))
+        for user_id, target_type, target_id, reaction_type in reactions:
+            self.stored[(user_id, target_type, target_id)] = reaction_type
+        return len(reactions)
+
+def test_failing_reaction_does_not_block_the_batch(caplog):
+    manager = FakeDatabaseManager()
+    buffer = ReactionBuffer(manager)
+    for user_id in range(1, 9):
+        buffer.toggle(user_id, 'post', 1, 'like_post')
+    buffer.toggle(DELETED_USER, 'post', 1, 'like_post')
+
+    assert buffer.flush() == 8
+    assert len(manager.stored) == 8
+    # Só a reação com erro continua pendente (e nas contagens sobrepostas)
+    assert buffer.pending_reaction(DELETED_USER, 'post', 1) == (True, 'like_post')
+    assert buffer.count_delta('post', 1) == (1, 0)
+
+    with caplog.at_level(logging.ERROR):
+        assert buffer.flush() == 0
+        assert buffer.flush() == 0
+    assert buffer.pending_reaction(DELETED_USER, 'post', 1) == (False, None)
+    assert buffer.count_delta('post', 1) == (0, 0)
+    assert any('descartada' in record.getMessage() for record in caplog.records)
+    assert buffer.flush() == 0
+
+def test_unavailable_database_keeps_the_batch():
+    manager = FakeDatabaseManager()
+    buffer = ReactionBuffer(manager)
+    buffer.toggle(1, 'post', 1, 'like_post')
+    buffer.toggle(2, 'comment', 5, 'dislike_comment')
+
+    manager.unavailable = True
+    for _ in range(buffer.max_attempts + 1):
+        assert buffer.flush() == 0
+    assert manager.calls == buffer.max_attempts + 1 # Sem dividir o lote quando o banco está fora
+    assert buffer.pending_reaction(1, 'post', 1) == (True, 'like_post')
+
+    manager.unavailable = False
+    assert buffer.flush() == 2
+    assert manager.stored == {(1, 'post', 1): 'like_post', (2, 'comment', 5): 'dislike_comment'}
+    assert buffer.count_delta('comment', 5) == (0, 0)
@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import text
+from app.database import Interaction, UserDetails
+from app.extensions import db_manager
+from conftest import create_user
+
+def committed(engine, sql, **params):
+    """Lê por outra conexão: só enxerga o que foi commitado."""
+    with engine.connect() as conn:
+        return conn.execute(text(sql), params).scalar()
+
+def test_failed_inner_block_keeps_the_outer_transaction(database, app):
+    ana = create_user(db_manager, 'ana')
+    post_id = db_manager.create_post(ana, 'Post', 'Conteúdo', 'geral')[1]
+    with app.test_request_context():
+        with db_manager.get_db() as db:
+            details = db.query(UserDetails).filter(UserDetails.user_id == ana).one()
+            details.bio = 'Bio nova'
+            db.flush() # Gravado na transação, ainda não commitado
+
+            # O método interno falha no commit (post inexistente) e faz rollback
+            success, _ = db_manager._register_interaction(ana, post_id + 100, 'comment_post', 'Comentário')
+            assert not success
+            assert db.is_active
+            assert db.execute(text("SELECT bio FROM users_details WHERE user_id = :id;"), {'id': ana}).scalar() == 'Bio nova'
+            assert details.bio == 'Bio nova'
+
+            # Uma exceção que escapa do bloco interno também só desfaz o que ele fez
+            with pytest.raises(RuntimeError):
+                with db_manager.get_db() as inner:
+                    inner.execute(text("UPDATE users_details SET bio = 'Interno' WHERE user_id = :id;"), {'id': ana})
+                    raise RuntimeError('falha no bloco interno')
+            assert db.execute(text("SELECT bio FROM users_details WHERE user_id = :id;"), {'id': ana}).scalar() == 'Bio nova'
+            db.commit()
+
+    assert committed(database, "SELECT bio FROM users_details WHERE user_id = :id;", id=ana) == 'Bio nova'
+    assert committed(database, "SELECT count(*) FROM interactions;") == 0
+
+def test_inner_commit_is_written_and_uncommitted_work_is_discarded(database, app):
+    ana, bia = create_user(db_manager, 'ana'), create_user(db_manager, 'bia')
+    post_id = db_manager.create_post(ana, 'Post', 'Conteúdo', 'geral')[1]
+    comment_id = db_manager._register_interaction(ana, post_id, 'comment_post', 'Comentário')[1]
+    with app.test_request_context():
+        with db_manager.get_db() as db:
+            # Bloco interno sem commit: o que ele gravou na transação é desfeito na saída
+            with db_manager.get_db() as inner:
+                inner.add(Interaction(user_id=bia, post_id=post_id, type='comment_post', value='Sem commit'))
+                inner.flush()
+            assert db.query(Interaction).filter(Interaction.value == 'Sem commit').count() == 0
+
+            success, reply_id = db_manager.register_reply_to_comment(bia, comment_id, 'Resposta')
+            assert success
+        # O commit do método interno vale como antes, mesmo sem commit do bloco externo
+        assert committed(database, "SELECT count(*) FROM interactions WHERE id = :id;", id=reply_id) == 1
+    assert committed(database, "SELECT reply_count FROM interactions WHERE id = :id;", id=comment_id) == 1
+
+def test_outer_block_without_commit_does_not_leak_into_the_next_one(database, app):
+    ana = create_user(db_manager, 'ana')
+    with app.test_request_context():
+        with db_manager.get_db() as db:
+            details = db.query(UserDetails).filter(UserDetails.user_id == ana).one()
+            details.bio = 'Sem commit'
+            db.flush()
+        assert details.bio == 'Sem commit' # O objeto devolvido mantém o estado
+
+        # Instrução que falhou, com o erro engolido pelo bloco: a transação abortada não passa adiante
+        with db_manager.get_db() as db:
+            try:
+                db.execute(text("SELECT coluna_inexistente FROM users;"))
+            except Exception:
+                pass
+
+        with db_manager.get_db() as db:
+            db.query(UserDetails).filter(UserDetails.user_id == ana).update({'display_name': 'Ana'})
+            db.commit()
+
+    with database.connect() as conn:
+        bio, display_name = conn.execute(text("SELECT bio, display_name FROM users_details WHERE user_id = :id;"), {'id': ana}).one()
+    assert (bio, display_name) == (None, 'Ana')
@@ -0,0 +1,32 @@
+from sqlalchemy import text
+from app.database import UserDetails
+from app.extensions import db_manager
+from app.search import SearchService
+from conftest import create_user
+
+def test_failed_fuzzy_search_keeps_the_request_transaction(database, app, monkeypatch):
+    ana = create_user(db_manager, 'ana')
+    db_manager.create_post(ana, 'Rotina de sono', 'Conteúdo', 'geral')
+    search_service = SearchService(db_manager)
+
+    fetch_page = search_service._fetch_page
+    def failing_fetch_page(db, query, category, mode, *args):
+        if mode == 'fuzzy': # Como sem pg_trgm: erro do banco no meio da transação
+            db.execute(text("SELECT word_similarity_inexistente('sono');"))
+        return fetch_page(db, query, category, mode, *args)
+    monkeypatch.setattr(search_service, '_fetch_page', failing_fetch_page)
+
+    with app.test_request_context():
+        with db_manager.get_db() as db:
+            details = db.query(UserDetails).filter(UserDetails.user_id == ana).one()
+            details.bio = 'Bio nova'
+            db.flush() # Gravado na transação, commitado só no fim do bloco
+
+            result = search_service.search('snoo')
+            assert result['mode'] == 'fuzzy'
+            assert result['cards'] == [] and result['total'] == 0
+            assert search_service.search('sono')['total'] == 1 # A sessão continua utilizável
+            db.commit()
+
+    with database.connect() as conn:
+        assert conn.execute(text("SELECT bio FROM users_details WHERE user_id = :id;"), {'id': ana}).scalar() == 'Bio nova'